@@ -0,0 +1,39 @@
+"""
+api/admin.py
+管理端點的存取控制
+
+管理端點需設定 ADMIN_TOKEN 環境變數才會啟用；
+請求時以 X-Admin-Token header（或 ?token= 參數）帶入相同的值。
+未設定 ADMIN_TOKEN 時，所有管理端點一律回傳 404。
+"""
+
+import hmac
+import os
+from functools import wraps
+
+from flask import request, jsonify
+
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def is_admin_request() -> bool:
+    """目前請求是否帶有正確的管理 token"""
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get("X-Admin-Token") or request.args.get("token", "")
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(view):
+    """管理端點裝飾器：未啟用回傳 404，token 錯誤回傳 403"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"status": "error", "message": "Not Found"}), 404
+        if not is_admin_request():
+            return jsonify({"status": "error", "message": "管理 token 錯誤"}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,274 @@
+"""
+api/batch_classify.py
+批次餐廳分類（合作夥伴 API）
+
+功能：
+1. 解析 JSON 陣列或 NDJSON（每行一筆）的批次請求，逐筆可以是 place_id 或完整餐廳資料
+2. 將批次切成固定大小的 chunk，以執行緒池平行處理，依輸入順序逐筆產出結果（可串流回傳）
+3. 超過同步上限的大批次改用工作模式：背景執行，以 job_id 查詢進度與結果
+
+使用方式：
+    items = parse_batch(body, content_type, max_items=500)
+    for result in run_batch(items, classify_one):     # classify_one(item) -> dict
+        ...
+
+    job = BATCH_JOBS.submit(items, classify_one)
+    BATCH_JOBS.get(job.job_id).snapshot()
+
+備註：
+    工作狀態保存在程序記憶體中，多 worker 部署時需由同一個 worker 查詢。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Deque, Iterable, Iterator, Optional
+
+from api.serialization import dumps
+
+
+logger = logging.getLogger("haoshiji.batch")
+
+
+# ====================
+# 常數定義
+# ====================
+# 同步（串流）模式的筆數上限，超過時需改用工作模式
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+# 工作模式的筆數上限
+BATCH_JOB_MAX_ITEMS = int(os.getenv("BATCH_JOB_MAX_ITEMS", "20000"))
+# 請求內容大小上限（位元組）
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(32 * 1024 * 1024)))
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "25"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# 保留的工作數（超過時移除最舊的已結束工作）
+BATCH_JOB_RETENTION = int(os.getenv("BATCH_JOB_RETENTION", "100"))
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+
+
+class BatchError(ValueError):
+    """批次請求格式錯誤或超過上限"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ====================
+# 解析
+# ====================
+def is_ndjson(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in NDJSON_TYPES
+
+
+def _normalize_item(item: Any) -> Dict[str, Any]:
+    # 只給 place_id 字串時轉成 {"place_id": ...}
+    if isinstance(item, str):
+        return {"place_id": item}
+    return item
+
+
+def parse_batch(body: bytes, content_type: Optional[str], max_items: int = BATCH_MAX_ITEMS) -> List[Any]:
+    """
+    解析批次請求內容
+
+    接受格式：
+        JSON：[...]、{"restaurants": [...]} 或 {"place_ids": [...]}
+        NDJSON：每行一筆（餐廳物件或 place_id 字串），空行略過
+
+    Raises:
+        BatchError: 格式錯誤（400）或超過筆數上限（413）
+    """
+    if is_ndjson(content_type):
+        items = []
+        for line_no, line in enumerate(body.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise BatchError(f"第 {line_no} 行不是合法的 JSON")
+            if len(items) > max_items:
+                raise BatchError(f"單次最多 {max_items} 筆", status=413)
+    else:
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            raise BatchError("請求內容不是合法的 JSON")
+        if isinstance(data, dict):
+            data = data.get("restaurants", data.get("place_ids"))
+        if not isinstance(data, list):
+            raise BatchError("請提供餐廳陣列、{\"restaurants\": [...]} 或 {\"place_ids\": [...]}")
+        items = data
+
+    if not items:
+        raise BatchError("批次內容是空的")
+    if len(items) > max_items:
+        raise BatchError(f"單次最多 {max_items} 筆", status=413)
+    return [_normalize_item(item) for item in items]
+
+
+# ====================
+# 平行處理
+# ====================
+_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="haoshiji-batch")
+
+
+def _process_chunk(
+    start: int,
+    chunk: List[Any],
+    classify_one: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    results = []
+    for offset, item in enumerate(chunk):
+        index = start + offset
+        if not isinstance(item, dict) or not (item.get("place_id") or item.get("name")):
+            results.append({"index": index, "error": "每筆需為含 place_id 或 name 的物件"})
+            continue
+        try:
+            results.append({"index": index, **classify_one(item)})
+        except Exception as e:
+            # 單筆失敗不影響整批
+            results.append({"index": index, "place_id": item.get("place_id"), "error": str(e)})
+    return results
+
+
+def run_batch(
+    items: List[Any],
+    classify_one: Callable[[Dict[str, Any]], Dict[str, Any]],
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    workers: int = BATCH_WORKERS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    平行處理批次，依輸入順序逐筆產出結果
+
+    同時最多只有 workers * 2 個 chunk 在處理中，串流回傳時不會一次佔用整個執行緒池。
+
+    Args:
+        items: parse_batch 的結果
+        classify_one: 處理單筆的函式（回傳要輸出的欄位，例外視為該筆失敗）
+        chunk_size: 每個 chunk 的筆數
+        workers: 同時處理的 chunk 數上限（實際平行度受 BATCH_WORKERS 限制）
+
+    Yields:
+        {"index": 輸入位置, ...classify_one 的結果} 或 {"index", "error"}
+    """
+    chunk_size = max(chunk_size, 1)
+    starts = iter(range(0, len(items), chunk_size))
+    pending: Deque = deque()
+
+    def submit_next() -> bool:
+        start = next(starts, None)
+        if start is None:
+            return False
+        chunk = items[start : start + chunk_size]
+        pending.append(_executor.submit(_process_chunk, start, chunk, classify_one))
+        return True
+
+    while len(pending) < max(workers, 1) * 2 and submit_next():
+        pass
+    while pending:
+        results = pending.popleft().result()
+        submit_next()
+        yield from results
+
+
+def to_ndjson(results: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """將結果轉為 NDJSON（每筆一行）"""
+    for result in results:
+        yield dumps(result) + b"\n"
+
+
+# ====================
+# 工作模式
+# ====================
+class BatchJob:
+    """單一批次工作"""
+
+    def __init__(self, total: int):
+        self.job_id = uuid.uuid4().hex
+        self.total = total
+        self.status = "queued"
+        self.results: List[Dict[str, Any]] = []
+        self.errors = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def snapshot(self, include_results: bool = False) -> Dict[str, Any]:
+        """目前狀態（include_results=True 時附上已完成的結果）"""
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "done": len(self.results),
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_results:
+            data["results"] = list(self.results)
+        return data
+
+
+class BatchJobs:
+    """
+    批次工作管理（背景執行緒依序執行，已結束的工作只保留最近 retention 個）
+    """
+
+    def __init__(self, retention: int = BATCH_JOB_RETENTION):
+        self.retention = retention
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="haoshiji-batch-job")
+
+    def submit(
+        self,
+        items: List[Any],
+        classify_one: Callable[[Dict[str, Any]], Dict[str, Any]],
+    ) -> BatchJob:
+        job = BatchJob(len(items))
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # 只移除已結束的工作；排隊或執行中的工作不論多舊都保留
+            excess = len(self._jobs) - self.retention
+            if excess > 0:
+                finished = [
+                    job_id for job_id, old in self._jobs.items() if old.status in ("done", "failed")
+                ][:excess]
+                for job_id in finished:
+                    del self._jobs[job_id]
+        self._runner.submit(self._run, job, items, classify_one)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: BatchJob, items: List[Any], classify_one: Callable) -> None:
+        job.status = "running"
+        try:
+            for result in run_batch(items, classify_one):
+                if "error" in result:
+                    job.errors += 1
+                job.results.append(result)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.warning(f"⚠️  批次工作 {job.job_id} 失敗: {e}")
+        finally:
+            job.finished_at = time.time()
+
+
+BATCH_JOBS = BatchJobs()
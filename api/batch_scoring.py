@@ -0,0 +1,241 @@
+"""
+api/batch_scoring.py
+批次評論關鍵字命中矩陣（離線分析用）
+
+功能：
+1. 一次處理整批評論，產生「評論 × 關鍵字」的稀疏命中矩陣（COO 格式）
+2. 統計每個分類、每個關鍵字的命中評論數
+3. 匯出為 pandas DataFrame，方便計算各關鍵字的出現頻率與精確率
+
+命中結果與 classify_review 逐則分析完全一致（同一份關鍵字規則，含否定詞與門檻）：
+每列非零欄位依欄位順序排列，即為 classify_review 回傳的 matched_keywords。
+
+做法：
+    將所有評論（經 CompiledRules.normalize 後）以 \\x00 串接成單一字串，以規則編譯好的關鍵字
+    alternation（CompiledRules.scan）在整個語料上 finditer 掃描一次；命中位置以 numpy.searchsorted
+    對應回評論編號。多數評論不含任何關鍵字；只有候選評論另外串成子語料，每個關鍵字在子語料上
+    以 str.find 掃描一次（含否定詞判斷），同一則評論命中後直接跳到下一則評論的起點。
+
+相依套件：
+    numpy（必要）、pandas（僅 DataFrame 匯出時需要）、scipy（僅轉為 CSR 時需要）
+"""
+
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+from api.classifier import get_rules
+from api.rules import CompiledRules
+
+
+# ====================
+# 常數定義
+# ====================
+SEPARATOR = "\x00"
+
+
+def _offsets(texts: Sequence[str]) -> np.ndarray:
+    """以 SEPARATOR 串接後，每段文字的起點"""
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    starts = np.zeros(len(texts), dtype=np.int64)
+    if len(texts) > 1:
+        np.cumsum(lengths[:-1] + 1, out=starts[1:])
+    return starts
+
+
+def classify_reviews_batch(
+    texts: Sequence[Optional[str]],
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, Any]:
+    """
+    批次分析評論，回傳稀疏命中矩陣與統計
+
+    Args:
+        texts: 評論內文清單（None 或空字串視為無命中）
+        rules: 關鍵字規則（預設為目前生效的規則，整批使用同一版本）
+
+    Returns:
+        {
+            "shape": (評論數, 關鍵字數),
+            "labels": List[str],            # 欄位標籤（如「症狀:拉肚子」）
+            "columns": List[(分類, 關鍵字)],
+            "rules_version": str,
+            "rows": np.ndarray[int32],      # 命中的評論編號（依列、欄排序）
+            "cols": np.ndarray[int32],      # 命中的關鍵字欄位
+            "has_symptoms": np.ndarray[bool],
+            "has_raw_food": np.ndarray[bool],
+            "risk_score": np.ndarray[float64],
+            "keyword_counts": np.ndarray[int64],   # 每個關鍵字的命中評論數
+            "category_counts": Dict[str, int],     # 每個分類的命中評論數
+        }
+    """
+    rules = rules or get_rules()
+    normalized = [rules.normalize(text) if text else "" for text in texts]
+    n_reviews = len(normalized)
+    corpus = SEPARATOR.join(normalized)
+
+    starts = _offsets(normalized)
+
+    # 一次掃描找出含有任一關鍵字的評論（分隔字元不是關鍵字的一部分，不會跨評論命中）
+    positions = np.fromiter(rules.scan(corpus), dtype=np.int64)
+    candidates = np.unique(np.searchsorted(starts, positions, side="right") - 1)
+
+    # 只在候選評論串成的子語料上逐一搜尋各關鍵字（多數評論已被排除）
+    sub_texts = [normalized[row] for row in candidates.tolist()]
+    sub_corpus = SEPARATOR.join(sub_texts)
+    sub_starts = _offsets(sub_texts)
+    sub_starts_list = sub_starts.tolist()
+    n_candidates = len(sub_texts)
+
+    row_chunks = []
+    col_chunks = []
+    for col, (_, keyword) in enumerate(rules.columns):
+        found = []
+        # 否定詞不含分隔字元，因此不會跨到前一則評論
+        pos = rules.find(sub_corpus, keyword)
+        while pos != -1:
+            found.append(pos)
+            # 同一則評論只需命中一次，直接跳到下一則評論的起點
+            sub_row = bisect_right(sub_starts_list, pos) - 1
+            if sub_row + 1 >= n_candidates:
+                break
+            pos = rules.find(sub_corpus, keyword, sub_starts_list[sub_row + 1])
+
+        if found:
+            sub_rows = np.searchsorted(sub_starts, np.asarray(found, dtype=np.int64), side="right") - 1
+            row_chunks.append(candidates[sub_rows].astype(np.int32))
+            col_chunks.append(np.full(len(sub_rows), col, dtype=np.int32))
+
+    if row_chunks:
+        rows = np.concatenate(row_chunks)
+        cols = np.concatenate(col_chunks)
+        order = np.lexsort((cols, rows))
+        rows = rows[order]
+        cols = cols[order]
+    else:
+        rows = np.zeros(0, dtype=np.int32)
+        cols = np.zeros(0, dtype=np.int32)
+
+    n_keywords = len(rules.columns)
+    n_categories = len(rules.categories)
+    column_category = np.asarray(rules.column_category, dtype=np.int64)
+    weights = np.asarray(rules.weights, dtype=np.float64)
+
+    # 每則評論、每個分類的權重總和，達門檻才算命中（與 CompiledRules.classify 相同）
+    scores = np.bincount(
+        rows.astype(np.int64) * n_categories + column_category[cols],
+        weights=weights[cols],
+        minlength=n_reviews * n_categories,
+    ).reshape(n_reviews, n_categories)
+    triggered = (scores > 0) & (scores >= np.asarray(rules.thresholds))
+    is_raw_food = np.asarray(rules.raw_food, dtype=bool)
+
+    category_counts = {}
+    for index, category in enumerate(rules.categories):
+        hit_rows = rows[column_category[cols] == index]
+        category_counts[category] = int(np.unique(hit_rows).size)
+
+    return {
+        "shape": (n_reviews, n_keywords),
+        "labels": list(rules.labels),
+        "columns": list(rules.columns),
+        "rules_version": rules.version,
+        "rows": rows,
+        "cols": cols,
+        "has_symptoms": triggered[:, ~is_raw_food].any(axis=1),
+        "has_raw_food": triggered[:, is_raw_food].any(axis=1),
+        "risk_score": np.round((scores * triggered).sum(axis=1), 3),
+        "keyword_counts": np.bincount(cols, minlength=n_keywords),
+        "category_counts": category_counts,
+    }
+
+
+def matched_keywords_of(result: Dict[str, Any], review_index: int) -> List[str]:
+    """
+    取得單則評論的命中標籤（與 classify_review 的 matched_keywords 相同）
+    """
+    rows = result["rows"]
+    lo = np.searchsorted(rows, review_index, side="left")
+    hi = np.searchsorted(rows, review_index, side="right")
+    return [result["labels"][c] for c in result["cols"][lo:hi]]
+
+
+def to_csr_matrix(result: Dict[str, Any]):
+    """轉為 scipy.sparse.csr_matrix（需安裝 scipy）"""
+    from scipy.sparse import csr_matrix
+
+    data = np.ones(len(result["rows"]), dtype=np.int8)
+    return csr_matrix((data, (result["rows"], result["cols"])), shape=result["shape"])
+
+
+# ====================
+# pandas 匯出
+# ====================
+def hits_to_dataframe(result: Dict[str, Any]):
+    """
+    匯出為長表格式 DataFrame（每列一個命中）
+
+    Columns:
+        review_index, category, keyword, label
+    """
+    import pandas as pd
+
+    categories = np.array([category for category, _ in result["columns"]], dtype=object)
+    keywords = np.array([keyword for _, keyword in result["columns"]], dtype=object)
+    labels = np.array(result["labels"], dtype=object)
+    cols = result["cols"]
+    return pd.DataFrame(
+        {
+            "review_index": result["rows"],
+            "category": categories[cols],
+            "keyword": keywords[cols],
+            "label": labels[cols],
+        }
+    )
+
+
+def keyword_stats_dataframe(
+    result: Dict[str, Any],
+    is_relevant: Optional[Sequence[bool]] = None,
+):
+    """
+    每個關鍵字的統計（供調整關鍵字清單）
+
+    Args:
+        result: classify_reviews_batch 的結果
+        is_relevant: 人工標註，每則評論是否真的有食安問題（可省略）
+
+    Returns:
+        DataFrame，欄位：
+            category, keyword, hits, frequency（命中評論數 / 評論總數）
+            若提供 is_relevant，另含 true_hits 與 precision
+    """
+    import pandas as pd
+
+    n_reviews = result["shape"][0]
+    hits = result["keyword_counts"]
+    frame = pd.DataFrame(
+        {
+            "category": [category for category, _ in result["columns"]],
+            "keyword": [keyword for _, keyword in result["columns"]],
+            "hits": hits,
+            "frequency": hits / n_reviews if n_reviews else 0.0,
+        }
+    )
+
+    if is_relevant is not None:
+        relevant = np.asarray(is_relevant, dtype=bool)
+        true_hits = np.bincount(
+            result["cols"][relevant[result["rows"]]],
+            minlength=len(result["columns"]),
+        )
+        frame["true_hits"] = true_hits
+        frame["precision"] = np.divide(
+            true_hits,
+            hits,
+            out=np.full(len(hits), np.nan),
+            where=hits > 0,
+        )
+
+    return frame
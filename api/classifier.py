@@ -31,10 +31,26 @@ api/classifier.py
 import json
 import csv
 import os
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from enum import Enum
 from datetime import datetime
 
+from api.matching import (
+    MATCH_CACHE,
+    MatchIndex,
+    address_agreement,
+    clean_name,
+    get_match_index,
+    match_cache_key,
+    match_confidence,
+    name_similarity,
+)
+from api.metrics import span
+from api.records import CertifiedRecord, InspectionRecord
+from api.rules import DEFAULT_RULES_PATH, CompiledRules, RuleFile
+from api.serialization import dump_file
+
 
 # ====================
 # 常數定義
@@ -100,6 +116,39 @@ DISH_KEYWORDS = [
     "生蠔",
 ]
 
+# 內建關鍵字分類（標籤前綴 → 關鍵字清單）
+# 實際比對以規則檔 data/rules/keyword_rules.json 為準，規則檔不存在時才使用此設定
+KEYWORD_CATEGORIES = {
+    "症狀": SYMPTOM_KEYWORDS,
+    "品質缺陷": FOOD_QUALITY_DEFECT,
+    "未煮熟": UNDERCOOKED,
+    "異物": FOREIGN_BODY,
+    "環境": ENVIRONMENT,
+    "生食": DISH_KEYWORDS,
+}
+
+RULES = RuleFile(
+    DEFAULT_RULES_PATH,
+    fallback={
+        "categories": [
+            {
+                "name": name,
+                "flag": "raw_food" if keywords is DISH_KEYWORDS else "symptom",
+                "weight": 1.0,
+                "threshold": 1.0,
+                "keywords": keywords,
+            }
+            for name, keywords in KEYWORD_CATEGORIES.items()
+        ]
+    },
+)
+
+
+def get_rules() -> CompiledRules:
+    """目前生效的關鍵字規則（規則檔變更時自動重新編譯）"""
+    return RULES.get()
+
+
 # 台北市行政區對照
 DISTRICT_MAP = {
     "63000010": "松山區",
@@ -115,21 +164,36 @@ DISTRICT_MAP = {
     "63000110": "士林區",
     "63000120": "北投區",
 }
+DEFAULT_DISTRICTS = tuple(DISTRICT_MAP.values())
+
+# 官方資料比對模式：first（第一筆包含關係成立者，原本的行為）/ scored（評分後取最高分）
+MATCH_MODE = os.getenv("MATCH_MODE", "first")
+MATCH_MODES = ("first", "scored")
+# 評分比對：採用的最低信心分數，以及輸出的候選數
+MATCH_MIN_CONFIDENCE = float(os.getenv("MATCH_MIN_CONFIDENCE", "0.75"))
+MATCH_TOP_CANDIDATES = int(os.getenv("MATCH_TOP_CANDIDATES", "3"))
 
 
 # ====================
 # 官方評核資料載入
 # ====================
-def load_certified_restaurants(csv_path: str) -> Dict[str, Dict[str, str]]:
+def load_certified_restaurants(
+    csv_path: str,
+    district_map: Optional[Dict[str, str]] = None,
+) -> Dict[str, CertifiedRecord]:
     """
     載入官方餐飲衛生評核資料（僅限評核結果為「優」）
 
     Args:
         csv_path: CSV 檔案路徑
+        district_map: 行政區代碼對照（預設為台北市 DISTRICT_MAP）
 
     Returns:
-        以「業者名稱」為 key 的字典
+        以「業者名稱」為 key 的字典（值為精簡紀錄，可用 record["address"] 讀取）
     """
+    if district_map is None:
+        district_map = DISTRICT_MAP
+
     certified = {}
     total_count = 0
     excellent_count = 0
@@ -149,13 +213,14 @@ def load_certified_restaurants(csv_path: str) -> Dict[str, Dict[str, str]]:
             if name and rating == "優":
                 excellent_count += 1
                 district_code = row.get("行政區域代碼", "")
-                certified[name] = {
-                    "district_code": district_code,
-                    "district_name": DISTRICT_MAP.get(district_code, "未知"),
-                    "registration_id": row.get("食品業者登錄字號", ""),
-                    "address": row.get("地址", ""),
-                    "certification_rating": rating,
-                }
+                # 以位置參數呼叫：每筆少一次 keyword 參數對應（大檔載入時有感）
+                certified[name] = CertifiedRecord.create(
+                    district_code,
+                    district_map.get(district_code, "未知"),
+                    row.get("食品業者登錄字號", ""),
+                    row.get("地址", ""),
+                    rating,
+                )
 
     print(f"  原始資料: {total_count} 筆")
     print(f"  評核「優」: {excellent_count} 筆（已納入）")
@@ -164,7 +229,7 @@ def load_certified_restaurants(csv_path: str) -> Dict[str, Dict[str, str]]:
     return certified
 
 
-def load_inspection_failed(json_path: str) -> Dict[str, Dict[str, str]]:
+def load_inspection_failed(json_path: str) -> Dict[str, InspectionRecord]:
     """
     載入食品稽查不合格資料
 
@@ -172,7 +237,7 @@ def load_inspection_failed(json_path: str) -> Dict[str, Dict[str, str]]:
         json_path: JSON 檔案路徑
 
     Returns:
-        以「業者名稱」為 key 的字典
+        以「業者名稱」為 key 的字典（值為精簡紀錄，可用 record["address"] 讀取）
     """
     failed = {}
 
@@ -185,10 +250,10 @@ def load_inspection_failed(json_path: str) -> Dict[str, Dict[str, str]]:
     for item in data:
         company_name = item.get("company_name", "").strip()
         if company_name:
-            failed[company_name] = {
-                "address": item.get("address", ""),
-                "registration_number": item.get("registration_number", ""),
-            }
+            failed[company_name] = InspectionRecord.create(
+                item.get("address", ""),
+                item.get("registration_number", ""),
+            )
 
     print(f"  稽查不合格: {len(failed)} 筆（已納入）")
     return failed
@@ -198,6 +263,7 @@ def fuzzy_match_certification(
     restaurant_name: str,
     restaurant_address: str,
     certified_data: Dict[str, Dict[str, str]],
+    districts: Optional[Iterable[str]] = None,
 ) -> Optional[Dict[str, str]]:
     """
     模糊比對餐廳是否在官方認證名單中
@@ -206,40 +272,57 @@ def fuzzy_match_certification(
     1. 完全名稱比對
     2. 清理後名稱比對
     3. 部分名稱 + 地址交叉驗證
+    策略 2、3 的結果（含未命中）會快取，見 api.matching.MATCH_CACHE
 
     Args:
         restaurant_name: 餐廳名稱（來自 Google Places）
         restaurant_address: 餐廳地址（來自 Google Places）
         certified_data: 官方認證資料字典
+        districts: 地址交叉驗證用的行政區名稱（預設為台北市各區）
 
     Returns:
         匹配到的認證資訊，或 None
     """
-    if not restaurant_name:
+    if not restaurant_name or not certified_data:
         return None
 
+    if districts is None:
+        districts = DEFAULT_DISTRICTS
+
     # 策略 1：完全比對
     if restaurant_name in certified_data:
         return certified_data[restaurant_name]
 
-    # 清理名稱（移除常見後綴與空白）
-    def clean_name(name: str) -> str:
-        suffixes = ["餐廳", "店", "門市", "分店", "旗艦店", "本店", "總店"]
-        result = name.strip()
-        for suffix in suffixes:
-            result = result.replace(suffix, "")
-        return result.strip()
+    # 策略 2、3 的結果依名單版本快取（含未命中；名單的清理結果與 bigram 索引只建一次）
+    index = get_match_index(certified_data)
+    custom_districts = districts is not DEFAULT_DISTRICTS
+    if custom_districts:
+        districts = tuple(districts)
+    key = match_cache_key(index, restaurant_name, restaurant_address, districts, custom_districts)
+    return MATCH_CACHE.lookup(
+        key, lambda: _match_cleaned(restaurant_name, restaurant_address, certified_data, index, districts)
+    )
+
 
+def _match_cleaned(
+    restaurant_name: str,
+    restaurant_address: str,
+    certified_data: Dict[str, Dict[str, str]],
+    index: MatchIndex,
+    districts: Iterable[str],
+) -> Optional[Dict[str, str]]:
+    """fuzzy_match_certification 的策略 2、3"""
+    # 清理名稱（移除常見後綴與空白）
     clean_restaurant = clean_name(restaurant_name)
 
     # 策略 2：清理後完全比對
-    for cert_name, cert_info in certified_data.items():
-        if clean_restaurant == clean_name(cert_name):
-            return cert_info
+    cert_name = index.exact(clean_restaurant)
+    if cert_name is not None:
+        return certified_data[cert_name]
 
-    # 策略 3：部分名稱比對 + 地址驗證
-    for cert_name, cert_info in certified_data.items():
-        clean_cert = clean_name(cert_name)
+    # 策略 3：部分名稱比對 + 地址驗證（只檢查 bigram 索引篩出的候選，依原名單順序）
+    for pos in index.containment_candidates(clean_restaurant):
+        clean_cert = index.cleaned[pos]
 
         # 檢查名稱是否有包含關係
         name_match = (
@@ -249,9 +332,10 @@ def fuzzy_match_certification(
         )
 
         if name_match:
+            cert_info = index.record(pos)
             # 有地址時進行交叉驗證
             if restaurant_address and cert_info["address"]:
-                for district in DISTRICT_MAP.values():
+                for district in districts:
                     if (
                         district in restaurant_address
                         and district in cert_info["address"]
@@ -265,6 +349,90 @@ def fuzzy_match_certification(
     return None
 
 
+def scored_match_certification(
+    restaurant_name: str,
+    restaurant_address: str,
+    certified_data: Dict[str, Dict[str, str]],
+    districts: Optional[Iterable[str]] = None,
+    limit: int = MATCH_TOP_CANDIDATES,
+    min_confidence: float = MATCH_MIN_CONFIDENCE,
+) -> List[Tuple[float, str]]:
+    """
+    評分比對餐廳與官方名單（MATCH_MODE=scored）
+
+    只對 bigram 索引篩出的少量候選評分（名稱相似度加權地址一致度，見 api.matching），
+    不受名單順序影響，短名稱也不會因包含關係而誤配。
+
+    Args:
+        restaurant_name: 餐廳名稱（來自 Google Places）
+        restaurant_address: 餐廳地址（來自 Google Places）
+        certified_data: 官方名單字典
+        districts: 地址一致度用的行政區名稱（預設為台北市各區）
+        limit: 最多回傳的候選數
+        min_confidence: 低於此信心分數的候選不回傳
+
+    Returns:
+        [(信心分數, 官方名稱), ...]，依分數由高到低
+    """
+    if not restaurant_name or not certified_data:
+        return []
+
+    if districts is None:
+        districts = DEFAULT_DISTRICTS
+    index = get_match_index(certified_data)
+    custom_districts = districts is not DEFAULT_DISTRICTS
+    if custom_districts:
+        districts = tuple(districts)
+
+    def score() -> Tuple[Tuple[float, str], ...]:
+        clean_restaurant = clean_name(restaurant_name)
+        scored = []
+        for pos in index.scoring_candidates(clean_restaurant):
+            cert_name = index.names[pos]
+            agreement = address_agreement(restaurant_address, index.record(pos)["address"], districts)
+            # 地址一致度決定名稱相似度至少要多少才可能達到 min_confidence
+            required = min_confidence / match_confidence(1.0, agreement)
+            if required > 1:
+                continue
+            confidence = match_confidence(name_similarity(clean_restaurant, index.cleaned[pos], required), agreement)
+            if confidence >= min_confidence:
+                scored.append((-confidence, pos, cert_name))
+        scored.sort()
+        return tuple((round(-negative, 3), cert_name) for negative, _, cert_name in scored[:limit])
+
+    key = match_cache_key(
+        index, restaurant_name, restaurant_address, districts, custom_districts,
+        mode=f"scored:{limit}:{min_confidence}",
+    )
+    return list(MATCH_CACHE.lookup(key, score))
+
+
+def match_official(
+    restaurant_name: str,
+    restaurant_address: str,
+    official_data: Dict[str, Dict[str, str]],
+    districts: Optional[Iterable[str]] = None,
+    mode: str = "first",
+) -> List[Tuple[Optional[float], str, Dict[str, str]]]:
+    """
+    依比對模式查詢官方名單
+
+    Returns:
+        [(信心分數, 官方名稱, 紀錄), ...]；first 模式最多一筆且信心分數為 None
+    """
+    if mode == "scored":
+        return [
+            (confidence, cert_name, official_data[cert_name])
+            for confidence, cert_name in scored_match_certification(
+                restaurant_name, restaurant_address, official_data, districts
+            )
+        ]
+    if mode != "first":
+        raise ValueError(f"未知的比對模式: {mode}（可用 {', '.join(MATCH_MODES)}）")
+    record = fuzzy_match_certification(restaurant_name, restaurant_address, official_data, districts)
+    return [] if record is None else [(None, "", record)]
+
+
 # ====================
 # 評論分析
 # ====================
@@ -280,6 +448,7 @@ def classify_review(review_text: str) -> Dict[str, Any]:
             "has_symptoms": bool,
             "has_raw_food": bool,
             "matched_keywords": List[str],
+            "risk_score": float,   # 見 api/rules.py
         }
     """
     if not review_text:
@@ -287,60 +456,128 @@ def classify_review(review_text: str) -> Dict[str, Any]:
             "has_symptoms": False,
             "has_raw_food": False,
             "matched_keywords": [],
+            "risk_score": 0.0,
         }
 
-    text = review_text.lower()
-    matched = []
-    has_symptoms = False
-
-    # 檢查急性病徵
-    for keyword in SYMPTOM_KEYWORDS:
-        if keyword in text:
-            has_symptoms = True
-            matched.append(f"症狀:{keyword}")
-
-    # 檢查食品品質缺陷
-    for keyword in FOOD_QUALITY_DEFECT:
-        if keyword in text:
-            has_symptoms = True
-            matched.append(f"品質缺陷:{keyword}")
-
-    # 檢查未煮熟
-    for keyword in UNDERCOOKED:
-        if keyword in text:
-            has_symptoms = True
-            matched.append(f"未煮熟:{keyword}")
-
-    # 檢查異物
-    for keyword in FOREIGN_BODY:
-        if keyword in text:
-            has_symptoms = True
-            matched.append(f"異物:{keyword}")
-
-    # 檢查環境問題
-    for keyword in ENVIRONMENT:
-        if keyword in text:
-            has_symptoms = True
-            matched.append(f"環境:{keyword}")
-
-    # 檢查生食關鍵字
-    has_raw_food = False
-    for keyword in DISH_KEYWORDS:
-        if keyword in text:
-            has_raw_food = True
-            matched.append(f"生食:{keyword}")
+    rules = get_rules()
+    return rules.classify(rules.normalize(review_text))
 
+
+# ====================
+# 評論彙總
+# ====================
+# API 回應（評論庫的彙總）中每家餐廳保留的標記評論上限（保留最新的）；
+# 離線 / 批次分類預設全部保留
+MAX_FLAGGED_REVIEWS = 50
+
+
+def flagged_review_entry(review: Dict[str, Any], result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    將有症狀關鍵字的評論轉為 flagged_reviews 項目（無症狀時回傳 None）
+    """
+    if not result["has_symptoms"]:
+        return None
+
+    text = review.get("text", "")
+    return {
+        "type": "症狀",
+        "author": review.get("author_name", "匿名"),
+        "text_preview": text[:100] + "..." if len(text) > 100 else text,
+        "keywords": [k for k in result["matched_keywords"] if k.startswith("症狀:")],
+    }
+
+
+def new_review_summary() -> Dict[str, Any]:
+    """建立空的評論彙總"""
     return {
-        "has_symptoms": has_symptoms,
-        "has_raw_food": has_raw_food,
-        "matched_keywords": matched,
+        "review_count": 0,
+        "symptom_mentions": 0,
+        "raw_food_mentions": 0,
+        "keyword_counts": {},
+        "flagged_reviews": [],
+        "risk_score": 0.0,
     }
 
 
+def add_review_to_summary(
+    summary: Dict[str, Any],
+    review: Dict[str, Any],
+    result: Dict[str, Any],
+    details: bool = True,
+    max_flagged: Optional[int] = None,
+) -> None:
+    """
+    將單則評論的分析結果累加到彙總（就地更新）
+
+    Args:
+        summary: new_review_summary() 建立的彙總
+        review: 評論資料
+        result: classify_review 的結果
+        details: 是否保留 flagged_reviews（評論摘錄）；False 時只累計數量
+        max_flagged: flagged_reviews 上限（保留最新的）；None 代表全部保留
+    """
+    summary["review_count"] += 1
+    if result["has_symptoms"]:
+        summary["symptom_mentions"] += 1
+    if result["has_raw_food"]:
+        summary["raw_food_mentions"] += 1
+    summary["risk_score"] = summary.get("risk_score", 0.0) + result.get("risk_score", 0.0)
+
+    keyword_counts = summary["keyword_counts"]
+    for keyword in result["matched_keywords"]:
+        keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+
+    if not details:
+        return
+    entry = flagged_review_entry(review, result)
+    if entry is not None:
+        flagged = summary["flagged_reviews"]
+        flagged.append(entry)
+        if max_flagged is not None and len(flagged) > max_flagged:
+            del flagged[: len(flagged) - max_flagged]
+
+
+def summarize_reviews(
+    reviews: Iterable[Dict[str, Any]],
+    details: bool = True,
+    max_flagged: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    分析並彙總一批評論
+
+    Args:
+        reviews: 評論清單
+        details: 是否產生 flagged_reviews（評論摘錄與命中關鍵字）；
+            列表頁只需要統計時傳 False，省下每則評論的字串處理
+        max_flagged: flagged_reviews 上限（保留最新的）；None 代表全部保留
+
+    Returns:
+        {
+            "review_count": int,
+            "symptom_mentions": int,
+            "raw_food_mentions": int,
+            "keyword_counts": Dict[str, int],   # 命中標籤 → 評論數
+            "flagged_reviews": List[Dict],
+            "risk_score": float,                # 各評論 risk_score 總和
+        }
+    """
+    # 整批使用同一版本規則，不必每則評論檢查規則檔
+    rules = get_rules()
+    summary = new_review_summary()
+    for review in reviews:
+        text = review.get("text") or ""
+        add_review_to_summary(summary, review, rules.classify(rules.normalize(text)), details, max_flagged)
+    return summary
+
+
 def classify_restaurant(
     restaurant: Dict[str, Any],
     certified_data: Dict[str, Dict[str, str]],
     inspection_failed_data: Dict[str, Dict[str, str]],
+    districts: Optional[Iterable[str]] = None,
+    review_summary: Optional[Dict[str, Any]] = None,
+    details: bool = True,
+    match_mode: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     分析單家餐廳的整體食安風險（整合官方認證與稽查資料）
@@ -349,6 +586,13 @@ def classify_restaurant(
         restaurant: 餐廳資料（含評論）
         certified_data: 官方認證資料字典
         inspection_failed_data: 稽查不合格資料字典
+        districts: 地址交叉驗證用的行政區名稱（預設為台北市各區）
+        review_summary: 評論彙總（見 summarize_reviews）；已在收錄時彙總者
+            可直接傳入，省略時即時分析 restaurant["reviews"]
+        details: 是否附上 flagged_reviews（評論摘錄）；False 為精簡模式，
+            只回傳統計，flagged_reviews 為 None（單一餐廳詳細頁再取得）
+        match_mode: 官方資料比對模式（預設為 MATCH_MODE）；scored 時
+            official_certification / inspection_status 另附 confidence 與 candidates
 
     Returns:
         原餐廳資料 + safety_analysis 欄位
@@ -357,39 +601,24 @@ def classify_restaurant(
     name = restaurant.get("name", "")
     address = restaurant.get("formatted_address", "")
 
+    match_mode = match_mode or MATCH_MODE
+
     # 檢查稽查不合格名單
-    inspection_failed = fuzzy_match_certification(name, address, inspection_failed_data)
+    with span("match.inspection"):
+        inspection_matches = match_official(name, address, inspection_failed_data, districts, match_mode)
 
     # 檢查官方認證
-    certification = fuzzy_match_certification(name, address, certified_data)
+    with span("match.certification"):
+        certification_matches = match_official(name, address, certified_data, districts, match_mode)
 
-    # 分析所有評論
-    all_matched_keywords = []
-    symptom_count = 0
-    raw_food_count = 0
-    flagged_reviews = []
+    # 分析所有評論（評論已在收錄時分析過者直接沿用彙總結果）
+    if review_summary is None:
+        with span("classify.reviews", review_count=len(reviews)):
+            review_summary = summarize_reviews(reviews, details=details)
 
-    for review in reviews:
-        text = review.get("text", "")
-        result = classify_review(text)
-
-        if result["has_symptoms"]:
-            symptom_count += 1
-            flagged_reviews.append(
-                {
-                    "type": "症狀",
-                    "author": review.get("author_name", "匿名"),
-                    "text_preview": text[:100] + "..." if len(text) > 100 else text,
-                    "keywords": [
-                        k for k in result["matched_keywords"] if k.startswith("症狀:")
-                    ],
-                }
-            )
-
-        if result["has_raw_food"]:
-            raw_food_count += 1
-
-        all_matched_keywords.extend(result["matched_keywords"])
+    symptom_count = review_summary["symptom_mentions"]
+    raw_food_count = review_summary["raw_food_mentions"]
+    flagged_reviews = review_summary["flagged_reviews"] if details else None
 
     # 判定風險等級（僅基於評論內容）
     # 優先級：有關鍵字（注意） > 無關鍵字（低風險）
@@ -405,21 +634,35 @@ def classify_restaurant(
         "level": level.value,
         "symptom_mentions": symptom_count,
         "raw_food_mentions": raw_food_count,
-        "matched_keywords": list(set(all_matched_keywords)),
-        "total_reviews_analyzed": len(reviews),
-        "flagged_reviews": flagged_reviews if flagged_reviews else None,
+        "matched_keywords": list(review_summary["keyword_counts"]),
+        "total_reviews_analyzed": review_summary["review_count"],
+        "risk_score": round(review_summary.get("risk_score", 0.0), 3),
+        "flagged_reviews": list(flagged_reviews) if flagged_reviews else None,
         "official_certification": None,
         "inspection_status": None,
     }
 
-    if inspection_failed:
+    if inspection_matches:
+        confidence, _, inspection_failed = inspection_matches[0]
         safety_analysis["inspection_status"] = {
             "status": "稽查不合格",
             "registration_number": inspection_failed["registration_number"],
             "failed_address": inspection_failed["address"],
         }
+        if confidence is not None:
+            safety_analysis["inspection_status"]["confidence"] = confidence
+            safety_analysis["inspection_status"]["candidates"] = [
+                {
+                    "name": company_name,
+                    "registration_number": record["registration_number"],
+                    "address": record["address"],
+                    "confidence": candidate_confidence,
+                }
+                for candidate_confidence, company_name, record in inspection_matches
+            ]
 
-    if certification:
+    if certification_matches:
+        confidence, _, certification = certification_matches[0]
         safety_analysis["official_certification"] = {
             "status": "通過評核",
             "rating": certification["certification_rating"],
@@ -427,6 +670,17 @@ def classify_restaurant(
             "certified_address": certification["address"],
             "district": certification["district_name"],
         }
+        if confidence is not None:
+            safety_analysis["official_certification"]["confidence"] = confidence
+            safety_analysis["official_certification"]["candidates"] = [
+                {
+                    "name": cert_name,
+                    "registration_id": record["registration_id"],
+                    "address": record["address"],
+                    "confidence": candidate_confidence,
+                }
+                for candidate_confidence, cert_name, record in certification_matches
+            ]
 
     return {
         **restaurant,
@@ -442,6 +696,8 @@ def process_all_restaurants(
     output_path: str,
     certification_csv_path: str,
     inspection_json_path: str,
+    pretty: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> List[Dict[str, Any]]:
     """
     主流程：讀取原始資料 → 載入官方認證與稽查資料 → 分類 → 輸出
@@ -451,6 +707,8 @@ def process_all_restaurants(
         output_path: 輸出 JSON 路徑
         certification_csv_path: 官方評核 CSV 路徑
         inspection_json_path: 稽查不合格 JSON 路徑
+        pretty: 輸出是否縮排（預設精簡輸出，檔案較小、寫入較快）
+        progress: 進度回呼 progress(已完成數, 總數)（背景工作回報進度用）
 
     Returns:
         分類後的餐廳清單
@@ -498,42 +756,19 @@ def process_all_restaurants(
         # 進度顯示
         if i % 10 == 0 or i == len(restaurants):
             print(f"   進度: {i}/{len(restaurants)}")
+            if progress is not None:
+                progress(i, len(restaurants))
 
-    # Step 4: 排序
-    # 排序邏輯：
-    # 1. 稽查不合格優先排在最後（警示用）
-    # 2. 其次按風險等級：低風險 > 注意
-    # 3. 官方認證在同風險等級內優先顯示
-    # 4. 同等級內依 Google 評分排序
-    def sort_key(restaurant):
-        analysis = restaurant["safety_analysis"]
-        level = analysis["level"]
-        has_certification = analysis.get("official_certification") is not None
-        has_inspection_failed = analysis.get("inspection_status") is not None
-        rating = restaurant.get("rating", 0)
-
-        # 風險等級排序（數字越小越優先）
-        level_order = {
-            SafetyLevel.LOW_RISK.value: 0,
-            SafetyLevel.CAUTION.value: 1,
-        }
-
-        # 排序優先級
-        return (
-            1 if has_inspection_failed else 0,  # 稽查不合格排最後
-            level_order.get(level, 999),         # 風險等級
-            0 if has_certification else 1,       # 官方認證優先
-            -rating                              # Google 評分高的優先
-        )
+    # Step 4: 排序（見 api.ranking；ranking 依賴本模組，故在此匯入）
+    from api.ranking import rank
 
-    classified.sort(key=sort_key)
+    classified = rank(classified)
 
     # Step 5: 儲存結果
     print(f"\n Step 4: 儲存分類結果...")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(classified, f, ensure_ascii=False, indent=2)
+    dump_file(classified, output_path, pretty=pretty)
 
     # Step 6: 輸出摘要
     print("\n" + "=" * 50)
@@ -622,6 +857,7 @@ if __name__ == "__main__":
             output_path=OUTPUT_PATH,
             certification_csv_path=CERTIFICATION_CSV,
             inspection_json_path=INSPECTION_JSON,
+            pretty="--pretty" in sys.argv,
         )
     except FileNotFoundError as e:
         print(f" 錯誤: {e}")
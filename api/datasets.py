@@ -0,0 +1,300 @@
+"""
+api/datasets.py
+多縣市官方資料登錄表
+
+功能：
+1. 依設定檔（data/external/datasets.json）為每個縣市載入各自的評核 / 稽查資料
+2. 將前端傳來的城市名稱（台北市、臺北市、taipei…）正規化為登錄表中的縣市
+3. 每個縣市各自一份索引：比對前先依城市分區，只掃描該縣市的資料；
+   沒有資料的縣市直接略過官方資料比對
+
+設定檔格式：
+    {
+      "cities": [
+        {
+          "city": "臺北市",
+          "slug": "taipei",
+          "aliases": ["台北市", "taipei"],
+          "certification_csv": "data/external/certified_restaurants.csv",
+          "inspection_json": "data/external/food_business_data.json",
+          "filter_by_city": false,
+          "districts": {"63000010": "松山區", ...}
+        }
+      ]
+    }
+
+    全國性的資料來源可設定 "filter_by_city": true，載入時只保留地址位於該縣市的紀錄。
+
+使用方式：
+    registry = DatasetRegistry("data/external/datasets.json", base_dir=BASE_DIR).load()
+    dataset = registry.get("台北市")      # 找不到時為 None
+    if dataset is not None:
+        classify_restaurant(place, dataset.certified, dataset.inspection, dataset.district_names)
+
+    # 部署前預先建置共用 mmap 檔（{shared_dir}/{slug}.shm，預設建置所有縣市）：
+    python -m api.datasets [城市 ...] [--dir data/store/datasets]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from api.classifier import load_certified_restaurants, load_inspection_failed
+from api.matching import clear_match_cache
+from api.shared_datasets import ensure_shared_datasets
+
+
+logger = logging.getLogger("haoshiji.datasets")
+
+
+# ====================
+# 常數定義
+# ====================
+DEFAULT_CONFIG_PATH = "data/external/datasets.json"
+DEFAULT_SHARED_DIR = "data/store/datasets"
+
+# 城市名稱常見異體字（資料中也出現過「臺北巿」）
+CITY_CHAR_VARIANTS = str.maketrans({"台": "臺", "巿": "市"})
+
+
+# 英文地址以逗號分段，縣市段可能帶郵遞區號（如「Taipei City 110」）
+ADDRESS_PART_SEPARATOR = re.compile(r"\s*,\s*")
+POSTAL_CODE = re.compile(r"\s*\d+\s*")
+
+
+def normalize_city(text: Optional[str]) -> str:
+    """城市名稱正規化（去空白、轉小寫、統一異體字）"""
+    return (text or "").strip().lower().translate(CITY_CHAR_VARIANTS)
+
+
+def _address_parts(normalized_address: str) -> List[str]:
+    """英文地址的各段（去除郵遞區號），如 "xinyi district, taipei city 110" → ["xinyi district", "taipei city"]"""
+    parts = (POSTAL_CODE.sub(" ", part).strip() for part in ADDRESS_PART_SEPARATOR.split(normalized_address))
+    return [part for part in parts if part]
+
+
+@dataclass(frozen=True)
+class CityDataset:
+    """單一縣市的官方資料分區"""
+
+    city: str
+    slug: str
+    districts: Dict[str, str]
+    certified: Mapping
+    inspection: Mapping
+
+    @property
+    def district_names(self) -> List[str]:
+        return list(self.districts.values())
+
+
+def _filter_by_city(records: Mapping, city: str) -> Dict[str, Any]:
+    """只保留地址位於指定縣市的紀錄"""
+    target = normalize_city(city)
+    return {
+        name: record
+        for name, record in records.items()
+        if normalize_city(record["address"]).startswith(target)
+    }
+
+
+class DatasetRegistry:
+    """
+    縣市 → 官方資料的登錄表
+
+    Args:
+        config_path: 設定檔路徑
+        base_dir: 設定檔中相對路徑的基準目錄
+        shared_dir: 若指定，各縣市資料改以共用 mmap 檔掛載（{shared_dir}/{slug}.shm）
+    """
+
+    def __init__(
+        self,
+        config_path: str = DEFAULT_CONFIG_PATH,
+        base_dir: str = ".",
+        shared_dir: Optional[str] = None,
+    ):
+        self.config_path = config_path
+        self.base_dir = base_dir
+        self.shared_dir = shared_dir
+        self._datasets: Dict[str, CityDataset] = {}
+        self._aliases: Dict[str, str] = {}
+        # 地址比對用的別名（長的優先）
+        self._address_aliases: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    @property
+    def cities(self) -> List[str]:
+        return list(self._datasets)
+
+    def _path(self, relative: Optional[str]) -> Optional[str]:
+        if not relative:
+            return None
+        return relative if os.path.isabs(relative) else os.path.join(self.base_dir, relative)
+
+    def _load_tables(self, entry: Dict[str, Any]) -> Dict[str, Mapping]:
+        city = entry["city"]
+        districts = entry.get("districts", {})
+        certification_csv = self._path(entry.get("certification_csv"))
+        inspection_json = self._path(entry.get("inspection_json"))
+
+        certified: Mapping = {}
+        if certification_csv and os.path.exists(certification_csv):
+            with contextlib.redirect_stdout(io.StringIO()):
+                certified = load_certified_restaurants(certification_csv, districts)
+        elif certification_csv:
+            logger.warning(f"⚠️  找不到 {city} 官方認證資料: {certification_csv}")
+
+        inspection: Mapping = {}
+        if inspection_json and os.path.exists(inspection_json):
+            with contextlib.redirect_stdout(io.StringIO()):
+                inspection = load_inspection_failed(inspection_json)
+        elif inspection_json:
+            logger.warning(f"⚠️  找不到 {city} 稽查資料: {inspection_json}")
+
+        if entry.get("filter_by_city"):
+            certified = _filter_by_city(certified, city)
+            inspection = _filter_by_city(inspection, city)
+
+        return {"certified": certified, "inspection": inspection}
+
+    def _load_city(self, entry: Dict[str, Any], rebuild: bool = False) -> CityDataset:
+        slug = entry.get("slug") or entry["city"]
+        if self.shared_dir:
+            sources = [
+                self._path(entry.get("certification_csv")),
+                self._path(entry.get("inspection_json")),
+                self.config_path,
+            ]
+            tables = ensure_shared_datasets(
+                os.path.join(self.shared_dir, f"{slug}.shm"),
+                sources,
+                lambda: self._load_tables(entry),
+                rebuild=rebuild,
+            )
+        else:
+            tables = self._load_tables(entry)
+
+        return CityDataset(
+            city=entry["city"],
+            slug=slug,
+            districts=dict(entry.get("districts", {})),
+            certified=tables["certified"],
+            inspection=tables["inspection"],
+        )
+
+    def _read_config(self) -> List[Dict[str, Any]]:
+        """設定檔中的縣市清單（設定檔不存在時為空）"""
+        if not os.path.exists(self.config_path):
+            logger.warning(f"⚠️  找不到官方資料設定檔: {self.config_path}")
+            return []
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("cities", [])
+
+    @staticmethod
+    def _entry_aliases(entry: Dict[str, Any]) -> List[str]:
+        names = [entry["city"], entry.get("slug") or entry["city"], *entry.get("aliases", [])]
+        return [normalize_city(name) for name in names]
+
+    def load(self, cities: Optional[Iterable[str]] = None, rebuild: bool = False) -> "DatasetRegistry":
+        """
+        依設定檔載入縣市（設定檔不存在時登錄表為空）
+
+        Args:
+            cities: 只載入這些縣市（名稱或別名，None 代表全部）
+            rebuild: 共用檔一律重新建置（需指定 shared_dir）
+
+        Returns:
+            self（方便串接）
+        """
+        wanted = {normalize_city(city) for city in cities} if cities is not None else None
+
+        datasets = {}
+        aliases = {}
+        for entry in self._read_config():
+            if wanted is not None and wanted.isdisjoint(self._entry_aliases(entry)):
+                continue
+            dataset = self._load_city(entry, rebuild=rebuild)
+            datasets[dataset.city] = dataset
+            for alias in self._entry_aliases(entry):
+                aliases[alias] = dataset.city
+            logger.info(
+                f"✓ {dataset.city}: {len(dataset.certified)} 筆官方認證、"
+                f"{len(dataset.inspection)} 筆稽查不合格"
+            )
+
+        self._datasets = datasets
+        self._aliases = aliases
+        self._address_aliases = sorted(aliases.items(), key=lambda item: len(item[0]), reverse=True)
+        # 舊資料的比對結果與名單索引不再使用
+        clear_match_cache()
+        return self
+
+    def resolve(self, city: Optional[str]) -> Optional[str]:
+        """將城市名稱或別名轉為登錄表中的縣市名稱，找不到時回傳 None"""
+        return self._aliases.get(normalize_city(city))
+
+    def get(self, city: Optional[str]) -> Optional[CityDataset]:
+        """取得縣市的官方資料，該縣市沒有資料時回傳 None"""
+        resolved = self.resolve(city)
+        return self._datasets.get(resolved) if resolved else None
+
+    def for_address(self, address: Optional[str]) -> Optional[CityDataset]:
+        """
+        依地址中的縣市名稱或別名取得官方資料（供沒有 city 欄位的附近搜尋使用）
+
+        中文別名只要出現在地址中即可；英文別名需與地址的某一段（逗號分隔、去除郵遞區號）
+        完全相同，避免「taipei」誤中「New Taipei City」。
+        """
+        normalized = normalize_city(address)
+        if not normalized:
+            return None
+        parts = None
+        for alias, city in self._address_aliases:
+            if alias.isascii():
+                if parts is None:
+                    parts = _address_parts(normalized)
+                if alias in parts:
+                    return self._datasets[city]
+            elif alias in normalized:
+                return self._datasets[city]
+        return None
+
+
+# ====================
+# 進入點
+# ====================
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="建置各縣市官方資料共用檔（{slug}.shm）")
+    parser.add_argument("cities", nargs="*", help="縣市名稱或別名（預設為設定檔中所有縣市）")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="官方資料設定檔")
+    parser.add_argument("--base-dir", default=".", help="設定檔中相對路徑的基準目錄")
+    parser.add_argument(
+        "--dir", default=os.getenv("SHARED_DATASET_DIR", DEFAULT_SHARED_DIR), help="共用檔輸出目錄"
+    )
+    args = parser.parse_args(argv)
+
+    registry = DatasetRegistry(args.config, base_dir=args.base_dir, shared_dir=args.dir)
+    registry.load(args.cities or None, rebuild=True)
+    if args.cities and not registry.cities:
+        raise SystemExit(f"✗ 設定檔中沒有這些縣市: {', '.join(args.cities)}")
+    for city in registry.cities:
+        dataset = registry.get(city)
+        path = os.path.join(args.dir, f"{dataset.slug}.shm")
+        print(
+            f"✓ {city}: 官方認證 {len(dataset.certified)} 筆、稽查不合格 {len(dataset.inspection)} 筆"
+            f" → {path}（{os.path.getsize(path):,} bytes）"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+api/deadline.py
+請求整體時限（deadline）
+
+在請求開始時設定時限，之後呼叫的 Places client 會自動以剩餘時間作為逾時上限，
+時限已到時直接拋出 DeadlineExceeded，不再呼叫上游。
+
+使用方式：
+    @app.route("/api/search", methods=["POST"])
+    @with_deadline(8.0)
+    def search_restaurants():
+        ...
+
+    # 或手動設定
+    token = start_deadline(8.0)
+    try:
+        ...                       # 期間的 Places 呼叫都受此時限約束
+    finally:
+        reset_deadline(token)
+
+時限存放於 contextvars，與 api.metrics 的 trace 相同，不需逐層傳遞參數。
+"""
+
+import contextvars
+import functools
+import time
+from typing import Callable, Optional
+
+
+class DeadlineExceeded(Exception):
+    """請求時限已到"""
+
+    pass
+
+
+class Deadline:
+    """單一請求的時限"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: float) -> float:
+        """
+        取得本次呼叫可用的逾時秒數（不超過 default）
+
+        Raises:
+            DeadlineExceeded: 時限已到
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"已超過 {self.seconds:g} 秒時限")
+        return min(default, remaining)
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "haoshiji_deadline", default=None
+)
+
+
+def start_deadline(seconds: Optional[float]) -> contextvars.Token:
+    """設定目前請求的時限（seconds 為 None 或 <= 0 代表不限時）"""
+    deadline = Deadline(seconds) if seconds and seconds > 0 else None
+    return _current_deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """目前請求的時限（未設定時為 None）"""
+    return _current_deadline.get()
+
+
+def with_deadline(seconds: Optional[float]) -> Callable:
+    """view 裝飾器：整個請求受 seconds 秒時限約束"""
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = start_deadline(seconds)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                reset_deadline(token)
+
+        return wrapper
+
+    return decorator
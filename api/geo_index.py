@@ -0,0 +1,153 @@
+"""
+api/geo_index.py
+已分析餐廳的記憶體空間索引
+
+功能：
+1. 以固定大小經緯度網格（類 geohash）索引已分析過的餐廳
+2. 查詢指定座標半徑內的餐廳，並依 api.ranking 排序（可只取前 k 筆）
+3. 支援即時新增 / 更新（同一間餐廳以 place_id 去重）
+
+網格大小約為常見搜尋半徑，查詢時只需檢查圓形外接矩形涵蓋的少數格子。
+"""
+
+import math
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from api.ranking import rank, top_k
+from api.review_store import place_key
+
+
+# ====================
+# 常數定義
+# ====================
+# 網格大小（度），0.005 度約 550 公尺
+DEFAULT_CELL_SIZE = 0.005
+
+# 每一緯度的距離（公尺）
+METERS_PER_DEGREE = 111320.0
+
+EARTH_RADIUS_METERS = 6371000.0
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """計算兩點間的球面距離（公尺）"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """
+    餐廳空間索引（執行緒安全）
+
+    使用方式：
+        index = GeoIndex()
+        index.add_many(restaurants)
+        results = index.nearby(25.04, 121.51, radius=500)
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Dict[str, Dict[str, Any]]] = {}
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """依 place_key 取得已索引的餐廳（不存在時回傳 None）"""
+        with self._lock:
+            cell = self._locations.get(key)
+            return None if cell is None else self._cells[cell].get(key)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def add_many(self, restaurants: Iterable[Dict[str, Any]]) -> int:
+        """
+        新增或更新餐廳（缺少座標或 safety_analysis 者略過）
+
+        Returns:
+            實際加入的筆數
+        """
+        added = 0
+        with self._lock:
+            for restaurant in restaurants:
+                lat = restaurant.get("lat")
+                lng = restaurant.get("lng")
+                if lat is None or lng is None or "safety_analysis" not in restaurant:
+                    continue
+
+                key = place_key(restaurant)
+                old_cell = self._locations.get(key)
+                if old_cell is not None:
+                    self._cells[old_cell].pop(key, None)
+
+                cell = self._cell_of(lat, lng)
+                self._cells.setdefault(cell, {})[key] = restaurant
+                self._locations[key] = cell
+                added += 1
+        return added
+
+    def within(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+    ) -> List[Dict[str, Any]]:
+        """
+        查詢半徑內的餐廳（未排序）
+
+        Args:
+            lat: 中心點緯度
+            lng: 中心點經度
+            radius: 半徑（公尺）
+
+        Returns:
+            餐廳清單（每筆附 distance_m 欄位）
+        """
+        d_lat = radius / METERS_PER_DEGREE
+        d_lng = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        min_row, min_col = self._cell_of(lat - d_lat, lng - d_lng)
+        max_row, max_col = self._cell_of(lat + d_lat, lng + d_lng)
+
+        results = []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    for restaurant in self._cells.get((row, col), {}).values():
+                        distance = haversine_meters(lat, lng, restaurant["lat"], restaurant["lng"])
+                        if distance <= radius:
+                            results.append({**restaurant, "distance_m": round(distance, 1)})
+        return results
+
+    def nearby(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        查詢半徑內的餐廳並排序
+
+        Args:
+            lat: 中心點緯度
+            lng: 中心點經度
+            radius: 半徑（公尺）
+            limit: 只回傳排序後第 offset 筆起的 limit 筆（省略時回傳全部）
+            offset: 略過前幾筆
+
+        Returns:
+            依 api.ranking 排序的餐廳清單（每筆附 distance_m 欄位）
+        """
+        results = self.within(lat, lng, radius)
+        if limit is None:
+            return rank(results)[offset:]
+        return top_k(results, limit, offset)
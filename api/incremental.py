@@ -0,0 +1,236 @@
+"""
+api/incremental.py
+增量離線分類（只重新分類有變動的餐廳）
+
+以 manifest 記錄每家餐廳的輸入雜湊（名稱 + 地址 + 評論），以及分類當時的
+官方資料版本、關鍵字規則版本與官方資料比對模式（MATCH_MODE）：
+    - 官方資料、關鍵字規則或比對模式變更 → 全部重新分類
+    - 否則只重新分類新增或輸入有變動的餐廳，其餘沿用上次的結果
+    - 輸入中已不存在的餐廳從輸出中移除
+結果與 process_all_restaurants 相同（同樣依 api.ranking 排序後寫出）。
+
+餐廳以 place_id 識別；沒有 place_id 時以名稱 + 地址識別（同名連鎖店的各分店不會互相沿用）。
+仍無法區分的重複餐廳一律重新分類，不沿用也不寫入 manifest。
+
+使用方式（CLI）：
+    python -m api.incremental              # 增量
+    python -m api.incremental --full       # 忽略 manifest，全部重新分類
+
+manifest 預設存放在輸出檔旁（safety_classified.json → safety_classified.manifest.json）。
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from collections import Counter
+from typing import List, Dict, Any, Callable, Optional
+
+from api.classifier import MATCH_MODE, classify_restaurant, get_rules, load_certified_restaurants, load_inspection_failed
+from api.ranking import rank
+from api.serialization import dump_file, loads
+
+
+# ====================
+# 常數定義
+# ====================
+# manifest 格式或分類輸出欄位變更時遞增（舊 manifest 一律視為失效）
+MANIFEST_VERSION = 2
+
+DEFAULT_INPUT_PATH = "data/raw/places_with_reviews.json"
+DEFAULT_OUTPUT_PATH = "data/processed/safety_classified.json"
+DEFAULT_CERTIFICATION_CSV = "data/external/certified_restaurants.csv"
+DEFAULT_INSPECTION_JSON = "scraper/food_business_data.json"
+
+
+def input_hash(restaurant: Dict[str, Any]) -> str:
+    """餐廳輸入內容的雜湊（名稱、地址、評論作者 / 時間 / 評分 / 內文）"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{restaurant.get('name', '')}\x1f{restaurant.get('formatted_address', '')}\x1e".encode("utf-8"))
+    for review in restaurant.get("reviews") or []:
+        author = review.get("author_name") or review.get("author") or ""
+        h.update(
+            f"{author}\x1f{review.get('time', '')}\x1f{review.get('rating', '')}\x1f{review.get('text', '')}\x1e".encode(
+                "utf-8"
+            )
+        )
+    return h.hexdigest()
+
+
+def dataset_version(*paths: str) -> str:
+    """官方資料檔的內容雜湊（檔案不存在時以空內容計算）"""
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(path.encode("utf-8") + b"\x00")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        h.update(b"\x1e")
+    return h.hexdigest()[:12]
+
+
+def entry_key(restaurant: Dict[str, Any]) -> str:
+    """manifest 中的餐廳識別（place_id，沒有時為名稱 + 地址）"""
+    place_id = restaurant.get("place_id")
+    if place_id:
+        return place_id
+    return f"name:{restaurant.get('name', '')}\x1f{restaurant.get('formatted_address', '')}"
+
+
+def _unique(keys: List[str]) -> set:
+    """只出現一次的 key（重複的 key 無法對應到單一餐廳）"""
+    return {key for key, count in Counter(keys).items() if count == 1}
+
+
+def default_manifest_path(output_path: str) -> str:
+    root, _ = os.path.splitext(output_path)
+    return f"{root}.manifest.json"
+
+
+def _load_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def _load_restaurants(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到爬蟲資料: {path}")
+    data = _load_json(path)
+    if isinstance(data, dict) and "restaurants" in data:
+        return data["restaurants"]
+    if isinstance(data, list):
+        return data
+    raise ValueError("資料格式錯誤：需要陣列或包含 'restaurants' key 的字典")
+
+
+def reclassify_incremental(
+    input_path: str = DEFAULT_INPUT_PATH,
+    output_path: str = DEFAULT_OUTPUT_PATH,
+    certification_csv_path: str = DEFAULT_CERTIFICATION_CSV,
+    inspection_json_path: str = DEFAULT_INSPECTION_JSON,
+    manifest_path: Optional[str] = None,
+    full: bool = False,
+    pretty: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    增量分類並更新輸出檔與 manifest
+
+    Args:
+        input_path: 爬蟲資料 JSON 路徑
+        output_path: 分類結果 JSON 路徑（既有結果會被沿用）
+        certification_csv_path: 官方評核 CSV 路徑
+        inspection_json_path: 稽查不合格 JSON 路徑
+        manifest_path: manifest 路徑（預設為輸出檔旁）
+        full: 忽略 manifest，全部重新分類
+        pretty: 輸出是否縮排
+        progress: 進度回呼 progress(已重新分類數, 需重新分類總數)
+
+    Returns:
+        {"total", "reclassified", "reused", "removed", "full", "seconds"}
+    """
+    started = time.perf_counter()
+    manifest_path = manifest_path or default_manifest_path(output_path)
+    versions = {
+        "manifest_version": MANIFEST_VERSION,
+        "dataset_version": dataset_version(certification_csv_path, inspection_json_path),
+        "rules_version": get_rules().version,
+        "match_mode": MATCH_MODE,
+    }
+
+    restaurants = _load_restaurants(input_path)
+    keys = [entry_key(r) for r in restaurants]
+    hashes = [input_hash(r) for r in restaurants]
+    unique = _unique(keys)
+
+    # 版本相同且上次的輸出仍在時才沿用
+    previous: Dict[str, Dict[str, Any]] = {}
+    old_hashes: Dict[str, str] = {}
+    if not full and os.path.exists(manifest_path) and os.path.exists(output_path):
+        manifest = _load_json(manifest_path)
+        if all(manifest.get(k) == v for k, v in versions.items()):
+            old_hashes = manifest.get("entries", {})
+            outputs = _load_restaurants(output_path)
+            output_keys = [entry_key(r) for r in outputs]
+            reusable = _unique(output_keys)
+            previous = {key: r for key, r in zip(output_keys, outputs) if key in reusable}
+    full = not old_hashes
+
+    def reusable_entry(i: int) -> bool:
+        key = keys[i]
+        return key in unique and key in previous and old_hashes.get(key) == hashes[i]
+
+    todo = [i for i in range(len(restaurants)) if not reusable_entry(i)]
+
+    classified: List[Optional[Dict[str, Any]]] = [None] * len(restaurants)
+    for i, key in enumerate(keys):
+        if reusable_entry(i):
+            classified[i] = previous[key]
+
+    if todo:
+        # 只有需要重新分類時才載入官方資料
+        certified = (
+            load_certified_restaurants(certification_csv_path) if os.path.exists(certification_csv_path) else {}
+        )
+        inspection = load_inspection_failed(inspection_json_path)
+        for n, i in enumerate(todo, 1):
+            classified[i] = classify_restaurant(restaurants[i], certified, inspection)
+            if progress is not None and (n % 10 == 0 or n == len(todo)):
+                progress(n, len(todo))
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    dump_file(rank(classified), output_path, pretty=pretty)
+
+    # manifest 最後寫入（寫到一半中斷時，下次會重新分類而不是沿用不完整的結果）
+    tmp_path = manifest_path + ".tmp"
+    entries = {key: digest for key, digest in zip(keys, hashes) if key in unique}
+    dump_file({**versions, "entries": entries}, tmp_path)
+    os.replace(tmp_path, manifest_path)
+
+    current = set(keys)
+    return {
+        "total": len(restaurants),
+        "reclassified": len(todo),
+        "reused": len(restaurants) - len(todo),
+        "removed": sum(1 for key in previous if key not in current),
+        "full": full,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ====================
+# 進入點
+# ====================
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="增量離線分類")
+    parser.add_argument("--input", default=DEFAULT_INPUT_PATH, help="爬蟲資料 JSON")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="分類結果 JSON")
+    parser.add_argument("--certification", default=DEFAULT_CERTIFICATION_CSV, help="官方評核 CSV")
+    parser.add_argument("--inspection", default=DEFAULT_INSPECTION_JSON, help="稽查不合格 JSON")
+    parser.add_argument("--manifest", default=None, help="manifest 路徑（預設為輸出檔旁）")
+    parser.add_argument("--full", action="store_true", help="全部重新分類")
+    parser.add_argument("--pretty", action="store_true", help="輸出縮排")
+    args = parser.parse_args(argv)
+
+    stats = reclassify_incremental(
+        input_path=args.input,
+        output_path=args.output,
+        certification_csv_path=args.certification,
+        inspection_json_path=args.inspection,
+        manifest_path=args.manifest,
+        full=args.full,
+        pretty=args.pretty,
+    )
+    mode = "全部重新分類" if stats["full"] else "增量"
+    print(
+        f"✓ {mode}: 共 {stats['total']} 家，重新分類 {stats['reclassified']}、"
+        f"沿用 {stats['reused']}、移除 {stats['removed']}（{stats['seconds']} 秒）"
+    )
+    print(f"✓ 已儲存至: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
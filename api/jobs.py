@@ -0,0 +1,642 @@
+"""
+api/jobs.py
+背景工作佇列（SQLite）
+
+將批次重新分類、稽查資料爬蟲、官方資料重建等耗時工作移出 web 請求，
+由獨立的 worker 程序執行；web app 只負責排入工作與查詢進度（見 /admin/jobs）。
+
+功能：
+1. 工作存放在 SQLite（多個 worker 程序以 BEGIN IMMEDIATE 搶工作，同一工作只會被一個 worker 執行）
+2. 執行中回報進度（done / total / message）；worker 在背景持續送出 heartbeat，逾時視為中斷並重新排入
+3. 失敗自動重試（指數退避），超過 max_attempts 次標記為 failed
+4. 排隊中的工作可直接取消；執行中的工作在下一次回報進度時中止
+
+工作種類（見 HANDLERS）：
+    classify_all: 離線重新分類（api.classifier.process_all_restaurants；incremental=true 時走 api.incremental）
+    index_reviews: 匯入評論到評論索引（api.review_store）
+    build_tiles: 重新產生行政區 / 網格風險統計（api.tiles）
+    build_datasets: 重建各縣市官方資料的共用 mmap 檔（api.datasets）
+    scrape_inspection: 稽查資料爬蟲（api.scraper，需要 selenium）
+
+使用方式：
+    python -m api.jobs worker --processes 2          # 啟動 worker 程序
+    python -m api.jobs enqueue classify_all --param pretty=true
+    python -m api.jobs list
+
+    queue = JobQueue("data/store/jobs.db")
+    job_id = queue.enqueue("build_tiles", {})
+    queue.get(job_id)["status"]
+
+環境變數：
+    JOBS_DB_PATH: 佇列檔案路徑（預設 data/store/jobs.db）
+    JOB_MAX_ATTEMPTS: 預設最多嘗試次數（預設 3）
+    JOB_RETRY_BASE: 重試退避基準秒數（第 n 次失敗後等待 base * 2^(n-1) 秒，預設 30）
+    JOB_LEASE_SECONDS: 超過此秒數未回報 heartbeat 視為 worker 中斷（預設 600）
+    JOB_POLL_INTERVAL: worker 無工作時的輪詢間隔秒數（預設 2）
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from typing import List, Dict, Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+
+logger = logging.getLogger("haoshiji.jobs")
+
+
+# ====================
+# 常數定義
+# ====================
+DEFAULT_JOBS_PATH = os.getenv("JOBS_DB_PATH", "data/store/jobs.db")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "30"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+# 進度寫入資料庫的最短間隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    progress_done INTEGER,
+    progress_total INTEGER,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, run_after);
+"""
+
+
+class JobCancelled(Exception):
+    """工作已被取消（由進度回報時拋出）"""
+
+    pass
+
+
+class JobQueue:
+    """
+    SQLite 工作佇列（執行緒安全，每個執行緒各自開啟連線）
+
+    Args:
+        path: SQLite 檔案路徑
+    """
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：自行控制交易（搶工作時需要 BEGIN IMMEDIATE）
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # --------------------
+    # 排入 / 查詢
+    # --------------------
+    def enqueue(
+        self,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        排入工作
+
+        Raises:
+            KeyError: 工作種類不存在
+
+        Returns:
+            工作 id
+        """
+        if kind not in HANDLERS:
+            raise KeyError(kind)
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            INSERT INTO jobs (kind, params, status, max_attempts, created_at, run_after)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (kind, json.dumps(params or {}, ensure_ascii=False), STATUS_QUEUED, max(max_attempts, 1), now, now),
+        )
+        return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的工作（新到舊）"""
+        if status:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """各狀態的工作數"""
+        rows = self._connection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        取消工作：排隊中直接取消，執行中則要求 worker 中止
+
+        Returns:
+            是否有工作被取消（或已要求中止）
+        """
+        conn = self._connection()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED),
+        )
+        if cursor.rowcount:
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, STATUS_RUNNING),
+        )
+        return bool(cursor.rowcount)
+
+    # --------------------
+    # worker 使用
+    # --------------------
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        取得下一個可執行的工作（並標記為執行中）；沒有工作時回傳 None
+
+        heartbeat 逾時的執行中工作（worker 中斷）會先重新排入或標記為失敗。
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = now - JOB_LEASE_SECONDS
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, finished_at = ?, error = 'worker 中斷，已超過重試次數'
+                WHERE status = ? AND heartbeat_at < ? AND attempts >= max_attempts
+                """,
+                (STATUS_FAILED, now, STATUS_RUNNING, expired),
+            )
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, worker = NULL, message = 'worker 中斷，重新排入'
+                WHERE status = ? AND heartbeat_at < ?
+                """,
+                (STATUS_QUEUED, STATUS_RUNNING, expired),
+            )
+            row = conn.execute(
+                """
+                SELECT * FROM jobs WHERE status = ? AND run_after <= ?
+                ORDER BY run_after, id LIMIT 1
+                """,
+                (STATUS_QUEUED, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?,
+                        started_at = ?, heartbeat_at = ?, error = NULL
+                    WHERE id = ?
+                    """,
+                    (STATUS_RUNNING, worker, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    # 以下更新只在工作仍由該 worker 執行中時生效：heartbeat 逾時後工作可能已被重新排入、
+    # 由其他 worker 取得，原 worker 遲來的回報不可覆蓋新的執行狀態
+
+    def heartbeat(
+        self,
+        job_id: int,
+        worker: str,
+        done: Optional[int] = None,
+        total: Optional[int] = None,
+        message: Optional[str] = None,
+    ) -> bool:
+        """
+        回報進度
+
+        Returns:
+            是否應停止執行（已被要求取消，或工作已不屬於此 worker）
+        """
+        conn = self._connection()
+        cursor = conn.execute(
+            """
+            UPDATE jobs SET heartbeat_at = ?,
+                progress_done = COALESCE(?, progress_done),
+                progress_total = COALESCE(?, progress_total),
+                message = COALESCE(?, message)
+            WHERE id = ? AND worker = ? AND status = ?
+            """,
+            (time.time(), done, total, message, job_id, worker, STATUS_RUNNING),
+        )
+        if not cursor.rowcount:
+            return True
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def complete(self, job_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """記錄完成，回傳是否生效（工作已不屬於此 worker 時為 False）"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (
+                STATUS_DONE,
+                json.dumps(result, ensure_ascii=False, default=str),
+                time.time(),
+                job_id,
+                worker,
+                STATUS_RUNNING,
+            ),
+        )
+        return bool(cursor.rowcount)
+
+    def mark_cancelled(self, job_id: int, worker: str) -> bool:
+        """記錄已取消，回傳是否生效（工作已不屬於此 worker 時為 False）"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (STATUS_CANCELLED, time.time(), job_id, worker, STATUS_RUNNING),
+        )
+        return bool(cursor.rowcount)
+
+    def fail(self, job_id: int, worker: str, error: str) -> Optional[str]:
+        """
+        記錄失敗：尚有重試次數時延後重新排入，否則標記為 failed
+
+        Returns:
+            更新後的狀態（工作已不屬於此 worker 時為 None）
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+            (job_id, worker, STATUS_RUNNING),
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row["attempts"] < row["max_attempts"]:
+            delay = JOB_RETRY_BASE * (2 ** (row["attempts"] - 1))
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = ?, worker = NULL, run_after = ?
+                WHERE id = ? AND worker = ? AND status = ?
+                """,
+                (STATUS_QUEUED, error, now + delay, job_id, worker, STATUS_RUNNING),
+            )
+            return STATUS_QUEUED
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (STATUS_FAILED, error, now, job_id, worker, STATUS_RUNNING),
+        )
+        return STATUS_FAILED
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+# ====================
+# 工作內容
+# ====================
+class JobContext:
+    """
+    傳給工作函式的執行環境（回報進度用）
+
+    progress() 最多每 PROGRESS_INTERVAL 秒寫入一次資料庫；
+    工作被取消（或已不屬於此 worker）時拋出 JobCancelled。
+    """
+
+    def __init__(self, queue: JobQueue, job: Dict[str, Any]):
+        self.queue = queue
+        self.job = job
+        self._reported_at = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        last = total is not None and done >= total
+        if not last and now - self._reported_at < PROGRESS_INTERVAL:
+            return
+        self._reported_at = now
+        if self.queue.heartbeat(self.job["id"], self.job["worker"], done, total, message):
+            raise JobCancelled()
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any], JobContext], Optional[Dict[str, Any]]]] = {}
+
+
+def handler(kind: str) -> Callable:
+    """註冊工作種類"""
+
+    def decorator(fn: Callable) -> Callable:
+        HANDLERS[kind] = fn
+        return fn
+
+    return decorator
+
+
+@handler("classify_all")
+def run_classify_all(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    output_path = params.get("output_path", "data/processed/safety_classified.json")
+    paths = dict(
+        input_path=params.get("input_path", "data/raw/places_with_reviews.json"),
+        output_path=output_path,
+        certification_csv_path=params.get("certification_csv_path", "data/external/certified_restaurants.csv"),
+        inspection_json_path=params.get("inspection_json_path", "scraper/food_business_data.json"),
+        pretty=bool(params.get("pretty", False)),
+        progress=lambda done, total: ctx.progress(done, total, "分類中"),
+    )
+    if params.get("incremental"):
+        # 只重新分類有變動的餐廳（api.incremental）
+        from api.incremental import reclassify_incremental
+
+        stats = reclassify_incremental(**paths)
+        return {**stats, "restaurants": stats["total"], "output_path": output_path}
+
+    from api.classifier import process_all_restaurants
+
+    classified = process_all_restaurants(**paths)
+    return {"restaurants": len(classified), "output_path": output_path}
+
+
+@handler("index_reviews")
+def run_index_reviews(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    from api import review_store
+
+    paths = params.get("paths") or ["data/raw/places_with_reviews.json"]
+    inserted = 0
+    with review_store.connect(params.get("db_path", review_store.DEFAULT_DB_PATH)) as conn:
+        for i, path in enumerate(paths, 1):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            restaurants = data["restaurants"] if isinstance(data, dict) else data
+            inserted += review_store.index_restaurants(conn, restaurants)
+            ctx.progress(i, len(paths), path)
+    return {"inserted": inserted}
+
+
+@handler("build_tiles")
+def run_build_tiles(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    from api.tiles import write_risk_tiles
+
+    output_path = params.get("output_path", "data/processed/risk_tiles.json")
+    tiles = write_risk_tiles(params.get("input_path", "data/processed/safety_classified.json"), output_path)
+    return {"districts": len(tiles["districts"]), "cells": len(tiles["cells"]), "output_path": output_path}
+
+
+@handler("build_datasets")
+def run_build_datasets(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    from api.datasets import DEFAULT_SHARED_DIR, DatasetRegistry
+
+    registry = DatasetRegistry(
+        params.get("config", "data/external/datasets.json"),
+        base_dir=params.get("base_dir", "."),
+        shared_dir=params.get("shared_dir", os.getenv("SHARED_DATASET_DIR", DEFAULT_SHARED_DIR)),
+    ).load()
+    return {"cities": registry.cities}
+
+
+@handler("scrape_inspection")
+def run_scrape_inspection(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    from api.scraper import FoodSafetyDataScraper
+
+    output_path = params.get("output_path", "scraper/food_business_data.json")
+    scraper = FoodSafetyDataScraper()
+    try:
+        ctx.progress(0, None, "爬取中")
+        scraper.scrape_all_categories(manual_mode=False)
+        if not scraper.all_data:
+            raise RuntimeError("沒有抓取到任何資料")
+        scraper.save_to_json(output_path)
+    finally:
+        scraper.close()
+    return {"records": len(scraper.all_data), "output_path": output_path}
+
+
+# ====================
+# Worker
+# ====================
+class Worker:
+    """
+    工作執行者（一次執行一個工作）
+
+    Args:
+        queue: 工作佇列
+        name: worker 名稱（預設為 主機名稱:pid:執行緒）
+        poll_interval: 無工作時的輪詢間隔秒數
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        name: Optional[str] = None,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def run_once(self) -> bool:
+        """
+        執行一個工作
+
+        Returns:
+            是否有取得工作
+        """
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+
+        job_id = job["id"]
+        logger.info(f"▶️  工作 #{job_id} {job['kind']}（第 {job['attempts']} 次）")
+        started = time.perf_counter()
+
+        # 工作本身不回報進度時也持續送出 heartbeat，避免被誤判為中斷
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job_id, done), daemon=True)
+        beat.start()
+        try:
+            result = HANDLERS[job["kind"]](job["params"], JobContext(self.queue, job))
+        except JobCancelled:
+            if self.queue.mark_cancelled(job_id, self.name):
+                logger.info(f"⏹️  工作 #{job_id} 已取消")
+            else:
+                logger.warning(f"⚠️  工作 #{job_id} 已被其他 worker 接手，停止執行")
+        except Exception as e:
+            status = self.queue.fail(job_id, self.name, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}")
+            if status is None:
+                logger.warning(f"⚠️  工作 #{job_id} 失敗，但已被其他 worker 接手，不記錄結果: {e}")
+            else:
+                logger.warning(f"⚠️  工作 #{job_id} 失敗（{'稍後重試' if status == STATUS_QUEUED else '不再重試'}）: {e}")
+        else:
+            if self.queue.complete(job_id, self.name, result):
+                logger.info(f"✓ 工作 #{job_id} 完成（{time.perf_counter() - started:.1f} 秒）")
+            else:
+                logger.warning(f"⚠️  工作 #{job_id} 已被其他 worker 接手，不記錄結果")
+        finally:
+            done.set()
+            beat.join()
+        return True
+
+    def _heartbeat(self, job_id: int, done: threading.Event) -> None:
+        while not done.wait(JOB_LEASE_SECONDS / 4):
+            try:
+                self.queue.heartbeat(job_id, self.name)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  工作 #{job_id} heartbeat 失敗: {e}")
+
+    def run_forever(self) -> None:
+        """持續執行，直到呼叫 stop()"""
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.warning(f"⚠️  worker 錯誤: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def start_background(queue: JobQueue) -> Worker:
+    """在背景執行緒啟動 worker（單一程序部署用）"""
+    worker = Worker(queue)
+    thread = threading.Thread(target=worker.run_forever, name="haoshiji-jobs", daemon=True)
+    thread.start()
+    return worker
+
+
+def _worker_process(path: str, poll_interval: float) -> None:
+    Worker(JobQueue(path), poll_interval=poll_interval).run_forever()
+
+
+def run_workers(path: str, processes: int, poll_interval: float = JOB_POLL_INTERVAL) -> None:
+    """啟動多個 worker 程序（前景執行，Ctrl+C 結束）"""
+    if processes <= 1:
+        _worker_process(path, poll_interval)
+        return
+
+    children = [
+        multiprocessing.Process(target=_worker_process, args=(path, poll_interval), name=f"haoshiji-jobs-{i}")
+        for i in range(processes)
+    ]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+
+
+# ====================
+# 進入點
+# ====================
+def _parse_param(text: str) -> tuple:
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_dotenv()
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    parser = argparse.ArgumentParser(description="背景工作佇列")
+    parser.add_argument("--db", default=DEFAULT_JOBS_PATH, help="佇列 SQLite 檔案路徑")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = sub.add_parser("worker", help="啟動 worker")
+    worker_parser.add_argument("--processes", type=int, default=1, help="worker 程序數")
+    worker_parser.add_argument("--poll", type=float, default=JOB_POLL_INTERVAL, help="輪詢間隔秒數")
+
+    enqueue_parser = sub.add_parser("enqueue", help="排入工作")
+    enqueue_parser.add_argument("kind", choices=sorted(HANDLERS))
+    enqueue_parser.add_argument("--param", action="append", default=[], help="key=value（value 可為 JSON）")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=JOB_MAX_ATTEMPTS)
+
+    list_parser = sub.add_parser("list", help="列出最近的工作")
+    list_parser.add_argument("--status", default=None)
+    list_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        run_workers(args.db, args.processes, args.poll)
+        return
+
+    queue = JobQueue(args.db)
+    if args.command == "enqueue":
+        params = dict(_parse_param(p) for p in args.param)
+        job_id = queue.enqueue(args.kind, params, max_attempts=args.max_attempts)
+        print(f"✓ 已排入工作 #{job_id} {args.kind}")
+        return
+
+    for job in queue.list(args.status, args.limit):
+        progress = ""
+        if job["progress_total"]:
+            progress = f" {job['progress_done'] or 0}/{job['progress_total']}"
+        print(f"#{job['id']:<5} {job['kind']:<18} {job['status']:<10} 嘗試 {job['attempts']}/{job['max_attempts']}{progress}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+api/matching.py
+官方名單名稱比對索引（供 fuzzy_match_certification 使用）
+
+fuzzy_match_certification 的策略 2、3 原本每次都逐筆掃描整份名單並重新清理名稱。
+本模組為每份名單建一次索引：
+    - 清理後名稱 → 第一筆出現的位置（策略 2 直接查表）
+    - 清理後名稱的字元 bigram 倒排索引（策略 3 只檢查可能有包含關係的候選）
+
+候選篩選（策略 3 的三種包含關係）：
+    - 查詢包含於官方名稱（含去掉「-」後）：官方名稱需含有查詢的每一個 bigram
+    - 官方名稱包含於查詢：官方名稱的每一個 bigram 都需出現在查詢中
+    - 清理後少於 2 個字的官方名稱沒有 bigram，一律列為候選
+候選依原名單順序回傳，呼叫端以原本的條件逐一檢查，第一筆符合的結果與全表掃描相同；
+查詢清理後少於 2 個字時無法篩選，回傳全表。
+
+比對結果快取（MATCH_CACHE）：
+    連鎖店名稱在不同搜尋中反覆出現，fuzzy_match_certification 的結果以 LRU 快取保存
+    （含未命中）。key 為（名單版本, 名稱, 地址中出現的行政區）：
+        - 名單版本：每建一次索引遞增，資料重新載入後舊結果不會再被命中
+        - 名稱：維持原字串（策略 1 以原名稱查表，去空白等正規化會改變結果）
+        - 地址：比對只用到地址是否為空與其中出現哪些行政區，同區不同門牌共用同一筆
+    命中率記錄在 /metrics 的 haoshiji_cache_requests_total{cache="official_match"}；
+    DatasetRegistry.load() 重新載入資料時會呼叫 clear_match_cache()。
+
+評分比對（MATCH_MODE=scored，見 api.classifier.scored_match_certification）：
+    不採用第一筆包含關係成立的紀錄，而是對候選逐一評分後取分數最高者：
+        - 候選：與查詢共用最多 bigram 的前 SCORE_CANDIDATES 筆（依倒排索引計數，不掃描全表）
+        - 名稱相似度 name_similarity：bigram Dice、編輯距離、詞組（以「-」、空白、括號切分）
+          重疊三者取最大；名稱不完全相同且較短一方少於 3 個字時依長度折減
+        - 信心分數 = 名稱相似度 x (0.7 + 0.3 x 地址一致度)，地址一致度：同區 1、未知 0.5、不同區 0
+
+使用方式：
+    index = get_match_index(certified_data)        # 同一份名單只建一次
+    MATCH_CACHE.lookup(match_cache_key(index, name, address, districts), lambda: ...)
+    index.exact(clean_name("某某餐廳"))            # 策略 2：名稱或 None
+    for pos in index.containment_candidates(clean_name("某某餐廳")):
+        cert_name, clean_cert = index.names[pos], index.cleaned[pos]
+
+共用檔（api.shared_datasets）：
+    建置共用檔時同時寫入各表的清理後名稱與 bigram 倒排索引（build_match_tables），
+    掛載後的 SharedTable 提供 match_tables()，MatchIndex 直接經由 mmap 讀取，
+    各 worker 不再於自己的記憶體中重建索引。
+
+備註：
+    名單視為唯讀；重新載入資料時請建立新的 dict（索引以物件身分與筆數判斷是否沿用）。
+
+環境變數：
+    MATCH_CACHE_SIZE: 比對結果快取筆數上限（預設 20000，0 為停用）
+"""
+
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from itertools import chain, count
+from typing import Any, Callable, List, Dict, Hashable, Optional, Sequence, Set, Tuple
+
+from api.metrics import record_cache
+
+
+# ====================
+# 常數定義
+# ====================
+# 比對前移除的常見後綴
+NAME_SUFFIXES = ["餐廳", "店", "門市", "分店", "旗艦店", "本店", "總店"]
+
+# 保留的索引數（各縣市的評核與稽查名單各一份）
+MATCH_INDEX_CAPACITY = 32
+
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "20000"))
+
+# 每建一次索引遞增，作為比對結果快取的名單版本
+_index_versions = count(1)
+
+# 評分比對：每筆查詢最多評分的候選數
+SCORE_CANDIDATES = int(os.getenv("MATCH_SCORE_CANDIDATES", "50"))
+
+# 詞組分隔（分店名常以「-」或括號接在品牌名後）
+TOKEN_SEPARATORS = re.compile(r"[-\s()（）·・/]+")
+
+
+def clean_name(name: str) -> str:
+    """清理名稱（移除常見後綴與空白）"""
+    result = name.strip()
+    for suffix in NAME_SUFFIXES:
+        result = result.replace(suffix, "")
+    return result.strip()
+
+
+def bigrams(text: str) -> Set[str]:
+    """字元 bigram 集合（少於 2 個字時為空集合）"""
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def build_match_tables(names: Sequence[str]) -> Dict[str, Any]:
+    """
+    建立名單索引的各部分（MatchIndex 與共用檔建置共用同一份邏輯）
+
+    Returns:
+        {
+            "cleaned": List[str],                  # 清理後名稱（依原名單順序）
+            "by_clean": Dict[str, int],            # 清理後名稱 → 第一筆出現的位置
+            "grams": Dict[str, List[int]],         # 清理後名稱的 bigram → 位置（「官方名稱包含於查詢」用）
+            "plain_grams": Dict[str, List[int]],   # 清理後再去掉「-」的 bigram → 位置（「查詢包含於官方名稱」用）
+            "gram_counts": List[int],              # 各筆清理後名稱的 bigram 數
+            "short": List[int],                    # 沒有 bigram 的位置
+        }
+        倒排串列內的位置皆為遞增順序。
+    """
+    cleaned = [clean_name(name) for name in names]
+    by_clean: Dict[str, int] = {}
+    grams: Dict[str, List[int]] = {}
+    plain_grams: Dict[str, List[int]] = {}
+    gram_counts: List[int] = []
+    short: List[int] = []
+
+    for pos, clean in enumerate(cleaned):
+        by_clean.setdefault(clean, pos)
+        name_grams = bigrams(clean)
+        gram_counts.append(len(name_grams))
+        if not name_grams:
+            short.append(pos)
+        for gram in name_grams:
+            grams.setdefault(gram, []).append(pos)
+        for gram in bigrams(clean.replace("-", "")):
+            plain_grams.setdefault(gram, []).append(pos)
+
+    return {
+        "cleaned": cleaned,
+        "by_clean": by_clean,
+        "grams": grams,
+        "plain_grams": plain_grams,
+        "gram_counts": gram_counts,
+        "short": short,
+    }
+
+
+class MatchIndex:
+    """
+    單一名單的比對索引
+
+    名單提供 match_tables()（共用檔掛載的 SharedTable）時直接使用檔案中的索引，
+    否則以 build_match_tables 在記憶體中建立。兩者介面相同：
+    名稱 / 清理後名稱為可依位置取值的序列，by_clean 與倒排索引支援 get()。
+    """
+
+    __slots__ = (
+        "source",
+        "size",
+        "version",
+        "names",
+        "cleaned",
+        "_record",
+        "_by_clean",
+        "_grams",
+        "_plain_grams",
+        "_gram_counts",
+        "_short",
+    )
+
+    def __init__(self, data: Mapping):
+        self.source = data
+        self.size = len(data)
+        self.version = next(_index_versions)
+
+        shared = getattr(data, "match_tables", None)
+        tables = shared() if shared is not None else None
+        if tables is None:
+            names = list(data)
+            tables = build_match_tables(names)
+            self.names: Sequence[str] = names
+            self._record: Callable[[int], Any] = lambda pos: data[names[pos]]
+        else:
+            self.names = tables["names"]
+            self._record = tables["record"]
+
+        self.cleaned: Sequence[str] = tables["cleaned"]
+        self._by_clean = tables["by_clean"]
+        self._grams = tables["grams"]
+        self._plain_grams = tables["plain_grams"]
+        self._gram_counts: Sequence[int] = tables["gram_counts"]
+        self._short: Sequence[int] = tables["short"]
+
+    def scoring_candidates(self, clean_query: str, limit: int = SCORE_CANDIDATES) -> List[int]:
+        """
+        評分比對的候選位置（共用 bigram 最多的前 limit 筆，加上清理後名稱完全相同者）
+
+        查詢清理後少於 2 個字時只回傳名稱完全相同者。
+        """
+        exact = self._by_clean.get(clean_query)
+        plain_grams = bigrams(clean_query.replace("-", ""))
+        counts = Counter(chain.from_iterable(self._plain_grams.get(gram, ()) for gram in plain_grams))
+        candidates = [pos for pos, _ in counts.most_common(limit)]
+        if exact is not None and exact not in candidates:
+            candidates.append(exact)
+        return candidates
+
+    def record(self, pos: int) -> Any:
+        """位置上的官方紀錄（等同 source[names[pos]]，共用檔不必再以名稱搜尋）"""
+        return self._record(pos)
+
+    def exact(self, clean_query: str) -> Optional[str]:
+        """清理後名稱完全相同的第一筆官方名稱"""
+        pos = self._by_clean.get(clean_query)
+        return None if pos is None else self.names[pos]
+
+    def containment_candidates(self, clean_query: str) -> Sequence[int]:
+        """
+        可能與查詢有包含關係的位置（依原名單順序）
+
+        Args:
+            clean_query: 清理後的查詢名稱
+
+        Returns:
+            位置序列；查詢清理後少於 2 個字（去掉「-」後）時為全表
+        """
+        plain_grams = bigrams(clean_query.replace("-", ""))
+        if not plain_grams:
+            return range(len(self.names))
+
+        # 查詢包含於官方名稱：取各 bigram 倒排串列的交集（由短的開始）
+        postings = sorted((self._plain_grams.get(gram, ()) for gram in plain_grams), key=len)
+        contains_query = set(postings[0])
+        for posting in postings[1:]:
+            if not contains_query:
+                break
+            contains_query.intersection_update(posting)
+
+        # 官方名稱包含於查詢：官方名稱的 bigram 全部出現在查詢中
+        counts = Counter(chain.from_iterable(self._grams.get(gram, ()) for gram in bigrams(clean_query)))
+        contained = [pos for pos, n in counts.items() if n == self._gram_counts[pos]]
+
+        contains_query.update(contained)
+        contains_query.update(self._short)
+        return sorted(contains_query)
+
+
+# ====================
+# 相似度
+# ====================
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Levenshtein 編輯距離
+
+    指定 max_distance 時，確定超過上限就提早結束並回傳 max_distance + 1。
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def tokens(name: str) -> Set[str]:
+    return {token for token in TOKEN_SEPARATORS.split(name) if token}
+
+
+def name_similarity(a: str, b: str, floor: float = 0.0) -> float:
+    """
+    清理後名稱的相似度（0～1）
+
+    bigram Dice、1 - 正規化編輯距離、詞組重疊（交集 / 較少的一方）取最大；
+    名稱不完全相同且較短一方少於 3 個字時依長度折減（避免「麵」之類的短名稱誤配）。
+
+    Args:
+        floor: 呼叫端只在意 >= floor 的分數；編輯距離不可能達到時略過不算
+    """
+    if a == b:
+        return 1.0 if a else 0.0
+    plain_a, plain_b = a.replace("-", ""), b.replace("-", "")
+    if not plain_a or not plain_b:
+        return 0.0
+
+    shortest, longest = sorted((len(plain_a), len(plain_b)))
+    penalty = shortest / 3 if shortest < 3 else 1.0
+
+    grams_a, grams_b = bigrams(plain_a), bigrams(plain_b)
+    dice = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) if grams_a and grams_b else 0.0
+    tokens_a, tokens_b = tokens(a), tokens(b)
+    token_set = len(tokens_a & tokens_b) / min(len(tokens_a), len(tokens_b)) if tokens_a and tokens_b else 0.0
+    score = max(dice, 0.95 * token_set)
+
+    # 編輯相似度需高於目前分數與 floor 才有意義，換算成可容許的最大距離
+    target = max(score, floor / penalty)
+    max_distance = int(longest * (1 - target) + 1e-9)
+    if target < 1 and longest - shortest <= max_distance:
+        distance = edit_distance(plain_a, plain_b, max_distance)
+        if distance <= max_distance:
+            score = max(score, 1 - distance / longest)
+    return score * penalty
+
+
+def address_agreement(query_address: str, record_address: str, districts: Sequence[str]) -> float:
+    """地址一致度：同一行政區 1、任一方無法判斷 0.5、不同行政區 0"""
+    query_district = next((d for d in districts if d in query_address), None) if query_address else None
+    record_district = next((d for d in districts if d in record_address), None) if record_address else None
+    if query_district is None or record_district is None:
+        return 0.5
+    return 1.0 if query_district == record_district else 0.0
+
+
+def match_confidence(name_score: float, address_score: float) -> float:
+    return name_score * (0.7 + 0.3 * address_score)
+
+
+# ====================
+# 索引快取
+# ====================
+_indexes: "OrderedDict[int, MatchIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_match_index(data: Mapping) -> MatchIndex:
+    """取得名單的比對索引（同一份名單只建一次，最多保留 MATCH_INDEX_CAPACITY 份）"""
+    key = id(data)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None and index.source is data and index.size == len(data):
+            _indexes.move_to_end(key)
+            return index
+
+    index = MatchIndex(data)
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MATCH_INDEX_CAPACITY:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_match_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
+
+
+# ====================
+# 比對結果快取
+# ====================
+_MISSING = object()
+
+
+class MatchCache:
+    """
+    比對結果 LRU 快取（含未命中結果）
+
+    Args:
+        maxsize: 筆數上限（0 為停用）
+        name: /metrics 中的 cache 標籤
+    """
+
+    def __init__(self, maxsize: int = MATCH_CACHE_SIZE, name: str = "official_match"):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """取得快取結果，沒有時回傳 _MISSING"""
+        if self.maxsize <= 0:
+            return _MISSING
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        record_cache(self.name, hit=value is not _MISSING)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def lookup(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """取得快取結果，沒有時呼叫 compute() 計算並存入（None 也會存入）"""
+        value = self.get(key)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """{"size", "maxsize", "hits", "misses", "hit_rate"}"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+MATCH_CACHE = MatchCache()
+
+
+def match_cache_key(
+    index: MatchIndex,
+    name: str,
+    address: str,
+    districts: Sequence[str],
+    custom_districts: bool = False,
+    mode: str = "first",
+) -> Tuple[Hashable, ...]:
+    """
+    比對結果快取的 key
+
+    地址只保留比對會用到的部分：是否為空，以及依 districts 順序出現在地址中的行政區。
+    呼叫端自訂 districts 時一併放入 key；不同比對模式（first / scored）各自快取。
+    """
+    present = tuple(d for d in districts if d in address) if address else None
+    return (index.version, mode, name, present, tuple(districts) if custom_districts else None)
+
+
+def clear_match_cache() -> None:
+    """清除比對結果快取與名單索引（官方資料重新載入時呼叫）"""
+    MATCH_CACHE.clear()
+    clear_match_indexes()
@@ -0,0 +1,282 @@
+"""
+api/metrics.py
+效能量測模組（Prometheus 指標 + 階段計時）
+
+功能：
+1. 輕量 Prometheus 指標（Counter / Histogram），以文字格式輸出供 /metrics 使用
+2. span()：量測每個處理階段耗時，寫入 haoshiji_stage_seconds 並記錄於當次請求的 trace
+3. 選用 OpenTelemetry：已安裝 opentelemetry-sdk 與 OTLP exporter
+   且設定 OTEL_EXPORTER_OTLP_ENDPOINT 時，span 也會匯出到 collector
+
+使用方式：
+    with span("places.details", place_id=place_id):
+        ...
+
+    UPSTREAM_SECONDS.observe(0.12, endpoint="details")
+    record_cache("places", hit=True)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # 未安裝 OpenTelemetry 時不匯出
+    otel_trace = None
+
+
+logger = logging.getLogger("haoshiji.metrics")
+
+
+# ====================
+# 常數定義
+# ====================
+# 預設 histogram 區間（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 回應大小區間（bytes）
+BYTES_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ====================
+# 指標類別
+# ====================
+class Counter:
+    """只增不減的計數器"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """累積區間分布（Prometheus histogram）"""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # key → [各區間計數..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        state = self._values.get(key)
+        return state[-1] if state else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    labels = _format_labels(self.label_names, key, f'le="{_format_number(float(bound))}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+                plain = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{plain} {_format_number(state[-2])}")
+                lines.append(f"{self.name}_count{plain} {state[-1]}")
+        return lines
+
+
+# ====================
+# 指標定義
+# ====================
+STAGE_SECONDS = Histogram(
+    "haoshiji_stage_seconds",
+    "Time spent in each processing stage",
+    labels=("stage",),
+)
+UPSTREAM_SECONDS = Histogram(
+    "haoshiji_upstream_request_seconds",
+    "Google Places API request latency",
+    labels=("endpoint", "outcome"),
+)
+UPSTREAM_SHORT_CIRCUITS = Counter(
+    "haoshiji_upstream_short_circuits_total",
+    "Google Places calls rejected by an open circuit breaker",
+    labels=("endpoint",),
+)
+STALE_RESPONSES = Counter(
+    "haoshiji_stale_responses_total",
+    "Expired cache entries served while refreshing (reason: expired / upstream_error)",
+    labels=("kind", "reason"),
+)
+CACHE_REQUESTS = Counter(
+    "haoshiji_cache_requests_total",
+    "Cache lookups by cache name and result (hit / miss)",
+    labels=("cache", "result"),
+)
+HTTP_REQUESTS = Counter(
+    "haoshiji_http_requests_total",
+    "HTTP requests by endpoint and status code",
+    labels=("endpoint", "status"),
+)
+RESPONSE_BYTES = Histogram(
+    "haoshiji_response_bytes",
+    "HTTP response body size",
+    labels=("endpoint",),
+    buckets=BYTES_BUCKETS,
+)
+
+REGISTRY = [
+    STAGE_SECONDS,
+    UPSTREAM_SECONDS,
+    UPSTREAM_SHORT_CIRCUITS,
+    STALE_RESPONSES,
+    CACHE_REQUESTS,
+    HTTP_REQUESTS,
+    RESPONSE_BYTES,
+]
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """記錄一次快取查詢結果"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render_metrics() -> str:
+    """輸出 Prometheus 文字格式"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ====================
+# 階段計時（trace）
+# ====================
+_current_trace: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "haoshiji_trace", default=None
+)
+_tracer = None
+
+
+def init_tracing(service_name: str = "haoshiji") -> bool:
+    """
+    若環境允許，設定 OpenTelemetry OTLP 匯出
+
+    Returns:
+        是否已啟用匯出
+    """
+    global _tracer
+    if otel_trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("已設定 OTEL_EXPORTER_OTLP_ENDPOINT，但未安裝 opentelemetry-sdk / exporter")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    otel_trace.set_tracer_provider(provider)
+    _tracer = otel_trace.get_tracer("haoshiji")
+    return True
+
+
+def start_trace() -> contextvars.Token:
+    """開始收集目前請求的 span（回傳 token 供 end_trace 還原）"""
+    return _current_trace.set([])
+
+
+def end_trace(token: contextvars.Token) -> List[Dict[str, Any]]:
+    """結束收集並回傳本次請求的所有 span"""
+    spans = _current_trace.get() or []
+    _current_trace.reset(token)
+    return spans
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    量測一個處理階段
+
+    Args:
+        name: 階段名稱（作為 stage label，請勿放入 place_id 等高基數值）
+        attributes: 附加資訊（只記錄在 trace / OpenTelemetry，不進 Prometheus label）
+    """
+    otel_span = _tracer.start_as_current_span(name, attributes=attributes) if _tracer else None
+    if otel_span is not None:
+        otel_span.__enter__()
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({"stage": name, "ms": round(elapsed * 1000, 3), **attributes})
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
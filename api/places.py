@@ -1,11 +1,32 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
 import requests
 
+from api.deadline import DeadlineExceeded, current_deadline
+from api.metrics import UPSTREAM_SECONDS, UPSTREAM_SHORT_CIRCUITS
+
 # ====================
 # API Endpoints
 # ====================
 PLACES_TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACES_NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+
+# 單次呼叫的逾時上限（秒）
+REQUEST_TIMEOUT = 10
+
+# 斷路器：連續失敗 N 次後暫停呼叫該 endpoint，經過冷卻時間再放行一次試探
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("PLACES_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("PLACES_BREAKER_RESET", "30"))
+
+# 回應 body 的 status：只有這兩種是成功結果（可快取）
+OK_STATUSES = ("OK", "ZERO_RESULTS")
+# HTTP 200 但 body 表示配額用盡、金鑰被拒或上游錯誤，所有請求都會一樣失敗，計入斷路器
+# （其餘如 NOT_FOUND 只是這筆請求本身的問題）
+FAILURE_STATUSES = ("OVER_QUERY_LIMIT", "REQUEST_DENIED", "INVALID_REQUEST", "UNKNOWN_ERROR")
 
 
 class PlacesClientError(Exception):
@@ -14,6 +35,140 @@ class PlacesClientError(Exception):
     pass
 
 
+class PlacesUnavailableError(PlacesClientError):
+    """斷路器開啟中，未實際呼叫 Google"""
+
+    pass
+
+
+class CircuitBreaker:
+    """
+    簡易斷路器（closed → open → half-open）
+
+    - closed：正常呼叫，連續失敗達門檻即開啟
+    - open：冷卻時間內直接拒絕，不佔用 worker 等待逾時
+    - half-open：冷卻後放行一個試探請求，成功即關閉，失敗則重新開啟
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """是否可以呼叫上游（half-open 時只放行一個試探請求）"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """結果不影響斷路器狀態（如請求時限到期），只釋放 half-open 的試探名額"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+# 各 endpoint 各自一個斷路器
+BREAKERS = {
+    "textsearch": CircuitBreaker(),
+    "nearbysearch": CircuitBreaker(),
+    "details": CircuitBreaker(),
+}
+
+
+def _get(url: str, params: Dict[str, Any], endpoint: str) -> Dict[str, Any]:
+    """
+    送出 GET 請求並記錄上游延遲（endpoint 為指標 label），回傳解析後的 JSON
+
+    逾時秒數不超過目前請求的剩餘時限（見 api.deadline）。
+    Google 在配額用盡、金鑰錯誤時仍回 HTTP 200，需檢查 body 的 status。
+
+    Raises:
+        DeadlineExceeded: 請求時限已到（不計入斷路器失敗）
+        PlacesUnavailableError: 斷路器開啟中
+        PlacesClientError: 連線錯誤、逾時、非 200 回應，或 body status 不是 OK / ZERO_RESULTS
+    """
+    deadline = current_deadline()
+    timeout = deadline.timeout(REQUEST_TIMEOUT) if deadline else REQUEST_TIMEOUT
+
+    breaker = BREAKERS[endpoint]
+    if not breaker.allow():
+        UPSTREAM_SHORT_CIRCUITS.inc(endpoint=endpoint)
+        raise PlacesUnavailableError(f"Google Places 暫時無法使用（{endpoint}）")
+
+    started = time.perf_counter()
+    outcome = "error"
+    status = None
+    try:
+        response = requests.get(url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            outcome = "http_error"
+            raise PlacesClientError(f"API 連線失敗: {response.status_code}")
+        data = response.json()
+        status = data.get("status", "OK")
+        if status not in OK_STATUSES:
+            outcome = "api_error"
+            raise PlacesClientError(f"API 回傳錯誤: {status} {data.get('error_message', '')}".strip())
+        outcome = "ok"
+        return data
+    except requests.Timeout as e:
+        if deadline is not None and deadline.expired():
+            # 是請求時限造成的逾時，不代表上游故障
+            outcome = "deadline"
+            raise DeadlineExceeded(f"等待 {endpoint} 時超過請求時限") from e
+        raise PlacesClientError(f"API 連線逾時: {e}") from e
+    except (requests.RequestException, ValueError) as e:
+        # ValueError：回應不是合法 JSON
+        raise PlacesClientError(f"API 連線失敗: {e}") from e
+    finally:
+        UPSTREAM_SECONDS.observe(
+            time.perf_counter() - started, endpoint=endpoint, outcome=outcome
+        )
+        # 連線錯誤、逾時、429、5xx 與 FAILURE_STATUSES 視為上游故障；其餘 4xx 是請求本身的問題
+        if outcome == "ok":
+            breaker.record_success()
+        elif (
+            outcome == "error"
+            or (outcome == "http_error" and (response.status_code == 429 or response.status_code >= 500))
+            or (outcome == "api_error" and status in FAILURE_STATUSES)
+        ):
+            breaker.record_failure()
+        else:
+            breaker.release()
+
+
 # ====================
 # Text Search
 # ====================
@@ -33,12 +188,7 @@ def search_restaurants_by_text(
         "key": api_key,
     }
 
-    response = requests.get(PLACES_TEXT_SEARCH_URL, params=params, timeout=10)
-
-    if response.status_code != 200:
-        raise PlacesClientError(f"API 連線失敗: {response.status_code}")
-
-    data = response.json()
+    data = _get(PLACES_TEXT_SEARCH_URL, params, "textsearch")
     raw_places = data.get("results", [])
 
     # --- Python 排序邏輯 ---
@@ -46,6 +196,15 @@ def search_restaurants_by_text(
     sorted_places = sorted(raw_places, key=lambda x: x.get("rating", 0), reverse=True)
 
     # 2. 篩選星等並限制回傳筆數
+    return _summarize_places(sorted_places, min_rating, max_results)
+
+
+def _summarize_places(
+    sorted_places: List[Dict[str, Any]],
+    min_rating: float,
+    max_results: int,
+) -> List[Dict[str, Any]]:
+    """篩選星等、限制筆數，並整理成前端需要的欄位"""
     results = []
     for p in sorted_places:
         rating = p.get("rating", 0)
@@ -60,7 +219,8 @@ def search_restaurants_by_text(
                     "name": p.get("name"),
                     "rating": rating,
                     "user_ratings_total": p.get("user_ratings_total"),
-                    "formatted_address": p.get("formatted_address"),
+                    # Nearby Search 只提供 vicinity（簡短地址）
+                    "formatted_address": p.get("formatted_address") or p.get("vicinity"),
                     "lat": location.get("lat"),  # 緯度
                     "lng": location.get("lng"),  # 經度
                 }
@@ -73,6 +233,35 @@ def search_restaurants_by_text(
     return results
 
 
+# ====================
+# Nearby Search
+# ====================
+def search_restaurants_nearby(
+    api_key: str,
+    lat: float,
+    lng: float,
+    radius: int,
+    min_rating: float = 0.0,
+    max_results: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    搜尋指定座標半徑內的餐廳並依星等排序
+    """
+    params = {
+        "location": f"{lat},{lng}",
+        "radius": radius,
+        "type": "restaurant",
+        "language": "zh-TW",
+        "key": api_key,
+    }
+
+    data = _get(PLACES_NEARBY_SEARCH_URL, params, "nearbysearch")
+    raw_places = data.get("results", [])
+    sorted_places = sorted(raw_places, key=lambda x: x.get("rating", 0), reverse=True)
+
+    return _summarize_places(sorted_places, min_rating, max_results)
+
+
 # ====================
 # Place Details (Reviews)
 # ====================
@@ -83,6 +272,9 @@ def get_place_reviews(
 ) -> List[Dict[str, Any]]:
     """
     取得餐廳的完整評論，供後續食安分析
+
+    Raises:
+        PlacesClientError: 呼叫失敗（由呼叫端決定改用快取或略過）
     """
     params = {
         "place_id": place_id,
@@ -91,12 +283,7 @@ def get_place_reviews(
         "key": api_key,
     }
 
-    response = requests.get(PLACES_DETAILS_URL, params=params, timeout=10)
-
-    if response.status_code != 200:
-        return []  # 出錯時回傳空清單，不讓主程式斷掉
-
-    data = response.json()
+    data = _get(PLACES_DETAILS_URL, params, "details")
     result = data.get("result", {})
     # 這裡直接回傳完整 reviews 清單，包含完整 text
     return result.get("reviews", [])
@@ -0,0 +1,472 @@
+"""
+api/places_cache.py
+Google Places 回應快取與查詢熱度統計（SQLite）
+
+功能：
+1. 快取 Text Search 結果與 Place Details 評論（TTL 到期前直接回傳）
+2. 過期時先回傳舊資料（stale）並在背景更新；Google 失敗時也改用最後一次的結果
+3. 記錄每個查詢 / place_id 的熱度（指數衰減計數），供預熱工作挑選熱門項目
+   （先累計在記憶體，由背景執行緒批次寫入，請求路徑上不寫 SQLite）
+4. 快取存在 SQLite 檔，多個 worker 與預熱程序共用同一份資料（含預熱的呼叫配額）
+
+使用方式：
+    cache = PlacesCache("data/store/places_cache.db", ttl=21600)
+    places, stale = fetch_text_search(cache, api_key, "台北市 中正區 餐廳", max_results=5)
+    reviews, stale = fetch_place_reviews(cache, api_key, place_id)
+
+    # 熱門且即將到期的項目（見 api/prewarm.py）
+    cache.due_for_refresh("textsearch", limit=20, refresh_ahead=600)
+
+備註：
+    ttl <= 0 代表停用快取（每次都呼叫上游），但仍會記錄查詢熱度，
+    上游失敗時仍會改用最後一次的結果。
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
+
+from api.deadline import DeadlineExceeded
+from api.metrics import STALE_RESPONSES, record_cache
+from api.places import PlacesClientError, get_place_reviews, search_restaurants_by_text
+
+
+logger = logging.getLogger("haoshiji.places_cache")
+
+
+# ====================
+# 常數定義
+# ====================
+DEFAULT_CACHE_PATH = os.getenv("PLACES_CACHE_PATH", "data/store/places_cache.db")
+DEFAULT_TTL = int(os.getenv("PLACES_CACHE_TTL", str(6 * 3600)))
+
+# 快取過期時先回傳舊資料並在背景更新（PLACES_SERVE_STALE=0 可關閉，改為同步等待）
+SERVE_STALE = os.getenv("PLACES_SERVE_STALE", "1") == "1"
+
+# 熱度半衰期（秒）：一天前的查詢只算一半
+POPULARITY_HALF_LIFE = 24 * 3600
+
+# 查詢熱度先累計在記憶體，距上次寫入超過此秒數（或累計的項目超過上限）時於背景批次寫入
+POPULARITY_FLUSH_INTERVAL = float(os.getenv("POPULARITY_FLUSH_INTERVAL", "5"))
+POPULARITY_FLUSH_MAX_PENDING = 1000
+
+KIND_TEXT_SEARCH = "textsearch"
+KIND_DETAILS = "details"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places_cache (
+    kind TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (kind, cache_key)
+);
+
+CREATE TABLE IF NOT EXISTS query_popularity (
+    kind TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    score REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (kind, cache_key)
+);
+
+CREATE TABLE IF NOT EXISTS quota_calls (
+    name TEXT NOT NULL,
+    spent_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quota_calls ON quota_calls (name, spent_at);
+"""
+
+
+def _decayed(score: float, last_seen: float, now: float) -> float:
+    return score * math.pow(0.5, max(0.0, now - last_seen) / POPULARITY_HALF_LIFE)
+
+
+class PlacesCache:
+    """
+    Places 回應快取（執行緒安全，每個執行緒各自開啟連線）
+
+    Args:
+        path: SQLite 檔案路徑
+        ttl: 快取有效秒數（<= 0 代表停用快取）
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        # 尚未寫入的查詢熱度：(kind, key) → [params, 衰減後分數, 次數, 最後查詢時間]
+        self._pending: Dict[Tuple[str, str], List[Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_flush = time.time()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        atexit.register(self.flush_popularity)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # --------------------
+    # 快取讀寫
+    # --------------------
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        讀取快取項目（不論是否過期）
+
+        Returns:
+            {"data", "params", "fetched_at", "expires_at", "fresh": bool}，不存在時為 None
+        """
+        row = self._connection().execute(
+            "SELECT params, data, fetched_at, expires_at FROM places_cache WHERE kind = ? AND cache_key = ?",
+            (kind, key),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "data": json.loads(row["data"]),
+            "params": json.loads(row["params"]),
+            "fetched_at": row["fetched_at"],
+            "expires_at": row["expires_at"],
+            "fresh": self.ttl > 0 and row["expires_at"] > time.time(),
+        }
+
+    def put(self, kind: str, key: str, params: Dict[str, Any], data: Any) -> None:
+        """寫入快取項目"""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO places_cache (kind, cache_key, params, data, fetched_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, cache_key) DO UPDATE SET
+                    params = excluded.params,
+                    data = excluded.data,
+                    fetched_at = excluded.fetched_at,
+                    expires_at = excluded.expires_at
+                """,
+                (
+                    kind,
+                    key,
+                    json.dumps(params, ensure_ascii=False),
+                    json.dumps(data, ensure_ascii=False),
+                    now,
+                    now + max(self.ttl, 0),
+                ),
+            )
+
+    # --------------------
+    # 查詢熱度
+    # --------------------
+    def record_request(self, kind: str, key: str, params: Dict[str, Any]) -> None:
+        """
+        記錄一次使用者查詢（熱度 +1，舊的熱度依半衰期遞減）
+
+        只更新記憶體中的累計，寫入 SQLite 由背景執行緒批次處理（見 flush_popularity）。
+        """
+        now = time.time()
+        with self._pending_lock:
+            pending = self._pending.get((kind, key))
+            if pending is None:
+                self._pending[(kind, key)] = [params, 1.0, 1, now]
+            else:
+                pending[0] = params
+                pending[1] = 1.0 + _decayed(pending[1], pending[3], now)
+                pending[2] += 1
+                pending[3] = now
+            due = (
+                now - self._last_flush >= POPULARITY_FLUSH_INTERVAL
+                or len(self._pending) >= POPULARITY_FLUSH_MAX_PENDING
+            )
+            if not due or self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        _flush_async(self)
+
+    def flush_popularity(self) -> int:
+        """
+        將記憶體中累計的查詢熱度寫入 SQLite（單一交易）
+
+        Returns:
+            寫入的項目數
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+            self._last_flush = time.time()
+        if not pending:
+            return 0
+
+        conn = self._connection()
+        try:
+            with conn:
+                # 先取得寫入鎖，避免多個 worker 同時以舊分數合併
+                conn.execute("BEGIN IMMEDIATE")
+                for (kind, key), (params, score, requests, last_seen) in pending.items():
+                    row = conn.execute(
+                        "SELECT score, last_seen FROM query_popularity WHERE kind = ? AND cache_key = ?",
+                        (kind, key),
+                    ).fetchone()
+                    if row is not None:
+                        score += _decayed(row["score"], row["last_seen"], last_seen)
+                    conn.execute(
+                        """
+                        INSERT INTO query_popularity (kind, cache_key, params, score, requests, last_seen)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(kind, cache_key) DO UPDATE SET
+                            params = excluded.params,
+                            score = excluded.score,
+                            requests = query_popularity.requests + excluded.requests,
+                            last_seen = MAX(query_popularity.last_seen, excluded.last_seen)
+                        """,
+                        (kind, key, json.dumps(params, ensure_ascii=False), score, requests, last_seen),
+                    )
+        except sqlite3.Error:
+            # 寫入失敗時放回記憶體，下次再寫（期間的新查詢與其合併）
+            with self._pending_lock:
+                for item, (params, score, requests, last_seen) in pending.items():
+                    current = self._pending.get(item)
+                    if current is None:
+                        self._pending[item] = [params, score, requests, last_seen]
+                    else:
+                        current[1] += _decayed(score, last_seen, current[3])
+                        current[2] += requests
+            raise
+        return len(pending)
+
+    def popular(self, kind: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        目前最熱門的查詢
+
+        Returns:
+            [{"key", "params", "score", "requests"}]，依衰減後熱度由高到低排序
+        """
+        self.flush_popularity()
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT cache_key, params, score, requests, last_seen FROM query_popularity WHERE kind = ?",
+            (kind,),
+        ).fetchall()
+        ranked = [
+            {
+                "key": row["cache_key"],
+                "params": json.loads(row["params"]),
+                "score": _decayed(row["score"], row["last_seen"], now),
+                "requests": row["requests"],
+            }
+            for row in rows
+        ]
+        ranked.sort(key=lambda item: item["score"], reverse=True)
+        return ranked[:limit]
+
+    def due_for_refresh(
+        self,
+        kind: str,
+        limit: int = 20,
+        refresh_ahead: float = 600,
+    ) -> List[Dict[str, Any]]:
+        """
+        熱門前 limit 名中，快取不存在或將在 refresh_ahead 秒內到期的項目
+        """
+        now = time.time()
+        due = []
+        for item in self.popular(kind, limit):
+            entry = self.get(kind, item["key"])
+            if entry is None or entry["expires_at"] - now <= refresh_ahead:
+                due.append(item)
+        return due
+
+    # --------------------
+    # 呼叫配額（多個程序共用）
+    # --------------------
+    def try_spend_quota(self, name: str, limit: int, window: float) -> bool:
+        """
+        在滑動視窗內扣一次配額（以 BEGIN IMMEDIATE 確保多個程序不會同時扣到最後一次）
+
+        Returns:
+            是否扣款成功（已用完時回傳 False）
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM quota_calls WHERE name = ? AND spent_at <= ?", (name, now - window))
+            (used,) = conn.execute("SELECT COUNT(*) FROM quota_calls WHERE name = ?", (name,)).fetchone()
+            if used >= limit:
+                return False
+            conn.execute("INSERT INTO quota_calls (name, spent_at) VALUES (?, ?)", (name, now))
+        return True
+
+    def quota_used(self, name: str, window: float) -> int:
+        """滑動視窗內已使用的配額"""
+        (used,) = self._connection().execute(
+            "SELECT COUNT(*) FROM quota_calls WHERE name = ? AND spent_at > ?",
+            (name, time.time() - window),
+        ).fetchone()
+        return used
+
+
+# ====================
+# 快取包裝的 Places 呼叫
+# ====================
+# 背景更新過期項目（同一個項目同時只更新一次）
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="haoshiji-refresh")
+_refreshing: Set[Tuple[str, str]] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_async(cache: PlacesCache, kind: str, key: str, params: Dict[str, Any], fetch: Callable[[], Any]) -> None:
+    with _refreshing_lock:
+        if (kind, key) in _refreshing:
+            return
+        _refreshing.add((kind, key))
+
+    def run():
+        try:
+            cache.put(kind, key, params, fetch())
+        except Exception as e:
+            logger.warning(f"⚠️  背景更新失敗 {kind} {key}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((kind, key))
+
+    _refresh_executor.submit(run)
+
+
+def _flush_async(cache: PlacesCache) -> None:
+    """在背景更新的執行緒寫入查詢熱度（請求路徑上不等待 SQLite）"""
+
+    def run():
+        try:
+            cache.flush_popularity()
+        except Exception as e:
+            logger.warning(f"⚠️  查詢熱度寫入失敗: {e}")
+
+    _refresh_executor.submit(run)
+
+
+def _cached_fetch(
+    cache: PlacesCache,
+    kind: str,
+    key: str,
+    params: Dict[str, Any],
+    fetch: Callable[[], Any],
+    refresh: bool,
+    track: bool,
+) -> Tuple[Any, bool]:
+    """
+    快取讀取流程（stale-while-revalidate）
+
+    1. 快取未過期 → 直接回傳
+    2. 快取已過期 → 回傳舊資料並在背景更新（SERVE_STALE 開啟且 ttl > 0 時）
+    3. 無快取或需同步更新 → 呼叫上游；上游失敗或請求時限已到時，若有舊資料則回傳舊資料
+
+    Returns:
+        (資料, 是否為過期資料)
+
+    Raises:
+        PlacesClientError: 上游失敗且沒有任何快取
+        DeadlineExceeded: 請求時限已到且沒有任何快取
+    """
+    if track:
+        cache.record_request(kind, key, params)
+
+    entry = None if refresh else cache.get(kind, key)
+    if entry is not None:
+        record_cache(kind, hit=entry["fresh"])
+        if entry["fresh"]:
+            return entry["data"], False
+        if SERVE_STALE and cache.ttl > 0:
+            STALE_RESPONSES.inc(kind=kind, reason="expired")
+            _refresh_async(cache, kind, key, params, fetch)
+            return entry["data"], True
+    elif not refresh:
+        record_cache(kind, hit=False)
+
+    try:
+        data = fetch()
+    except (PlacesClientError, DeadlineExceeded):
+        if entry is None:
+            raise
+        STALE_RESPONSES.inc(kind=kind, reason="upstream_error")
+        return entry["data"], True
+
+    cache.put(kind, key, params, data)
+    return data, False
+
+
+def text_search_key(query: str, max_results: int) -> str:
+    return f"{query.strip()}|{max_results}"
+
+
+def fetch_text_search(
+    cache: PlacesCache,
+    api_key: str,
+    query: str,
+    max_results: int = 5,
+    refresh: bool = False,
+    track: bool = True,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Text Search（快取流程見 _cached_fetch）
+
+    Args:
+        refresh: 忽略快取，強制呼叫上游並更新快取（預熱用）
+        track: 是否計入查詢熱度（預熱工作本身的呼叫不計入）
+
+    Returns:
+        (餐廳清單, 是否為過期資料)
+    """
+    return _cached_fetch(
+        cache,
+        KIND_TEXT_SEARCH,
+        text_search_key(query, max_results),
+        {"query": query, "max_results": max_results},
+        lambda: search_restaurants_by_text(
+            api_key=api_key, query=query, min_rating=0.0, max_results=max_results
+        ),
+        refresh,
+        track,
+    )
+
+
+def fetch_place_reviews(
+    cache: PlacesCache,
+    api_key: str,
+    place_id: str,
+    language: str = "zh-TW",
+    refresh: bool = False,
+    track: bool = True,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Place Details 評論（參數與回傳值同 fetch_text_search）
+    """
+    return _cached_fetch(
+        cache,
+        KIND_DETAILS,
+        f"{place_id}|{language}",
+        {"place_id": place_id, "language": language},
+        lambda: get_place_reviews(api_key=api_key, place_id=place_id, language=language),
+        refresh,
+        track,
+    )
@@ -0,0 +1,212 @@
+"""
+api/prewarm.py
+熱門查詢預熱工作
+
+在快取到期前，主動重新抓取熱門的 Text Search 查詢與 Place Details，
+讓使用者的請求幾乎都能命中快取，不必等待 Google 回應。
+
+預熱的呼叫次數受每小時配額限制（PREWARM_QUOTA_PER_HOUR），避免耗盡 Places API 額度；
+配額記在快取的 SQLite 檔中，多個 worker 或預熱程序共用同一份額度。
+
+使用方式：
+    # 獨立程序（多 worker 部署時建議只跑一份）
+    python -m api.prewarm                 # 持續執行
+    python -m api.prewarm --once          # 執行一輪後結束
+
+    # 或在 app 內以背景執行緒執行：設定 PREWARM_ENABLED=1
+
+環境變數：
+    PREWARM_TOP_N: 每輪檢查的熱門查詢 / 餐廳數（預設 20）
+    PREWARM_INTERVAL: 每輪間隔秒數（預設 300）
+    PREWARM_REFRESH_AHEAD: 快取剩餘秒數低於此值即重新抓取（預設 900）
+    PREWARM_QUOTA_PER_HOUR: 每小時最多呼叫 Places API 次數（預設 200）
+"""
+
+import argparse
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from api.places_cache import (
+    KIND_DETAILS,
+    KIND_TEXT_SEARCH,
+    PlacesCache,
+    fetch_place_reviews,
+    fetch_text_search,
+)
+
+
+logger = logging.getLogger("haoshiji.prewarm")
+
+
+# ====================
+# 常數定義
+# ====================
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "20"))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "300"))
+PREWARM_REFRESH_AHEAD = float(os.getenv("PREWARM_REFRESH_AHEAD", "900"))
+PREWARM_QUOTA_PER_HOUR = int(os.getenv("PREWARM_QUOTA_PER_HOUR", "200"))
+
+
+class QuotaBudget:
+    """
+    滑動視窗呼叫配額（預設每小時），存於 Places 快取的 SQLite 檔，多個程序共用
+
+    Args:
+        cache: Places 快取（配額記在同一個 SQLite 檔）
+        limit: 視窗內最多呼叫次數
+        window: 視窗秒數
+        name: 配額名稱（不同用途各自計算）
+    """
+
+    def __init__(self, cache: PlacesCache, limit: int, window: float = 3600.0, name: str = "prewarm"):
+        self.cache = cache
+        self.limit = limit
+        self.window = window
+        self.name = name
+
+    def remaining(self) -> int:
+        return max(0, self.limit - self.cache.quota_used(self.name, self.window))
+
+    def try_spend(self) -> bool:
+        """扣一次配額，已用完時回傳 False"""
+        return self.cache.try_spend_quota(self.name, self.limit, self.window)
+
+
+class Prewarmer:
+    """
+    預熱工作
+
+    Args:
+        cache: Places 快取
+        api_key: Google Places API Key
+        top_n: 每輪檢查的熱門項目數
+        refresh_ahead: 快取剩餘秒數低於此值即重新抓取
+        budget: 呼叫配額
+    """
+
+    def __init__(
+        self,
+        cache: PlacesCache,
+        api_key: str,
+        top_n: int = PREWARM_TOP_N,
+        refresh_ahead: float = PREWARM_REFRESH_AHEAD,
+        budget: Optional[QuotaBudget] = None,
+    ):
+        self.cache = cache
+        self.api_key = api_key
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.budget = budget or QuotaBudget(cache, PREWARM_QUOTA_PER_HOUR)
+        self._stop = threading.Event()
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        執行一輪預熱（先 Text Search，再 Details）
+
+        Returns:
+            {"textsearch": 重新抓取數, "details": 重新抓取數, "failed": 失敗數, "skipped": 因配額略過數}
+        """
+        stats = {KIND_TEXT_SEARCH: 0, KIND_DETAILS: 0, "failed": 0, "skipped": 0}
+
+        for kind in (KIND_TEXT_SEARCH, KIND_DETAILS):
+            due = self.cache.due_for_refresh(kind, self.top_n, self.refresh_ahead)
+            for item in due:
+                if not self.budget.try_spend():
+                    stats["skipped"] += 1
+                    continue
+
+                params = item["params"]
+                try:
+                    if kind == KIND_TEXT_SEARCH:
+                        fetch_text_search(
+                            self.cache,
+                            self.api_key,
+                            params["query"],
+                            max_results=params["max_results"],
+                            refresh=True,
+                            track=False,
+                        )
+                    else:
+                        fetch_place_reviews(
+                            self.cache,
+                            self.api_key,
+                            params["place_id"],
+                            language=params["language"],
+                            refresh=True,
+                            track=False,
+                        )
+                    stats[kind] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.warning(f"⚠️  預熱失敗 {kind} {item['key']}: {e}")
+
+        if stats[KIND_TEXT_SEARCH] or stats[KIND_DETAILS] or stats["failed"]:
+            logger.info(
+                f"🔥 預熱: {stats[KIND_TEXT_SEARCH]} 個查詢、{stats[KIND_DETAILS]} 間餐廳"
+                f"（失敗 {stats['failed']}、配額不足略過 {stats['skipped']}，"
+                f"剩餘配額 {self.budget.remaining()}）"
+            )
+        return stats
+
+    def run_forever(self, interval: float = PREWARM_INTERVAL) -> None:
+        """持續執行，直到呼叫 stop()"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"⚠️  預熱工作錯誤: {e}")
+            self._stop.wait(interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def start_background(
+    cache: PlacesCache,
+    api_key: str,
+    interval: float = PREWARM_INTERVAL,
+) -> Prewarmer:
+    """在背景執行緒啟動預熱工作"""
+    prewarmer = Prewarmer(cache, api_key)
+    thread = threading.Thread(
+        target=prewarmer.run_forever,
+        args=(interval,),
+        name="haoshiji-prewarm",
+        daemon=True,
+    )
+    thread.start()
+    return prewarmer
+
+
+# ====================
+# 進入點
+# ====================
+def main() -> None:
+    load_dotenv()
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    parser = argparse.ArgumentParser(description="熱門查詢預熱")
+    parser.add_argument("--once", action="store_true", help="只執行一輪")
+    parser.add_argument("--interval", type=float, default=PREWARM_INTERVAL, help="每輪間隔秒數")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GOOGLE_PLACES_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_PLACES_API_KEY 環境變數未設定")
+
+    prewarmer = Prewarmer(PlacesCache(), api_key)
+    if args.once:
+        print(prewarmer.run_once())
+    else:
+        prewarmer.run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
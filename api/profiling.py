@@ -0,0 +1,163 @@
+"""
+api/profiling.py
+正式環境請求取樣剖析（cProfile / pyinstrument）
+
+啟用方式（皆為選用，預設關閉）：
+    PROFILE_SAMPLE_RATE=0.01    隨機取樣 1% 的請求
+    ADMIN_TOKEN=...             允許以 header 指定單一請求剖析：
+                                X-Profile: 1 + X-Admin-Token: <ADMIN_TOKEN>
+    PROFILE_DIR=data/profiles   剖析檔存放目錄
+    PROFILE_MAX_FILES=50        最多保留的剖析檔數（超過時刪除最舊的）
+    PROFILER=pyinstrument       改用 pyinstrument（需另外安裝），輸出 HTML
+
+兩者皆未設定時，profiled() 直接回傳原本的 view，完全沒有額外負擔。
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+from functools import wraps
+from typing import List, Dict, Any, Optional
+
+from flask import request
+
+from api.admin import ADMIN_TOKEN, is_admin_request
+
+
+# ====================
+# 常數定義
+# ====================
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILER = os.getenv("PROFILER", "cprofile")
+
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(ADMIN_TOKEN)
+
+# 剖析檔名（只允許此格式，避免路徑穿越）
+PROFILE_NAME_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9]{6}-[a-z_]+-[0-9]+ms\.(prof|html)$")
+
+
+def _should_profile() -> bool:
+    if request.headers.get("X-Profile") == "1" and is_admin_request():
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _rotate(directory: str, max_files: int) -> None:
+    """只保留最新的 max_files 個剖析檔"""
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if PROFILE_NAME_PATTERN.match(name)),
+        key=os.path.getmtime,
+    )
+    for path in files[: max(0, len(files) - max_files)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _profile_name(label: str, elapsed: float, extension: str) -> str:
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return f"{stamp}-{label}-{int(elapsed * 1000)}ms.{extension}"
+
+
+def _run_cprofile(view, label, args, kwargs):
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        return view(*args, **kwargs)
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = _profile_name(label, time.perf_counter() - started, "prof")
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+        _rotate(PROFILE_DIR, PROFILE_MAX_FILES)
+
+
+def _run_pyinstrument(view, label, args, kwargs):
+    from pyinstrument import Profiler
+
+    profiler = Profiler()
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        return view(*args, **kwargs)
+    finally:
+        profiler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = _profile_name(label, time.perf_counter() - started, "html")
+        with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        _rotate(PROFILE_DIR, PROFILE_MAX_FILES)
+
+
+def profiled(label: str):
+    """
+    Flask view 裝飾器：符合條件的請求會完整剖析並存檔
+
+    Args:
+        label: 剖析檔名中的端點名稱（小寫英文與底線）
+    """
+
+    def decorator(view):
+        if not PROFILING_ENABLED:
+            return view
+
+        run = _run_pyinstrument if PROFILER == "pyinstrument" else _run_cprofile
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _should_profile():
+                return view(*args, **kwargs)
+            return run(view, label, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ====================
+# 瀏覽剖析檔（供管理端點使用）
+# ====================
+def list_profiles() -> List[Dict[str, Any]]:
+    """列出剖析檔（新到舊）"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not PROFILE_NAME_PATTERN.match(name):
+            continue
+        path = os.path.join(PROFILE_DIR, name)
+        profiles.append(
+            {
+                "name": name,
+                "size": os.path.getsize(path),
+                "created_at": datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+    profiles.sort(key=lambda p: p["name"], reverse=True)
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """檢查檔名並回傳完整路徑（不存在或檔名不合法時回傳 None）"""
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def render_profile_text(path: str, sort: str = "cumulative", limit: int = 60) -> str:
+    """將 cProfile 檔轉為 pstats 文字報表"""
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,102 @@
+"""
+api/ranking.py
+餐廳排序（預先計算的整數排序 key + top-k 選取）
+
+排序邏輯（由前到後）：
+    1. 稽查不合格排最後（警示用）
+    2. 風險等級：低風險 > 注意 > 其他
+    3. 同風險等級內官方認證優先
+    4. 同等級內 Google 評分高的優先
+    5. 以上皆同時維持原順序（穩定排序）
+
+每家餐廳只計算一次排序 key，並將上述條件壓縮成單一整數：
+    [稽查 1 bit][等級 4 bits][非認證 1 bit][評分反向 16 bits]
+整數比較比 tuple 快，也不需每次重建等級對照表。
+
+使用方式：
+    ranked = rank(restaurants)                       # 完整排序
+    page = top_k(restaurants, k=20, offset=40)       # 只排出需要的那一頁
+    items, total = paginate(restaurants, page=3, page_size=20)
+"""
+
+import heapq
+from typing import List, Dict, Any, Iterable, Tuple
+
+from api.classifier import SafetyLevel
+
+
+# ====================
+# 常數定義
+# ====================
+# 風險等級順序（數字越小越優先），未知等級排在最後
+LEVEL_ORDER = {
+    SafetyLevel.LOW_RISK.value: 0,
+    SafetyLevel.CAUTION.value: 1,
+}
+UNKNOWN_LEVEL = 15
+
+# 評分以 0.001 為單位存放（0 ~ 65.535）
+RATING_SCALE = 1000
+RATING_MAX = 0xFFFF
+
+INSPECTION_SHIFT = 21
+LEVEL_SHIFT = 17
+CERTIFICATION_SHIFT = 16
+
+
+def rank_key(restaurant: Dict[str, Any]) -> int:
+    """
+    計算餐廳的排序 key（越小越前面）
+
+    Args:
+        restaurant: 含 safety_analysis 的餐廳資料
+    """
+    analysis = restaurant["safety_analysis"]
+    key = LEVEL_ORDER.get(analysis["level"], UNKNOWN_LEVEL) << LEVEL_SHIFT
+    if analysis.get("inspection_status") is not None:
+        key |= 1 << INSPECTION_SHIFT
+    if analysis.get("official_certification") is None:
+        key |= 1 << CERTIFICATION_SHIFT
+
+    rating = restaurant.get("rating")
+    if rating:
+        rating_fixed = int(rating * RATING_SCALE + 0.5)
+        key |= RATING_MAX - min(max(rating_fixed, 0), RATING_MAX)
+    else:
+        key |= RATING_MAX
+    return key
+
+
+def rank(restaurants: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """完整排序（回傳新串列；sorted 為穩定排序，同分維持原順序）"""
+    return sorted(restaurants, key=rank_key)
+
+
+def top_k(
+    restaurants: Iterable[Dict[str, Any]],
+    k: int,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    只選出排序後第 offset ~ offset + k 筆（heapq，不排序整個串列）
+
+    結果與 rank(restaurants)[offset:offset + k] 相同。
+    """
+    if k <= 0:
+        return []
+    return heapq.nsmallest(offset + k, restaurants, key=rank_key)[offset:]
+
+
+def paginate(
+    restaurants: List[Dict[str, Any]],
+    page: int = 1,
+    page_size: int = 20,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    分頁（頁碼從 1 開始）
+
+    Returns:
+        (該頁餐廳, 總筆數)
+    """
+    page = max(page, 1)
+    return top_k(restaurants, page_size, offset=(page - 1) * page_size), len(restaurants)
@@ -0,0 +1,94 @@
+"""
+api/records.py
+官方資料的精簡紀錄型別
+
+每筆官方認證 / 稽查紀錄原本是一個 dict（每個 dict 約 200+ bytes 的雜湊表開銷），
+改用 __slots__ dataclass 後每筆只保留固定欄位；重複出現的字串（行政區、評核結果、
+同一棟大樓的地址）也以 sys.intern 共用同一份物件。
+
+紀錄仍支援 record["address"]、record.get("address") 的 dict 式讀取，
+因此 fuzzy_match_certification / classify_restaurant 不需修改。
+
+未使用 frozen=True：frozen dataclass 的 __init__ 每個欄位都要經過 object.__setattr__，
+載入上萬筆時建構成本約為一般 __slots__ 的 5 倍；紀錄載入後視為唯讀，請勿修改欄位。
+"""
+
+import sys
+from dataclasses import dataclass, fields, asdict
+from typing import Dict, Any, Iterator
+
+
+class _MappingRecord:
+    """提供唯讀 dict 介面（只開放 dataclass 欄位）"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._field_names():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_names()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._field_names())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._field_names():
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return self._field_names()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def _field_names(cls):
+        names = cls.__dict__.get("_FIELD_NAMES")
+        if names is None:
+            names = tuple(f.name for f in fields(cls))
+            setattr(cls, "_FIELD_NAMES", names)
+        return names
+
+
+@dataclass(slots=True)
+class CertifiedRecord(_MappingRecord):
+    """台北市餐飲衛生評核紀錄（「優」等級）"""
+
+    district_code: str
+    district_name: str
+    registration_id: str
+    address: str
+    certification_rating: str
+
+    @classmethod
+    def create(
+        cls,
+        district_code: str,
+        district_name: str,
+        registration_id: str,
+        address: str,
+        certification_rating: str,
+    ) -> "CertifiedRecord":
+        return cls(
+            sys.intern(district_code),
+            sys.intern(district_name),
+            registration_id,
+            sys.intern(address),
+            sys.intern(certification_rating),
+        )
+
+
+@dataclass(slots=True)
+class InspectionRecord(_MappingRecord):
+    """食品稽查不合格紀錄"""
+
+    address: str
+    registration_number: str
+
+    @classmethod
+    def create(cls, address: str, registration_number: str) -> "InspectionRecord":
+        return cls(sys.intern(address), registration_number)
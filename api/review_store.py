@@ -0,0 +1,732 @@
+"""
+api/review_store.py
+評論全文檢索模組（SQLite FTS5）
+
+功能：
+1. 將 Google Places 取得的評論寫入 SQLite（同一則評論只存一次）
+2. 以 FTS5 trigram 分詞建立評論全文索引（適用中文）
+3. 依關鍵字 / 關鍵字分類 / 時間範圍搜尋，回傳命中的餐廳與評論摘要
+4. 收錄時即分析評論（每則只分析一次），保存命中標籤並維護每家餐廳的彙總
+   （症狀 / 生食提及數、關鍵字、標記評論），供 classify_restaurant 直接讀取；
+   命中標籤與彙總都記錄分析時的關鍵字規則版本，規則更新後讀取時重新分析
+5. 快取單一餐廳的詳細分析（依已收錄評論版本失效）
+
+使用方式（CLI）：
+    python -m api.review_store index data/raw/places_with_reviews.json
+    python -m api.review_store search 食物中毒 蟑螂 --days 30
+    python -m api.review_store search --category 症狀
+
+備註：
+    trigram 分詞只能以 MATCH 查詢長度 >= 3 字的詞；較短的關鍵字（如「蟲」、「頭髮」）
+    改查另一份 unigram / bigram 索引（reviews_grams，收錄時由 gram_document 產生）。
+    只有含標點等非文字字元的短關鍵字才以 LIKE 比對（會掃描整張評論表）。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Set, Tuple
+
+from api.classifier import (
+    MAX_FLAGGED_REVIEWS,
+    add_review_to_summary,
+    get_rules,
+    new_review_summary,
+)
+from api.rules import CompiledRules
+
+
+# ====================
+# 常數定義
+# ====================
+DEFAULT_DB_PATH = os.getenv("REVIEW_DB_PATH", "data/store/reviews.db")
+
+# trigram 分詞可直接 MATCH 的最短長度
+TRIGRAM_MIN_LENGTH = 3
+
+# 摘要前後保留字數
+SNIPPET_CONTEXT = 30
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_key TEXT PRIMARY KEY,
+    place_id TEXT,
+    name TEXT,
+    formatted_address TEXT,
+    lat REAL,
+    lng REAL,
+    rating REAL,
+    updated_at INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    place_key TEXT NOT NULL,
+    review_key TEXT NOT NULL UNIQUE,
+    author_name TEXT,
+    rating REAL,
+    time INTEGER,
+    indexed_at INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    hits TEXT,
+    hits_version TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_reviews_place ON reviews(place_key);
+CREATE INDEX IF NOT EXISTS idx_reviews_seen ON reviews(COALESCE(time, indexed_at));
+
+CREATE TABLE IF NOT EXISTS classified_places (
+    place_key TEXT PRIMARY KEY,
+    lat REAL,
+    lng REAL,
+    data TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS review_summaries (
+    place_key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    rules_version TEXT,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS place_details (
+    place_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+    text,
+    content='reviews',
+    content_rowid='id',
+    tokenize='trigram'
+);
+
+-- 短關鍵字索引：每則評論的單字與相鄰兩字（空白分隔，rowid 與 reviews.id 相同）
+-- contentless 表不存原文；評論不會刪除，收錄時由 ingest_restaurant 寫入
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_grams USING fts5(
+    grams,
+    content='',
+    tokenize='unicode61 remove_diacritics 0'
+);
+
+CREATE TRIGGER IF NOT EXISTS reviews_ai AFTER INSERT ON reviews BEGIN
+    INSERT INTO reviews_fts(rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_ad AFTER DELETE ON reviews BEGIN
+    INSERT INTO reviews_fts(reviews_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+# ====================
+# 連線與資料表
+# ====================
+@contextmanager
+def connect(db_path: str = DEFAULT_DB_PATH) -> Iterator[sqlite3.Connection]:
+    """
+    開啟評論資料庫（不存在時自動建立資料表），離開時自動 commit 並關閉
+
+    Args:
+        db_path: SQLite 檔案路徑
+
+    Yields:
+        sqlite3.Connection
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    key = _initialized_key(db_path)
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        _initialize(conn, db_path, key)
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# 本程序中已建立資料表並完成遷移的資料庫（每個路徑只需做一次）
+_initialized: Set[str] = set()
+_initialized_lock = threading.Lock()
+
+
+def _initialized_key(db_path: str) -> Optional[str]:
+    """已初始化的資料庫檔回傳其絕對路徑，需要初始化（含記憶體資料庫、檔案被刪除）則回傳 None"""
+    if db_path == ":memory:" or not os.path.exists(db_path):
+        return None
+    return os.path.abspath(db_path)
+
+
+def _initialize(conn: sqlite3.Connection, db_path: str, key: Optional[str]) -> None:
+    """建立資料表與遷移（同一程序中每個資料庫檔只執行一次；檔案被刪除後重新執行）"""
+    if key in _initialized:
+        return
+    with _initialized_lock:
+        if key in _initialized:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        conn.commit()
+        if db_path != ":memory:":
+            _initialized.add(os.path.abspath(db_path))
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """為舊版資料庫補上新增的欄位與短關鍵字索引"""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(reviews)")}
+    if "hits" not in columns:
+        conn.execute("ALTER TABLE reviews ADD COLUMN hits TEXT")
+    if "hits_version" not in columns:
+        conn.execute("ALTER TABLE reviews ADD COLUMN hits_version TEXT")
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(review_summaries)")}
+    if "rules_version" not in columns:
+        conn.execute("ALTER TABLE review_summaries ADD COLUMN rules_version TEXT")
+
+    # 短關鍵字索引與評論同一交易寫入，只需補上比索引最大 rowid 更新的評論
+    indexed = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM reviews_grams").fetchone()[0]
+    rows = conn.execute("SELECT id, text FROM reviews WHERE id > ? ORDER BY id", (indexed,)).fetchall()
+    if rows:
+        conn.executemany(
+            "INSERT INTO reviews_grams (rowid, grams) VALUES (?, ?)",
+            [(row["id"], gram_document(row["text"])) for row in rows],
+        )
+
+
+def _is_gram_text(text: str) -> bool:
+    """只由文字 / 數字組成（unicode61 分詞會視為同一個 token）"""
+    return bool(text) and all(ch.isalnum() for ch in text)
+
+
+def gram_document(text: str) -> str:
+    """
+    短關鍵字索引的內容：每段連續文字的單字與相鄰兩字，以空白分隔
+
+    例如「蟑螂很多!」→「蟑 螂 很 多 蟑螂 螂很 很多」
+    """
+    grams: List[str] = []
+    run: List[str] = []
+    for ch in text.lower() + " ":
+        if ch.isalnum():
+            run.append(ch)
+            continue
+        grams.extend(run)
+        grams.extend(a + b for a, b in zip(run, run[1:]))
+        run = []
+    return " ".join(grams)
+
+
+def place_key(restaurant: Dict[str, Any]) -> str:
+    """
+    取得餐廳的唯一識別（有 place_id 用 place_id，否則以名稱代替）
+    """
+    place_id = restaurant.get("place_id")
+    if place_id:
+        return place_id
+    return f"name:{restaurant.get('name', '')}"
+
+
+def _review_key(key: str, review: Dict[str, Any]) -> str:
+    """同一則評論（同店、同作者、同時間、同內文）只會產生同一個 key"""
+    author = review.get("author_name") or review.get("author") or ""
+    raw = f"{key}\x1f{author}\x1f{review.get('time', '')}\x1f{review.get('text', '')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# ====================
+# 寫入
+# ====================
+def _upsert_place(conn: sqlite3.Connection, key: str, restaurant: Dict[str, Any], now: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO places (place_key, place_id, name, formatted_address, lat, lng, rating, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(place_key) DO UPDATE SET
+            name = excluded.name,
+            formatted_address = COALESCE(excluded.formatted_address, places.formatted_address),
+            lat = COALESCE(excluded.lat, places.lat),
+            lng = COALESCE(excluded.lng, places.lng),
+            rating = COALESCE(excluded.rating, places.rating),
+            updated_at = excluded.updated_at
+        """,
+        (
+            key,
+            restaurant.get("place_id"),
+            restaurant.get("name", ""),
+            restaurant.get("formatted_address"),
+            restaurant.get("lat"),
+            restaurant.get("lng"),
+            restaurant.get("rating"),
+            now,
+        ),
+    )
+
+
+def _save_summary(
+    conn: sqlite3.Connection, key: str, summary: Dict[str, Any], rules_version: str, now: int
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO review_summaries (place_key, data, rules_version, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(place_key) DO UPDATE SET
+            data = excluded.data,
+            rules_version = excluded.rules_version,
+            updated_at = excluded.updated_at
+        """,
+        (key, json.dumps(summary, ensure_ascii=False), rules_version, now),
+    )
+
+
+def load_review_summary(
+    conn: sqlite3.Connection, key: str, rules_version: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    讀取餐廳的評論彙總
+
+    Args:
+        rules_version: 若指定，彙總不是以此版本規則分析時視為不存在
+
+    Returns:
+        彙總，尚未收錄（或規則版本不符）時回傳 None
+    """
+    row = conn.execute(
+        "SELECT data, rules_version FROM review_summaries WHERE place_key = ?", (key,)
+    ).fetchone()
+    if row is None or (rules_version is not None and row["rules_version"] != rules_version):
+        return None
+    return json.loads(row["data"])
+
+
+def rebuild_review_summary(
+    conn: sqlite3.Connection, key: str, rules: Optional[CompiledRules] = None
+) -> Dict[str, Any]:
+    """
+    依已收錄的評論重建餐廳彙總
+
+    尚未分析、或以舊版規則分析的評論會在此重新分析並更新命中標籤。
+    """
+    rules = rules or get_rules()
+    summary = new_review_summary()
+    rows = conn.execute(
+        """
+        SELECT id, author_name, text, hits, hits_version FROM reviews
+        WHERE place_key = ? ORDER BY id
+        """,
+        (key,),
+    ).fetchall()
+    for row in rows:
+        review = {"author_name": row["author_name"], "text": row["text"]}
+        if row["hits"] is None or row["hits_version"] != rules.version:
+            result = rules.classify(rules.normalize(row["text"]))
+            conn.execute(
+                "UPDATE reviews SET hits = ?, hits_version = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), rules.version, row["id"]),
+            )
+        else:
+            result = json.loads(row["hits"])
+        add_review_to_summary(summary, review, result, max_flagged=MAX_FLAGGED_REVIEWS)
+
+    _save_summary(conn, key, summary, rules.version, int(time.time()))
+    return summary
+
+
+def ingest_restaurant(
+    conn: sqlite3.Connection,
+    restaurant: Dict[str, Any],
+    now: Optional[int] = None,
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    收錄單家餐廳的評論：新評論分析一次並累加到彙總，已收錄的評論直接略過
+
+    Args:
+        conn: 資料庫連線
+        restaurant: 餐廳資料（含 reviews）
+        now: 收錄時間（預設為現在）
+
+    Returns:
+        (新增的評論數, 該餐廳所有已收錄評論的彙總)
+    """
+    now = int(time.time()) if now is None else now
+    key = place_key(restaurant)
+    _upsert_place(conn, key, restaurant, now)
+
+    # 整家餐廳使用同一版本規則；規則更新後第一次收錄時以新規則重建彙總
+    rules = get_rules()
+    summary = load_review_summary(conn, key, rules.version)
+    if summary is None:
+        summary = rebuild_review_summary(conn, key, rules)
+
+    inserted = 0
+    for review in restaurant.get("reviews") or []:
+        text = review.get("text", "")
+        if not text:
+            continue
+        review_key = _review_key(key, review)
+        if conn.execute("SELECT 1 FROM reviews WHERE review_key = ?", (review_key,)).fetchone():
+            continue
+
+        result = rules.classify(rules.normalize(text))
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO reviews
+                (place_key, review_key, author_name, rating, time, indexed_at, text, hits, hits_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                key,
+                review_key,
+                review.get("author_name") or review.get("author") or "匿名",
+                review.get("rating"),
+                review.get("time"),
+                now,
+                text,
+                json.dumps(result, ensure_ascii=False),
+                rules.version,
+            ),
+        )
+        if cursor.rowcount:
+            conn.execute(
+                "INSERT INTO reviews_grams (rowid, grams) VALUES (?, ?)",
+                (cursor.lastrowid, gram_document(text)),
+            )
+            inserted += 1
+            add_review_to_summary(summary, review, result, max_flagged=MAX_FLAGGED_REVIEWS)
+
+    if inserted:
+        _save_summary(conn, key, summary, rules.version, now)
+    return inserted, summary
+
+
+def index_restaurants(
+    conn: sqlite3.Connection,
+    restaurants: Iterable[Dict[str, Any]],
+) -> int:
+    """
+    將餐廳與其評論寫入資料庫（已存在的評論會略過）
+
+    Args:
+        conn: 資料庫連線
+        restaurants: 餐廳清單（含 reviews）
+
+    Returns:
+        新增的評論數
+    """
+    now = int(time.time())
+    return sum(ingest_restaurant(conn, restaurant, now)[0] for restaurant in restaurants)
+
+
+def save_classified_places(
+    conn: sqlite3.Connection,
+    restaurants: Iterable[Dict[str, Any]],
+) -> None:
+    """
+    儲存分析完成的餐廳（含 safety_analysis），供附近搜尋等功能重複使用
+    """
+    now = int(time.time())
+    conn.executemany(
+        """
+        INSERT INTO classified_places (place_key, lat, lng, data, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(place_key) DO UPDATE SET
+            lat = excluded.lat,
+            lng = excluded.lng,
+            data = excluded.data,
+            updated_at = excluded.updated_at
+        """,
+        [
+            (
+                place_key(r),
+                r.get("lat"),
+                r.get("lng"),
+                json.dumps(r, ensure_ascii=False),
+                now,
+            )
+            for r in restaurants
+        ],
+    )
+
+
+def load_classified_places(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """讀取所有有座標的已分析餐廳"""
+    rows = conn.execute(
+        "SELECT data FROM classified_places WHERE lat IS NOT NULL AND lng IS NOT NULL"
+    ).fetchall()
+    return [json.loads(row["data"]) for row in rows]
+
+
+# ====================
+# 單一餐廳詳細資料
+# ====================
+def load_place(conn: sqlite3.Connection, key: str) -> Optional[Dict[str, Any]]:
+    """讀取已收錄餐廳的基本資料（未收錄時回傳 None）"""
+    row = conn.execute(
+        """
+        SELECT place_id, name, formatted_address, lat, lng, rating FROM places
+        WHERE place_key = ?
+        """,
+        (key,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def load_reviews(conn: sqlite3.Connection, key: str) -> List[Dict[str, Any]]:
+    """讀取餐廳所有已收錄的評論（由舊到新）"""
+    rows = conn.execute(
+        """
+        SELECT author_name, rating, time, text FROM reviews
+        WHERE place_key = ? ORDER BY COALESCE(time, indexed_at), id
+        """,
+        (key,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def review_fingerprint(conn: sqlite3.Connection, key: str) -> str:
+    """已收錄評論的版本（新增或刪除評論時改變）"""
+    row = conn.execute(
+        "SELECT COUNT(*) AS n, MAX(id) AS last_id FROM reviews WHERE place_key = ?", (key,)
+    ).fetchone()
+    return f"{row['n']}:{row['last_id'] or 0}"
+
+
+def load_place_detail(
+    conn: sqlite3.Connection,
+    key: str,
+    fingerprint: str,
+    max_age: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    讀取快取的詳細分析（版本不同或超過 max_age 秒時回傳 None）
+    """
+    row = conn.execute(
+        "SELECT fingerprint, data, updated_at FROM place_details WHERE place_key = ?", (key,)
+    ).fetchone()
+    if row is None or row["fingerprint"] != fingerprint:
+        return None
+    if max_age is not None and time.time() - row["updated_at"] > max_age:
+        return None
+    return json.loads(row["data"])
+
+
+def save_place_detail(
+    conn: sqlite3.Connection,
+    key: str,
+    fingerprint: str,
+    detail: Dict[str, Any],
+) -> None:
+    """儲存詳細分析結果"""
+    conn.execute(
+        """
+        INSERT INTO place_details (place_key, fingerprint, data, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(place_key) DO UPDATE SET
+            fingerprint = excluded.fingerprint,
+            data = excluded.data,
+            updated_at = excluded.updated_at
+        """,
+        (key, fingerprint, json.dumps(detail, ensure_ascii=False), int(time.time())),
+    )
+
+
+# ====================
+# 搜尋
+# ====================
+def _make_snippet(text: str, terms: List[str]) -> str:
+    """擷取第一個命中關鍵字前後的文字，並以【】標示關鍵字"""
+    lowered = text.lower()
+    hits = [(lowered.find(term.lower()), term) for term in terms]
+    hits = [(pos, term) for pos, term in hits if pos >= 0]
+    if not hits:
+        return text[: SNIPPET_CONTEXT * 2]
+
+    pos, term = min(hits)
+    start = max(0, pos - SNIPPET_CONTEXT)
+    end = min(len(text), pos + len(term) + SNIPPET_CONTEXT)
+    snippet = text[start:pos] + "【" + text[pos : pos + len(term)] + "】" + text[pos + len(term) : end]
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+def search_reviews(
+    conn: sqlite3.Connection,
+    terms: List[str],
+    days: Optional[int] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    搜尋包含任一關鍵字的評論，並依餐廳分組
+
+    Args:
+        conn: 資料庫連線
+        terms: 關鍵字清單（任一命中即算）
+        days: 只搜尋最近 N 天的評論（以評論時間計，無時間者以收錄時間計）
+        limit: 最多回傳的評論數
+
+    Returns:
+        {
+            "total_hits": int,          # 命中的評論總數（不受 limit 限制）
+            "places": [{"place_id", "name", "formatted_address", "hits": [...]}],
+        }
+    """
+    terms = [t.strip() for t in terms if t and t.strip()]
+    if not terms:
+        return {"total_hits": 0, "places": []}
+
+    long_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_LENGTH]
+    short_terms = [t for t in terms if len(t) < TRIGRAM_MIN_LENGTH]
+    gram_terms = [t for t in short_terms if _is_gram_text(t)]
+    like_terms = [t for t in short_terms if not _is_gram_text(t)]
+
+    # 有索引的關鍵字先取出評論 id 聯集，再以主鍵查詢評論
+    matched = []
+    params: List[Any] = []
+    if long_terms:
+        matched.append("SELECT rowid FROM reviews_fts WHERE reviews_fts MATCH ?")
+        params.append(" OR ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+    if gram_terms:
+        matched.append("SELECT rowid FROM reviews_grams WHERE reviews_grams MATCH ?")
+        params.append(" OR ".join('"' + t.lower() + '"' for t in gram_terms))
+
+    conditions = []
+    if matched:
+        conditions.append(f"r.id IN ({' UNION '.join(matched)})")
+    for term in like_terms:
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append("r.text LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+
+    where = f"({' OR '.join(conditions)})"
+    if days is not None:
+        where += " AND COALESCE(r.time, r.indexed_at) >= ?"
+        params.append(int(time.time()) - int(days) * 86400)
+
+    (total_hits,) = conn.execute(f"SELECT COUNT(*) FROM reviews r WHERE {where}", params).fetchone()
+    sql = f"""
+        SELECT r.id, r.place_key, r.author_name, r.rating, r.time, r.indexed_at, r.text,
+               p.place_id, p.name, p.formatted_address
+        FROM reviews r
+        LEFT JOIN places p ON p.place_key = r.place_key
+        WHERE {where}
+        ORDER BY COALESCE(r.time, r.indexed_at) DESC LIMIT ?
+    """
+
+    places: Dict[str, Dict[str, Any]] = {}
+    rows = conn.execute(sql, [*params, int(limit)]).fetchall()
+    for row in rows:
+        place = places.setdefault(
+            row["place_key"],
+            {
+                "place_id": row["place_id"],
+                "name": row["name"],
+                "formatted_address": row["formatted_address"],
+                "hits": [],
+            },
+        )
+        text = row["text"]
+        lowered = text.lower()
+        place["hits"].append(
+            {
+                "review_id": row["id"],
+                "author": row["author_name"],
+                "rating": row["rating"],
+                "time": row["time"],
+                "matched_terms": [t for t in terms if t.lower() in lowered],
+                "snippet": _make_snippet(text, terms),
+            }
+        )
+
+    return {"total_hits": total_hits, "places": list(places.values())}
+
+
+def canned_queries() -> Dict[str, List[str]]:
+    """可直接使用的預設查詢（沿用目前生效的關鍵字規則，規則檔變更時同步更新）"""
+    return get_rules().keyword_categories()
+
+
+def resolve_query_terms(
+    query: str = "",
+    categories: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    將使用者輸入與預設查詢分類合併為關鍵字清單
+
+    Raises:
+        KeyError: 分類名稱不存在
+    """
+    terms = query.replace(",", " ").replace("，", " ").split() if query else []
+    canned = canned_queries()
+    for category in categories or []:
+        if category not in canned:
+            raise KeyError(category)
+        terms.extend(canned[category])
+    return list(dict.fromkeys(terms))
+
+
+# ====================
+# 進入點
+# ====================
+def _load_restaurants(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "restaurants" in data:
+        return data["restaurants"]
+    if isinstance(data, list):
+        return data
+    raise ValueError("資料格式錯誤：需要陣列或包含 'restaurants' key 的字典")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="評論全文檢索")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite 檔案路徑")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = sub.add_parser("index", help="匯入評論 JSON")
+    index_parser.add_argument("paths", nargs="+", help="餐廳 JSON 檔（陣列或含 restaurants key）")
+
+    search_parser = sub.add_parser("search", help="搜尋評論")
+    search_parser.add_argument("terms", nargs="*", help="關鍵字（任一命中）")
+    search_parser.add_argument(
+        "--category",
+        action="append",
+        choices=list(canned_queries()),
+        help="預設查詢分類，可重複指定",
+    )
+    search_parser.add_argument("--days", type=int, default=None, help="只搜尋最近 N 天")
+    search_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+
+    with connect(args.db) as conn:
+        if args.command == "index":
+            for path in args.paths:
+                count = index_restaurants(conn, _load_restaurants(path))
+                print(f"✓ {path}: 新增 {count} 則評論")
+            return
+
+        terms = resolve_query_terms(" ".join(args.terms), args.category)
+        if not terms:
+            parser.error("請提供關鍵字或 --category")
+
+        started = time.perf_counter()
+        result = search_reviews(conn, terms, days=args.days, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        print(f"🔍 命中 {result['total_hits']} 則評論（{elapsed_ms:.1f} ms）")
+        for place in result["places"]:
+            print(f"\n- {place['name']} ({place['formatted_address'] or '無地址'})")
+            for hit in place["hits"]:
+                print(f"    [{', '.join(hit['matched_terms'])}] {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+api/rules.py
+關鍵字規則引擎（規則檔 → 編譯後的比對器）
+
+功能：
+1. 從規則檔（JSON，已安裝 PyYAML 時也可用 YAML）讀取分類、關鍵字、權重、否定詞與門檻
+2. 載入時編譯成比對用的 tuple 結構，classify_review / batch_scoring / 評論搜尋共用
+3. 規則檔變更時自動重新編譯（依 mtime 判斷，不需重新部署）；格式錯誤時沿用舊規則
+
+規則檔格式（data/rules/keyword_rules.json）：
+    {
+      "version": 1,
+      "negations": ["不會", "沒有", ...],       # 緊接在關鍵字前即視為否定（如「不會拉肚子」）
+      "categories": [
+        {
+          "name": "症狀",                       # 標籤前綴（症狀:拉肚子）
+          "flag": "symptom",                    # symptom → has_symptoms；raw_food → has_raw_food
+          "weight": 3.0,                        # 關鍵字預設權重
+          "threshold": 3.0,                     # 單則評論此分類權重總和達門檻才算命中
+          "keywords": ["拉肚子", {"keyword": "食物中毒", "weight": 5.0}, ...]
+        }
+      ]
+    }
+
+評分：
+    每則評論的 risk_score = 各「達門檻」分類的命中關鍵字權重總和
+    （同一關鍵字在同一則評論只計一次）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:  # 未安裝 PyYAML 時只支援 JSON 規則檔
+    yaml = None
+
+
+logger = logging.getLogger("haoshiji.rules")
+
+
+# ====================
+# 常數定義
+# ====================
+DEFAULT_RULES_PATH = os.getenv(
+    "KEYWORD_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data/rules/keyword_rules.json"),
+)
+
+# 檢查規則檔是否變更的最短間隔（秒）
+RULES_CHECK_INTERVAL = float(os.getenv("KEYWORD_RULES_CHECK_INTERVAL", "2"))
+
+FLAG_SYMPTOM = "symptom"
+FLAG_RAW_FOOD = "raw_food"
+
+
+class RuleError(ValueError):
+    """規則檔格式錯誤"""
+
+    pass
+
+
+class CompiledRules:
+    """
+    編譯後的規則（不可變，可安全地在多執行緒間共用）
+
+    Attributes:
+        version: 規則內容雜湊（規則變更時改變，可作為快取 key）
+        columns: [(分類, 關鍵字)]，依規則檔順序
+        labels: ["分類:關鍵字"]，與 columns 對應
+        weights: 每個 column 的權重
+        categories: 分類名稱（依規則檔順序）
+        column_category: 每個 column 所屬分類的索引
+        thresholds: 每個分類的門檻
+        raw_food: 每個分類是否計入 has_raw_food（否則計入 has_symptoms）
+        negations: 否定詞（由長到短）
+        casefold: 關鍵字或否定詞含有大小寫字母時為 True（評論需先轉小寫才能比對）
+    """
+
+    __slots__ = (
+        "version",
+        "columns",
+        "labels",
+        "weights",
+        "categories",
+        "column_category",
+        "thresholds",
+        "raw_food",
+        "negations",
+        "casefold",
+        "_matchers",
+        "_prefilter",
+    )
+
+    def __init__(self, config: Dict[str, Any]):
+        categories = config.get("categories")
+        if not isinstance(categories, list) or not categories:
+            raise RuleError("規則檔缺少 categories")
+
+        columns = []
+        weights = []
+        column_category = []
+        names = []
+        thresholds = []
+        raw_food = []
+        for index, category in enumerate(categories):
+            name = category.get("name")
+            if not name:
+                raise RuleError(f"第 {index + 1} 個分類缺少 name")
+            flag = category.get("flag", FLAG_SYMPTOM)
+            if flag not in (FLAG_SYMPTOM, FLAG_RAW_FOOD):
+                raise RuleError(f"分類 {name} 的 flag 必須是 symptom 或 raw_food")
+            default_weight = float(category.get("weight", 1.0))
+
+            names.append(name)
+            thresholds.append(float(category.get("threshold", 0.0)))
+            raw_food.append(flag == FLAG_RAW_FOOD)
+
+            for item in category.get("keywords", []):
+                if isinstance(item, dict):
+                    keyword = item.get("keyword", "")
+                    weight = float(item.get("weight", default_weight))
+                else:
+                    keyword, weight = item, default_weight
+                keyword = keyword.strip().lower()
+                if not keyword:
+                    raise RuleError(f"分類 {name} 有空白關鍵字")
+                columns.append((name, keyword))
+                weights.append(weight)
+                column_category.append(index)
+
+        self.columns: Tuple[Tuple[str, str], ...] = tuple(columns)
+        self.labels: Tuple[str, ...] = tuple(f"{c}:{k}" for c, k in columns)
+        self.weights: Tuple[float, ...] = tuple(weights)
+        self.categories: Tuple[str, ...] = tuple(names)
+        self.column_category: Tuple[int, ...] = tuple(column_category)
+        self.thresholds: Tuple[float, ...] = tuple(thresholds)
+        self.raw_food: Tuple[bool, ...] = tuple(raw_food)
+        self.negations: Tuple[str, ...] = tuple(
+            sorted({n.strip().lower() for n in config.get("negations", []) if n.strip()}, key=len, reverse=True)
+        )
+        # 關鍵字全為中文等無大小寫的字元時，評論不需轉小寫（省下每則評論的字串複製）
+        self.casefold = any(
+            ch.lower() != ch.upper() for word in (*(k for _, k in columns), *self.negations) for ch in word
+        )
+        # 比對用：(關鍵字, 標籤, 權重, 分類索引)
+        self._matchers = tuple(
+            (keyword, label, weight, category)
+            for (_, keyword), label, weight, category in zip(columns, self.labels, weights, column_category)
+        )
+        # 快速排除：一次掃描判斷評論是否含任一關鍵字（多數評論不含關鍵字）
+        self._prefilter = re.compile(
+            "|".join(re.escape(k) for k in sorted({k for _, k in columns}, key=len, reverse=True))
+        )
+        canonical = json.dumps(config, ensure_ascii=False, sort_keys=True)
+        self.version = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+    def keyword_categories(self) -> Dict[str, List[str]]:
+        """分類 → 關鍵字清單（供評論搜尋的預設查詢）"""
+        result: Dict[str, List[str]] = {name: [] for name in self.categories}
+        for category, keyword in self.columns:
+            result[category].append(keyword)
+        return result
+
+    def normalize(self, text: str) -> str:
+        """將評論轉為比對用的形式（需要時才轉小寫）"""
+        return text.lower() if self.casefold else text
+
+    def is_negated(self, text: str, position: int) -> bool:
+        """text[position] 開始的關鍵字前是否緊接否定詞"""
+        for negation in self.negations:
+            start = position - len(negation)
+            if start >= 0 and text.startswith(negation, start):
+                return True
+        return False
+
+    def find(self, text: str, keyword: str, start: int = 0, end: Optional[int] = None) -> int:
+        """找出第一個未被否定的關鍵字位置（找不到時回傳 -1）"""
+        pos = text.find(keyword, start, end) if end is not None else text.find(keyword, start)
+        while pos != -1 and self.negations and self.is_negated(text, pos):
+            pos = text.find(keyword, pos + 1, end) if end is not None else text.find(keyword, pos + 1)
+        return pos
+
+    def scan(self, text: str) -> Iterator[int]:
+        """
+        一次掃描找出任一關鍵字出現的位置（不判斷否定詞，供批次分析快速篩選）
+
+        每個位置只回報最長的關鍵字、且命中不重疊；但含有任一關鍵字的文字至少會回報一個位置。
+        """
+        return (match.start() for match in self._prefilter.finditer(text))
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """
+        分析評論內文（需先經過 normalize）
+
+        Returns:
+            {"has_symptoms", "has_raw_food", "matched_keywords", "risk_score"}
+        """
+        if not self._prefilter.search(text):
+            return {"has_symptoms": False, "has_raw_food": False, "matched_keywords": [], "risk_score": 0.0}
+
+        matched = []
+        scores = [0.0] * len(self.categories)
+        for keyword, label, weight, category in self._matchers:
+            if keyword in text and (not self.negations or self.find(text, keyword) != -1):
+                matched.append(label)
+                scores[category] += weight
+
+        has_symptoms = False
+        has_raw_food = False
+        risk_score = 0.0
+        if matched:
+            for category, score in enumerate(scores):
+                if score > 0 and score >= self.thresholds[category]:
+                    risk_score += score
+                    if self.raw_food[category]:
+                        has_raw_food = True
+                    else:
+                        has_symptoms = True
+
+        return {
+            "has_symptoms": has_symptoms,
+            "has_raw_food": has_raw_food,
+            "matched_keywords": matched,
+            "risk_score": round(risk_score, 3),
+        }
+
+
+def _read_config(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuleError("YAML 規則檔需要安裝 PyYAML")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class RuleFile:
+    """
+    規則檔載入器（依 mtime 自動重新編譯）
+
+    Args:
+        path: 規則檔路徑
+        fallback: 規則檔不存在時使用的內建規則設定
+        check_interval: 檢查規則檔是否變更的最短間隔（秒）
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fallback: Dict[str, Any],
+        check_interval: float = RULES_CHECK_INTERVAL,
+    ):
+        self.path = path
+        self.check_interval = check_interval
+        self._fallback = CompiledRules(fallback)
+        self._rules = self._fallback
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self) -> CompiledRules:
+        """取得目前的規則（必要時重新編譯）"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._rules
+
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._rules
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if self._stat_key is not None:
+                    logger.warning(f"⚠️  規則檔已移除，改用內建規則: {self.path}")
+                self._rules = self._fallback
+                self._stat_key = None
+                return self._rules
+
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            if stat_key != self._stat_key:
+                try:
+                    self._rules = CompiledRules(_read_config(self.path))
+                    logger.info(f"✓ 載入關鍵字規則 {self.path}（版本 {self._rules.version}）")
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                    # 格式錯誤時沿用目前的規則，避免服務中斷
+                    logger.warning(f"⚠️  規則檔格式錯誤，沿用舊規則: {e}")
+                self._stat_key = stat_key
+            return self._rules
+
+    def reload(self) -> CompiledRules:
+        """立即重新檢查規則檔"""
+        self._checked_at = float("-inf")
+        return self.get()
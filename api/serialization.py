@@ -0,0 +1,119 @@
+"""
+api/serialization.py
+JSON 序列化（已安裝 orjson 時使用 orjson，否則使用標準函式庫 json）
+
+功能：
+1. dumps / dump_file：預設輸出精簡 JSON（無縮排、中文不跳脫），pretty=True 時縮排 2 格
+2. FastJSONProvider：Flask JSON provider，jsonify 與 request.get_json 都改走此模組；
+   請求帶 ?pretty=1 時回應才縮排
+
+使用方式：
+    from api.serialization import dumps, dump_file
+    body = dumps(payload)                           # bytes
+    dump_file(classified, "data/processed/safety_classified.json", pretty=True)
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from typing import Any
+
+from flask import has_request_context, request
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # 未安裝 orjson 時改用標準函式庫
+    orjson = None
+
+
+# ====================
+# 常數定義
+# ====================
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _ORJSON_PRETTY_OPTIONS = _ORJSON_OPTIONS | orjson.OPT_INDENT_2
+
+
+def _default(obj: Any) -> Any:
+    """處理 JSON 原生不支援的型別（與 Flask 預設 provider 相同）"""
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy 陣列 / 純量（標準函式庫 json 時）
+        return obj.tolist()
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"無法序列化 {type(obj).__name__} 型別")
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    序列化成 UTF-8 JSON
+
+    Args:
+        obj: 要序列化的資料
+        pretty: 是否縮排（預設精簡輸出）
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_PRETTY_OPTIONS if pretty else _ORJSON_OPTIONS)
+    if pretty:
+        text = json.dumps(obj, default=_default, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """解析 JSON（str 或 bytes）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(obj: Any, path: str, pretty: bool = False) -> int:
+    """
+    寫入 JSON 檔
+
+    Returns:
+        寫入的位元組數
+    """
+    body = dumps(obj, pretty=pretty)
+    with open(path, "wb") as f:
+        f.write(body)
+    return len(body)
+
+
+# ====================
+# Flask 整合
+# ====================
+def _pretty_requested() -> bool:
+    return has_request_context() and request.args.get("pretty") == "1"
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider（精簡輸出，?pretty=1 時縮排）"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, pretty=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, pretty=_pretty_requested()), mimetype=self.mimetype)
@@ -0,0 +1,492 @@
+"""
+api/shared_datasets.py
+多 worker 共用的官方資料（唯讀記憶體映射檔）
+
+gunicorn / uwsgi 的每個 worker 原本各自載入一份 CERTIFIED_DATA 與
+INSPECTION_FAILED_DATA。本模組將兩份資料一次編譯成不可變的二進位檔，
+各 worker 以 mmap 唯讀方式掛載：實體記憶體由作業系統的 page cache 共用，
+worker 數增加時記憶體用量維持不變。
+
+檔案格式（native byte order，僅供同一台主機使用）：
+    magic（8 bytes）| header 長度（uint32）| header JSON | 各區段（8 bytes 對齊）
+
+    每張表包含：
+        - 每個欄位（含名稱）的字串起點 / 長度陣列（uint32，依原始順序）
+        - 名稱排序索引（uint32，依 UTF-8 bytes 排序，供二分搜尋）
+        - 名稱比對索引（見 api.matching.build_match_tables）：
+            清理後名稱的字串起點 / 長度與排序索引、各筆 bigram 數、沒有 bigram 的位置，
+            以及兩份 bigram 倒排索引（bigram 依兩個字的 code point 編成 uint64 排序，
+            搭配 uint32 的串列起點與位置陣列）
+    所有字串（UTF-8）存放在共用字串區，相同字串只存一份。
+
+每個縣市各自一個共用檔（{shared_dir}/{slug}.shm），一般由 api.datasets.DatasetRegistry
+依設定檔建置與掛載（設定 SHARED_DATASET_DIR 即啟用）。
+
+使用方式：
+    tables = ensure_shared_datasets(
+        "data/store/datasets/taipei.shm",
+        [certification_csv_path, inspection_json_path],
+        lambda: {"certified": ..., "inspection": ...},
+    )
+    certified = tables["certified"]          # 可直接傳給 classify_restaurant
+    inspection = tables["inspection"]
+
+    # 也可在部署前先建好（依 data/external/datasets.json，預設建置所有縣市）：
+    python -m api.shared_datasets                         # → data/store/datasets/{slug}.shm
+    python -m api.shared_datasets 臺北市 --dir /dev/shm/haoshiji
+
+選用 mmap 檔案而非 multiprocessing.shared_memory：檔案在重啟後仍可沿用，
+也不需要額外處理共享記憶體區段的清除。
+"""
+
+import contextlib
+import io
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+from api.matching import build_match_tables
+
+try:
+    import fcntl
+except ImportError:  # Windows 開發環境沒有 fcntl，改為不加鎖
+    fcntl = None
+
+
+# ====================
+# 常數定義
+# ====================
+# 格式變更時遞增（舊格式的共用檔會自動重新建置）
+MAGIC = b"HSJSHM02"
+
+# 各表欄位（第一欄為 key 名稱）
+TABLE_FIELDS = {
+    "certified": ["name", "district_code", "district_name", "registration_id", "address", "certification_rating"],
+    "inspection": ["name", "address", "registration_number"],
+}
+
+ALIGNMENT = 8
+
+
+def _pad(buffer: io.BytesIO) -> None:
+    remainder = buffer.tell() % ALIGNMENT
+    if remainder:
+        buffer.write(b"\0" * (ALIGNMENT - remainder))
+
+
+def _write_array(buffer: io.BytesIO, values: array) -> int:
+    """對齊後寫入陣列，回傳區段位移"""
+    _pad(buffer)
+    offset = buffer.tell()
+    buffer.write(values.tobytes())
+    return offset
+
+
+def gram_key(gram: str) -> int:
+    """bigram（兩個字）→ uint64 排序鍵"""
+    return (ord(gram[0]) << 21) | ord(gram[1])
+
+
+# ====================
+# 建置
+# ====================
+def build_shared_datasets(
+    path: str,
+    tables: Dict[str, Mapping],
+) -> None:
+    """
+    將官方資料編譯成共用檔（先寫入暫存檔再替換，掛載中的 worker 不受影響）
+
+    Args:
+        path: 輸出檔路徑
+        tables: {"certified": 名稱 → 紀錄, "inspection": 名稱 → 紀錄}
+    """
+    strings: Dict[bytes, int] = {}
+    blob = io.BytesIO()
+
+    def intern(value: str) -> Tuple[int, int]:
+        encoded = (value or "").encode("utf-8")
+        offset = strings.get(encoded)
+        if offset is None:
+            offset = strings[encoded] = blob.tell()
+            blob.write(encoded)
+        return offset, len(encoded)
+
+    sections = io.BytesIO()
+    header: Dict[str, Any] = {"byteorder": sys.byteorder, "tables": {}}
+
+    def write_strings(values: List[str]) -> Dict[str, int]:
+        starts = array("I")
+        lengths = array("I")
+        for value in values:
+            start, length = intern(value)
+            starts.append(start)
+            lengths.append(length)
+        return {"starts": _write_array(sections, starts), "lengths": _write_array(sections, lengths)}
+
+    def write_postings(postings: Dict[str, List[int]]) -> Dict[str, int]:
+        keyed = sorted((gram_key(gram), positions) for gram, positions in postings.items())
+        offsets = array("I", [0])
+        flat = array("I")
+        for _, positions in keyed:
+            flat.extend(positions)
+            offsets.append(len(flat))
+        return {
+            "count": len(keyed),
+            "keys": _write_array(sections, array("Q", [key for key, _ in keyed])),
+            "offsets": _write_array(sections, offsets),
+            "postings": _write_array(sections, flat),
+        }
+
+    for table_name, records in tables.items():
+        field_names = TABLE_FIELDS[table_name]
+        names = list(records.keys())
+        columns = {
+            field: write_strings(names if field == "name" else [records[name][field] for name in names])
+            for field in field_names
+        }
+        order = sorted(range(len(names)), key=lambda i: names[i].encode("utf-8"))
+        sorted_offset = _write_array(sections, array("I", order))
+
+        # 名稱比對索引（與 MatchIndex 在記憶體中建立的內容相同）
+        match = build_match_tables(names)
+        cleaned = [value.encode("utf-8") for value in match["cleaned"]]
+        # 相同的清理後名稱依位置排序，二分搜尋取最左邊即為第一筆出現的位置
+        clean_order = sorted(range(len(names)), key=lambda i: (cleaned[i], i))
+        match_meta = {
+            "cleaned": write_strings(match["cleaned"]),
+            "cleaned_sorted": _write_array(sections, array("I", clean_order)),
+            "gram_counts": _write_array(sections, array("I", match["gram_counts"])),
+            "short": {"offset": _write_array(sections, array("I", match["short"])), "count": len(match["short"])},
+            "grams": write_postings(match["grams"]),
+            "plain_grams": write_postings(match["plain_grams"]),
+        }
+
+        header["tables"][table_name] = {
+            "count": len(names),
+            "fields": field_names,
+            "columns": columns,
+            "sorted": sorted_offset,
+            "match": match_meta,
+        }
+
+    # header 中的區段位移以「區段起點」為基準，掛載時再加上實際位移
+    _pad(sections)
+    header["strings"] = sections.tell()
+    sections.write(blob.getvalue())
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix_length = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_length) % ALIGNMENT
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(array("I", [len(header_bytes) + padding]).tobytes())
+        f.write(header_bytes + b" " * padding)
+        f.write(sections.getvalue())
+    os.replace(tmp_path, path)
+
+
+# ====================
+# 掛載
+# ====================
+def _view(buffer: memoryview, offset: int, count: int, fmt: str = "I") -> memoryview:
+    size = array(fmt).itemsize
+    return buffer[offset : offset + size * count].cast(fmt)
+
+
+class SharedStrings(Sequence):
+    """共用檔中的字串欄（依位置讀取時才解碼）"""
+
+    def __init__(self, buffer: memoryview, strings: int, starts: memoryview, lengths: memoryview):
+        self._buffer = buffer
+        self._strings = strings
+        self._starts = starts
+        self._lengths = lengths
+
+    def raw(self, index: int) -> memoryview:
+        start = self._strings + self._starts[index]
+        return self._buffer[start : start + self._lengths[index]]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.raw(index), "utf-8")
+
+
+class SharedFirstPosition:
+    """清理後名稱 → 第一筆出現的位置（以排序索引二分搜尋，介面同 dict.get）"""
+
+    def __init__(self, strings: SharedStrings, order: memoryview):
+        self._strings = strings
+        self._order = order
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        target = key.encode("utf-8")
+        lo, hi = 0, len(self._order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._strings.raw(self._order[mid])) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._order) and bytes(self._strings.raw(self._order[lo])) == target:
+            return self._order[lo]
+        return default
+
+
+class SharedPostings:
+    """bigram → 位置串列（介面同 dict.get，回傳 uint32 的 memoryview）"""
+
+    def __init__(self, buffer: memoryview, base: int, meta: Dict[str, int]):
+        count = meta["count"]
+        self._keys = _view(buffer, base + meta["keys"], count, "Q")
+        self._offsets = _view(buffer, base + meta["offsets"], count + 1)
+        self._postings = _view(buffer, base + meta["postings"], self._offsets[count] if count else 0)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, gram: str, default: Any = None) -> Any:
+        key = gram_key(gram)
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return default
+        return self._postings[self._offsets[i] : self._offsets[i + 1]]
+
+
+class SharedRecord:
+    """共用檔中的一筆紀錄（欄位在讀取時才解碼，介面與 api.records 相同）"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "SharedTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> str:
+        if key == "name" or key not in self._table.columns:
+            raise KeyError(key)
+        return self._table.value(key, self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key != "name" and key in self._table.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> List[str]:
+        return self._table.fields[1:]
+
+    def to_dict(self) -> Dict[str, str]:
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"SharedRecord({self.to_dict()!r})"
+
+
+class SharedTable(Mapping):
+    """
+    唯讀的名稱 → 紀錄對照表（資料存放於 mmap）
+
+    迭代順序與建置時的原始順序相同，因此比對結果與一般 dict 一致。
+    """
+
+    def __init__(self, buffer: memoryview, base: int, strings: int, meta: Dict[str, Any]):
+        self._buffer = buffer
+        self._strings = base + strings
+        self._count = meta["count"]
+        self.fields: List[str] = meta["fields"]
+        self.columns: Dict[str, Tuple[memoryview, memoryview]] = {}
+        for field, offsets in meta["columns"].items():
+            self.columns[field] = (
+                self._uint32_view(base + offsets["starts"]),
+                self._uint32_view(base + offsets["lengths"]),
+            )
+        self._sorted = self._uint32_view(base + meta["sorted"])
+        self._base = base
+        self._match_meta: Optional[Dict[str, Any]] = meta.get("match")
+
+    def _uint32_view(self, offset: int) -> memoryview:
+        return _view(self._buffer, offset, self._count)
+
+    def _raw(self, field: str, index: int) -> memoryview:
+        starts, lengths = self.columns[field]
+        start = self._strings + starts[index]
+        return self._buffer[start : start + lengths[index]]
+
+    def value(self, field: str, index: int) -> str:
+        return str(self._raw(field, index), "utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self.value("name", i)
+
+    def items(self):
+        return ((self.value("name", i), SharedRecord(self, i)) for i in range(self._count))
+
+    def values(self):
+        return (SharedRecord(self, i) for i in range(self._count))
+
+    def _find(self, name: str) -> Optional[int]:
+        key = name.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = bytes(self._raw("name", self._sorted[mid]))
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return self._sorted[mid]
+        return None
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._find(name) is not None
+
+    def __getitem__(self, name: str) -> SharedRecord:
+        index = self._find(name) if isinstance(name, str) else None
+        if index is None:
+            raise KeyError(name)
+        return SharedRecord(self, index)
+
+    def match_tables(self) -> Optional[Dict[str, Any]]:
+        """
+        名稱比對索引（供 api.matching.MatchIndex 直接使用，資料皆在 mmap 中）
+
+        Returns:
+            與 build_match_tables 相同的 key（另含 "names" 與依位置取紀錄的 "record"）；
+            共用檔沒有索引時為 None
+        """
+        meta = self._match_meta
+        if meta is None:
+            return None
+        base = self._base
+        name_starts, name_lengths = self.columns["name"]
+        cleaned = SharedStrings(
+            self._buffer,
+            self._strings,
+            self._uint32_view(base + meta["cleaned"]["starts"]),
+            self._uint32_view(base + meta["cleaned"]["lengths"]),
+        )
+        return {
+            "names": SharedStrings(self._buffer, self._strings, name_starts, name_lengths),
+            "record": lambda pos: SharedRecord(self, pos),
+            "cleaned": cleaned,
+            "by_clean": SharedFirstPosition(cleaned, self._uint32_view(base + meta["cleaned_sorted"])),
+            "grams": SharedPostings(self._buffer, base, meta["grams"]),
+            "plain_grams": SharedPostings(self._buffer, base, meta["plain_grams"]),
+            "gram_counts": self._uint32_view(base + meta["gram_counts"]),
+            "short": _view(self._buffer, base + meta["short"]["offset"], meta["short"]["count"]),
+        }
+
+
+def attach_shared_datasets(path: str) -> Dict[str, SharedTable]:
+    """
+    以唯讀 mmap 掛載共用檔
+
+    Returns:
+        {"certified": SharedTable, "inspection": SharedTable}
+
+    Raises:
+        ValueError: 檔案格式不符
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buffer = memoryview(mapped)
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError(f"不是官方資料共用檔: {path}")
+
+    header_length = buffer[len(MAGIC) : len(MAGIC) + 4].cast("I")[0]
+    header_start = len(MAGIC) + 4
+    header = json.loads(bytes(buffer[header_start : header_start + header_length]))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError("共用檔的 byte order 與本機不符，請重新建置")
+
+    base = header_start + header_length
+    return {
+        name: SharedTable(buffer, base, header["strings"], meta)
+        for name, meta in header["tables"].items()
+    }
+
+
+def _is_current(path: str) -> bool:
+    """共用檔存在且為目前的格式"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def ensure_shared_datasets(
+    path: str,
+    source_paths: List[str],
+    load_tables: Callable[[], Dict[str, Mapping]],
+    rebuild: bool = False,
+) -> Dict[str, SharedTable]:
+    """
+    確保共用檔存在且比來源新，再掛載
+
+    多個 worker 同時啟動時以檔案鎖保證只有一個 worker 建置，其餘等待後直接掛載。
+
+    Args:
+        path: 共用檔路徑
+        source_paths: 來源檔（任一比共用檔新就重新建置）
+        load_tables: 建置時呼叫，回傳 {"certified": ..., "inspection": ...}
+        rebuild: 不論新舊一律重新建置
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    sources = [p for p in source_paths if p and os.path.exists(p)]
+    with open(path + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            source_mtime = max((os.path.getmtime(p) for p in sources), default=0)
+            if (
+                rebuild
+                or not _is_current(path)
+                or os.path.getmtime(path) < source_mtime
+            ):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    tables = load_tables()
+                build_shared_datasets(path, tables)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    return attach_shared_datasets(path)
+
+
+# ====================
+# 進入點
+# ====================
+if __name__ == "__main__":
+    # 依縣市設定建置（與 app 的 SHARED_DATASET_DIR 掛載相同的 {slug}.shm）
+    from api.datasets import main
+
+    main(sys.argv[1:])
@@ -0,0 +1,228 @@
+"""
+api/tiles.py
+行政區 / 網格風險統計模組（離線預先計算）
+
+功能：
+1. 讀取已分類的餐廳資料（safety_classified.json）
+2. 依 DISTRICT_MAP 行政區代碼統計各風險等級、官方認證、稽查不合格家數
+3. 依經緯度切成固定大小的網格，統計每格的風險家數
+4. 輸出為 JSON，供 /api/tiles 直接回傳給前端地圖繪製全市圖層
+
+使用方式（CLI）：
+    python -m api.tiles
+
+輸入檔案：
+    - data/processed/safety_classified.json
+
+輸出檔案：
+    - data/processed/risk_tiles.json
+"""
+
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from api.classifier import SafetyLevel, DISTRICT_MAP
+
+
+# ====================
+# 常數定義
+# ====================
+# 網格大小（度），0.01 度約 1.1 公里
+DEFAULT_CELL_SIZE = 0.01
+
+UNKNOWN_DISTRICT = "unknown"
+
+
+def _empty_counts() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "levels": {
+            SafetyLevel.LOW_RISK.value: 0,
+            SafetyLevel.CAUTION.value: 0,
+        },
+        "certified": 0,
+        "inspection_failed": 0,
+    }
+
+
+def _add_to_counts(counts: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+    counts["total"] += 1
+    level = analysis.get("level")
+    counts["levels"][level] = counts["levels"].get(level, 0) + 1
+    if analysis.get("official_certification") is not None:
+        counts["certified"] += 1
+    if analysis.get("inspection_status") is not None:
+        counts["inspection_failed"] += 1
+
+
+def district_code_of(restaurant: Dict[str, Any]) -> str:
+    """
+    判斷餐廳所在行政區代碼
+
+    優先使用 Google 地址，其次使用官方認證資料上的行政區
+
+    Returns:
+        DISTRICT_MAP 的代碼，無法判斷時回傳 "unknown"
+    """
+    address = restaurant.get("formatted_address") or restaurant.get("address") or ""
+    for code, district in DISTRICT_MAP.items():
+        if district in address:
+            return code
+
+    certification = (restaurant.get("safety_analysis") or {}).get("official_certification")
+    if certification:
+        for code, district in DISTRICT_MAP.items():
+            if certification.get("district") == district:
+                return code
+
+    return UNKNOWN_DISTRICT
+
+
+def cell_key(lat: float, lng: float, cell_size: float = DEFAULT_CELL_SIZE) -> str:
+    """將經緯度轉為網格 key（格左下角的索引）"""
+    return f"{math.floor(lat / cell_size)}:{math.floor(lng / cell_size)}"
+
+
+def build_risk_tiles(
+    restaurants: List[Dict[str, Any]],
+    cell_size: float = DEFAULT_CELL_SIZE,
+) -> Dict[str, Any]:
+    """
+    統計行政區與網格的風險家數
+
+    Args:
+        restaurants: 已分類的餐廳清單（含 safety_analysis）
+        cell_size: 網格大小（度）
+
+    Returns:
+        {
+            "generated_at": str,
+            "cell_size": float,
+            "districts": {代碼: {"name", "total", "levels", "certified", "inspection_failed"}},
+            "cells": [{"key", "lat", "lng", "total", "levels", ...}],
+        }
+    """
+    districts: Dict[str, Dict[str, Any]] = {}
+    cells: Dict[str, Dict[str, Any]] = {}
+
+    for restaurant in restaurants:
+        analysis = restaurant.get("safety_analysis")
+        if not analysis:
+            continue
+
+        code = district_code_of(restaurant)
+        if code not in districts:
+            districts[code] = {
+                "name": DISTRICT_MAP.get(code, "未知"),
+                **_empty_counts(),
+            }
+        _add_to_counts(districts[code], analysis)
+
+        lat = restaurant.get("lat")
+        lng = restaurant.get("lng")
+        if lat is None or lng is None:
+            continue
+
+        key = cell_key(lat, lng, cell_size)
+        if key not in cells:
+            row, col = (int(part) for part in key.split(":"))
+            cells[key] = {
+                "key": key,
+                # 網格中心點
+                "lat": round((row + 0.5) * cell_size, 6),
+                "lng": round((col + 0.5) * cell_size, 6),
+                **_empty_counts(),
+            }
+        _add_to_counts(cells[key], analysis)
+
+    return {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "cell_size": cell_size,
+        "districts": dict(sorted(districts.items())),
+        "cells": sorted(cells.values(), key=lambda c: c["key"]),
+    }
+
+
+def write_risk_tiles(
+    input_path: str,
+    output_path: str,
+    cell_size: float = DEFAULT_CELL_SIZE,
+) -> Dict[str, Any]:
+    """
+    讀取分類結果 → 統計 → 寫出 JSON
+
+    Args:
+        input_path: 分類結果 JSON 路徑
+        output_path: 輸出 JSON 路徑
+        cell_size: 網格大小（度）
+
+    Returns:
+        統計結果
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"找不到分類結果: {input_path}")
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    restaurants = data["restaurants"] if isinstance(data, dict) else data
+
+    tiles = build_risk_tiles(restaurants, cell_size=cell_size)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(tiles, f, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+
+    return tiles
+
+
+# ====================
+# 快取讀取（供 API 使用）
+# ====================
+class TileCache:
+    """
+    依檔案修改時間快取統計檔內容與 ETag，檔案重新產生後自動重新載入
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    def get(self):
+        """
+        Returns:
+            (body bytes, etag)，檔案不存在時回傳 (None, None)
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None, None
+
+        if mtime != self._mtime:
+            with open(self.path, "rb") as f:
+                body = f.read()
+            self._body = body
+            self._etag = hashlib.sha1(body).hexdigest()
+            self._mtime = mtime
+
+        return self._body, self._etag
+
+
+# ====================
+# 進入點
+# ====================
+if __name__ == "__main__":
+    INPUT_PATH = "data/processed/safety_classified.json"
+    OUTPUT_PATH = "data/processed/risk_tiles.json"
+
+    tiles = write_risk_tiles(INPUT_PATH, OUTPUT_PATH)
+    print(f"✓ 行政區: {len(tiles['districts'])} 區")
+    print(f"✓ 網格: {len(tiles['cells'])} 格")
+    print(f"✓ 已儲存至: {OUTPUT_PATH}")
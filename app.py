@@ -1,19 +1,67 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
+import logging
 import os
 from dotenv import load_dotenv
-from api.places import search_restaurants_by_text, get_place_reviews
+from api.places import PlacesClientError, search_restaurants_nearby
+from api.places_cache import PlacesCache, fetch_place_reviews, fetch_text_search
 from api.classifier import (
     classify_review,
     SafetyLevel,
     classify_restaurant,
-    load_certified_restaurants,
-    load_inspection_failed,
+    get_rules,
+    summarize_reviews,
 )
+from api import review_store
+from api.ranking import paginate, rank
+from api import jobs
+from api import prewarm
+from api import profiling
+from api.admin import require_admin
+from api.batch_classify import (
+    BATCH_JOB_MAX_ITEMS,
+    BATCH_JOBS,
+    BATCH_MAX_BYTES,
+    BATCH_MAX_ITEMS,
+    BatchError,
+    parse_batch,
+    run_batch,
+    to_ndjson,
+)
+from api.deadline import DeadlineExceeded, with_deadline
+from api.geo_index import GeoIndex
+from api.datasets import DatasetRegistry
+from api.metrics import (
+    HTTP_REQUESTS,
+    RESPONSE_BYTES,
+    end_trace,
+    init_tracing,
+    record_cache,
+    render_metrics,
+    span,
+    start_trace,
+)
+from api.serialization import FastJSONProvider
+from api.tiles import TileCache
 
 load_dotenv()
+
+# 日誌：LOG_LEVEL=WARNING 可在高負載時關閉每次請求的進度訊息
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("haoshiji")
+
 app = Flask(__name__)
+# 請求內容上限（批次分類為最大的請求），未帶 Content-Length 的 chunked 上傳也在讀取時限制
+app.config["MAX_CONTENT_LENGTH"] = BATCH_MAX_BYTES
+# JSON 回應預設精簡輸出（已安裝 orjson 時使用 orjson），?pretty=1 時縮排
+app.json = FastJSONProvider(app)
 CORS(app)
+init_tracing()
 
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 
@@ -23,28 +71,120 @@ if not GOOGLE_PLACES_API_KEY:
 # ============================================
 # 載入官方認證與稽查資料（應用啟動時執行一次）
 # ============================================
-print("📂 載入官方認證與稽查資料...")
+logger.info("📂 載入官方認證與稽查資料...")
 
 # 取得當前腳本所在目錄的絕對路徑
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CERTIFICATION_CSV = os.path.join(BASE_DIR, "data/external/certified_restaurants.csv")
-INSPECTION_JSON = os.path.join(BASE_DIR, "data/external/food_business_data.json")
-
-# 載入台北市餐飲衛生評核資料（僅「優」等級）
-if os.path.exists(CERTIFICATION_CSV):
-    CERTIFIED_DATA = load_certified_restaurants(CERTIFICATION_CSV)
-    print(f"✓ 載入 {len(CERTIFIED_DATA)} 筆官方認證餐廳")
-else:
-    CERTIFIED_DATA = {}
-    print(f"⚠️  找不到官方認證資料: {CERTIFICATION_CSV}")
-
-# 載入食品稽查不合格資料
-if os.path.exists(INSPECTION_JSON):
-    INSPECTION_FAILED_DATA = load_inspection_failed(INSPECTION_JSON)
-    print(f"✓ 載入 {len(INSPECTION_FAILED_DATA)} 筆稽查不合格紀錄")
-else:
-    INSPECTION_FAILED_DATA = {}
-    print(f"⚠️  找不到稽查資料: {INSPECTION_JSON}")
+RISK_TILES_JSON = os.path.join(BASE_DIR, "data/processed/risk_tiles.json")
+CLASSIFIED_JSON = os.path.join(BASE_DIR, "data/processed/safety_classified.json")
+REVIEW_DB_PATH = os.getenv(
+    "REVIEW_DB_PATH", os.path.join(BASE_DIR, "data/store/reviews.db")
+)
+
+PLACES_CACHE_PATH = os.getenv(
+    "PLACES_CACHE_PATH", os.path.join(BASE_DIR, "data/store/places_cache.db")
+)
+
+# 附近搜尋：本地結果少於此數量時才呼叫 Google Nearby Search
+NEARBY_MIN_LOCAL_RESULTS = int(os.getenv("NEARBY_MIN_LOCAL_RESULTS", "3"))
+NEARBY_MAX_RADIUS = 5000
+NEARBY_MAX_LIMIT = 100
+
+# 搜尋整體時限（秒）：逾時後只回傳已分析完成的餐廳（partial: true），0 代表不限時
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "8"))
+
+# 單一餐廳詳細分析快取秒數（評論或關鍵字規則變更時也會重新分析）
+PLACE_DETAIL_TTL = int(os.getenv("PLACE_DETAIL_TTL", str(24 * 3600)))
+
+# 各縣市官方資料來源設定（見 api/datasets.py）
+DATASETS_CONFIG = os.getenv(
+    "DATASETS_CONFIG", os.path.join(BASE_DIR, "data/external/datasets.json")
+)
+
+# 多 worker 部署時可設定 SHARED_DATASET_DIR，各縣市資料改為掛載共用的唯讀 mmap 檔
+SHARED_DATASET_DIR = os.getenv("SHARED_DATASET_DIR")
+
+DATASETS = DatasetRegistry(
+    DATASETS_CONFIG, base_dir=BASE_DIR, shared_dir=SHARED_DATASET_DIR
+).load()
+logger.info(f"✓ 官方資料涵蓋縣市: {', '.join(DATASETS.cities) or '無'}")
+
+# Google Places 回應快取（TTL 見 PLACES_CACHE_TTL）
+PLACES_CACHE = PlacesCache(PLACES_CACHE_PATH)
+
+# 熱門查詢預熱：單一 worker 時可在 app 內執行，多 worker 請改跑 python -m api.prewarm
+if os.getenv("PREWARM_ENABLED") == "1":
+    prewarm.start_background(PLACES_CACHE, GOOGLE_PLACES_API_KEY)
+    logger.info("✓ 已啟動熱門查詢預熱")
+
+# 背景工作佇列（worker 另外以 python -m api.jobs worker 啟動；單一程序部署可設定 JOB_WORKER_ENABLED=1）
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(BASE_DIR, "data/store/jobs.db"))
+JOBS = jobs.JobQueue(JOBS_DB_PATH)
+if os.getenv("JOB_WORKER_ENABLED") == "1":
+    jobs.start_background(JOBS)
+    logger.info("✓ 已啟動背景工作 worker")
+
+# 行政區 / 網格風險統計（由 python -m api.tiles 離線產生）
+RISK_TILES = TileCache(RISK_TILES_JSON)
+
+# 附近搜尋索引：離線分類結果 + 先前搜尋分析過的餐廳
+NEARBY_INDEX = GeoIndex()
+if os.path.exists(CLASSIFIED_JSON):
+    with open(CLASSIFIED_JSON, "r", encoding="utf-8") as f:
+        NEARBY_INDEX.add_many(json.load(f))
+try:
+    with review_store.connect(REVIEW_DB_PATH) as conn:
+        NEARBY_INDEX.add_many(review_store.load_classified_places(conn))
+except Exception as e:
+    logger.warning(f"⚠️  無法讀取已分析餐廳: {e}")
+logger.info(f"✓ 附近搜尋索引: {len(NEARBY_INDEX)} 間餐廳")
+
+
+# ============================================
+# 請求計時與指標
+# ============================================
+@app.before_request
+def begin_request_trace():
+    g.trace_token = start_trace()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if not response.direct_passthrough and endpoint.startswith("/api/"):
+        if response.is_streamed:
+            # calculate_content_length 會把串流整個讀進記憶體，改在送出時邊送邊計算
+            response.response = _count_streamed_bytes(response.response, endpoint)
+        else:
+            RESPONSE_BYTES.observe(response.calculate_content_length() or 0, endpoint=endpoint)
+
+    token = g.pop("trace_token", None)
+    if token is not None:
+        spans = end_trace(token)
+        if spans and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("trace %s %s", endpoint, json.dumps(spans, ensure_ascii=False))
+    return response
+
+
+def _count_streamed_bytes(chunks, endpoint):
+    """串流回應送完（或中斷）時記錄實際送出的位元組數"""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        RESPONSE_BYTES.observe(size, endpoint=endpoint)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus 指標"""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/")
@@ -66,10 +206,127 @@ def get_config():
     return jsonify({"googleMapsApiKey": GOOGLE_PLACES_API_KEY})
 
 
+# ============================================
+# 共用：取得評論並分析風險
+# ============================================
+def analyze_places(places, city=None):
+    """
+    取得每間餐廳的評論並進行風險分析，完成後寫入評論索引與附近搜尋索引
+
+    列表用的精簡結果：不含評論原文與 flagged_reviews（見 /api/restaurants/<place_id>）
+
+    Args:
+        places: search_restaurants_by_text / search_restaurants_nearby 的結果
+        city: 搜尋的城市（用於選擇官方資料分區）；省略時依各餐廳地址判斷
+
+    Returns:
+        (依 api.ranking 排序的分析結果, {
+            "stale": 是否用到過期快取,
+            "reviews_unavailable": Google 失敗、改用已收錄評論的 place_id,
+            "partial": 是否因請求時限到期而提前結束,
+            "unfetched_place_ids": 時限到期前未取得評論（未列入結果）的 place_id,
+        })
+    """
+    analyzed_places = []
+    city_dataset = DATASETS.get(city) if city else None
+    status = {"stale": False, "reviews_unavailable": [], "partial": False, "unfetched_place_ids": []}
+
+    for index, place in enumerate(places):
+        place_id = place["place_id"]
+        try:
+            with span("places.details", place_id=place_id):
+                place["reviews"], stale = fetch_place_reviews(
+                    PLACES_CACHE, GOOGLE_PLACES_API_KEY, place_id, language="zh-TW"
+                )
+            status["stale"] = status["stale"] or stale
+        except PlacesClientError as e:
+            # Google 失敗且無快取：改用資料庫中已收錄的評論彙總
+            logger.warning(f"⚠️  無法取得 {place.get('name')} 的評論: {e}")
+            place["reviews"] = []
+            place["reviews_unavailable"] = True
+            status["reviews_unavailable"].append(place_id)
+        except DeadlineExceeded:
+            # 請求時限已到：只回傳已取得評論的餐廳
+            unfetched = places[index:]
+            logger.warning(f"⏱️  搜尋時限已到，{len(unfetched)} 間餐廳未取得評論")
+            status["partial"] = True
+            status["unfetched_place_ids"] = [p["place_id"] for p in unfetched]
+            places = places[:index]
+            break
+
+    # 收錄評論：新評論只在此分析一次，並取得每家餐廳所有已收錄評論的彙總
+    # （寫入失敗時改為即時分析本次取得的評論，不影響搜尋結果）
+    summaries = {}
+    try:
+        with span("store.ingest"), review_store.connect(REVIEW_DB_PATH) as conn:
+            for place in places:
+                _, summaries[review_store.place_key(place)] = review_store.ingest_restaurant(
+                    conn, place
+                )
+    except Exception as e:
+        summaries = {}
+        logger.warning(f"⚠️  評論收錄失敗: {e}")
+
+    for place in places:
+        place_id = place["place_id"]
+        reviews = place["reviews"]
+
+        # 先依城市選出官方資料分區，該縣市沒有資料時略過官方資料比對
+        if city:
+            dataset = city_dataset
+        else:
+            dataset = DATASETS.for_address(place.get("formatted_address"))
+
+        # 使用完整風險分析模組（整合官方資料）
+        # classify_restaurant() 會自動比對：
+        #   1. 該縣市餐飲衛生評核資料（優等級）
+        #   2. 該縣市食品稽查不合格紀錄
+        #   3. 評論中的症狀關鍵字
+        #   4. 評論中的生食關鍵字
+        with span("classify", place_id=place_id):
+            analyzed_place = classify_restaurant(
+                restaurant=place,
+                certified_data=dataset.certified if dataset else {},
+                inspection_failed_data=dataset.inspection if dataset else {},
+                districts=dataset.district_names if dataset else (),
+                review_summary=summaries.get(review_store.place_key(place)),
+                details=False,
+            )
+        analyzed_place.pop("reviews", None)
+        analyzed_places.append(analyzed_place)
+
+        # 顯示分析結果
+        level = analyzed_place["safety_analysis"]["level"]
+        review_count = len(reviews)
+
+        # 顯示額外資訊
+        extras = []
+        if analyzed_place["safety_analysis"].get("official_certification"):
+            extras.append("✅官方認證")
+        if analyzed_place["safety_analysis"].get("inspection_status"):
+            extras.append("⛔稽查不合格")
+
+        extra_info = f" ({', '.join(extras)})" if extras else ""
+        logger.info(f"  - {place['name']}: {review_count} 則評論 → {level}{extra_info}")
+
+    # 將分析結果寫入資料庫（失敗不影響搜尋結果）
+    try:
+        with span("store.write"), review_store.connect(REVIEW_DB_PATH) as conn:
+            review_store.save_classified_places(conn, analyzed_places)
+    except Exception as e:
+        logger.warning(f"⚠️  分析結果寫入失敗: {e}")
+    NEARBY_INDEX.add_many(analyzed_places)
+
+    # 依風險等級排序（見 api.ranking）
+    return rank(analyzed_places), status
+
+
 # ============================================
 # 路由 2: 搜尋 API
 # ============================================
 @app.route("/api/search", methods=["POST"])
+@profiling.profiled("search")
+@with_deadline(SEARCH_DEADLINE_SECONDS)
 def search_restaurants():
     try:
         data = request.get_json()
@@ -83,104 +340,531 @@ def search_restaurants():
             )  # HTTP 400 = 客戶端錯誤
         # 步驟 3: 組合搜尋查詢
         query = f"{city} {district} {address} 餐廳".strip()
-        print(f"\n🔍 收到搜尋請求: {query}")
-
-        # TODO: 步驟 4-6 下一階段實作
-        # - 呼叫 Google Places API
-        # - 風險分析
-        # - 儲存檔案
+        logger.info(f"🔍 收到搜尋請求: {query}")
 
         # 步驟 4: 呼叫 Google Places API
-        print("📡 正在搜尋餐廳...")
-        places = search_restaurants_by_text(
-            api_key=GOOGLE_PLACES_API_KEY,
-            query=query,
-            min_rating=0.0,  # 修正：改為 min_rating
-            max_results=5,
+        logger.info("📡 正在搜尋餐廳...")
+        try:
+            with span("places.textsearch"):
+                places, stale = fetch_text_search(
+                    PLACES_CACHE, GOOGLE_PLACES_API_KEY, query, max_results=5
+                )
+        except PlacesClientError as e:
+            # Google 失敗且沒有任何快取可用
+            logger.warning(f"⚠️  Text Search 失敗: {e}")
+            return (
+                jsonify({"status": "error", "message": "Google 搜尋暫時無法使用，請稍後再試"}),
+                503,
+            )
+        except DeadlineExceeded:
+            logger.warning(f"⏱️  Text Search 超過 {SEARCH_DEADLINE_SECONDS:g} 秒時限")
+            return (
+                jsonify({"status": "error", "message": "搜尋逾時，請稍後再試"}),
+                504,
+            )
+        logger.info(f"✓ 找到 {len(places)} 間餐廳" + ("（快取，背景更新中）" if stale else ""))
+
+        # 步驟 5-7: 取得每間餐廳的評論、風險分析並排序
+        logger.info("📝 正在取得評論並分析風險...")
+        analyzed_places, analysis_status = analyze_places(places, city=city)
+
+        # 步驟 8: 回傳結果
+        #   stale：部分資料來自過期快取，正在背景更新
+        #   partial：時限到期，unfetched_place_ids 中的餐廳未取得評論、未列入結果
+        payload = {
+            "status": "success",
+            "query": query,
+            "count": len(analyzed_places),
+            "stale": stale or analysis_status["stale"],
+            "partial": analysis_status["partial"],
+            "restaurants": analyzed_places,
+        }
+        if analysis_status["reviews_unavailable"]:
+            payload["reviews_unavailable"] = analysis_status["reviews_unavailable"]
+        if analysis_status["partial"]:
+            payload["unfetched_place_ids"] = analysis_status["unfetched_place_ids"]
+        with span("serialize"):
+            return jsonify(payload)
+    except Exception as e:
+        return (
+            jsonify({"status": "error", "message": f"伺服器錯誤: {str(e)}"}),
+            500,
+        )  # HTTP 500 = 伺服器錯誤
+
+
+# ============================================
+# 路由 2-1: 單一餐廳詳細分析 API
+# ============================================
+DETAIL_FIELDS = ("place_id", "name", "formatted_address", "lat", "lng", "rating", "user_ratings_total")
+
+
+def analyze_place_detail(place, reviews):
+    """
+    以所有已收錄評論分析單一餐廳（flagged_reviews 不設上限）
+
+    Args:
+        place: 餐廳基本資料
+        reviews: review_store.load_reviews 的結果
+    """
+    dataset = DATASETS.for_address(place.get("formatted_address"))
+    with span("classify.detail", review_count=len(reviews)):
+        summary = summarize_reviews(reviews)
+        detail = classify_restaurant(
+            restaurant={k: place[k] for k in DETAIL_FIELDS if k in place},
+            certified_data=dataset.certified if dataset else {},
+            inspection_failed_data=dataset.inspection if dataset else {},
+            districts=dataset.district_names if dataset else (),
+            review_summary=summary,
         )
-        print(f"✓ 找到 {len(places)} 間餐廳")
+    # 最新的標記評論排在前面
+    if detail["safety_analysis"]["flagged_reviews"]:
+        detail["safety_analysis"]["flagged_reviews"].reverse()
+    return detail
+
+
+@app.route("/api/restaurants/<place_id>", methods=["GET"])
+@with_deadline(SEARCH_DEADLINE_SECONDS)
+def get_restaurant_detail(place_id):
+    """
+    單一餐廳詳細分析：取得最新評論後，以所有已收錄的歷史評論重新分析
 
-        # 步驟 5: 取得每間餐廳的評論並進行風險分析
-        print("📝 正在取得評論並分析風險...")
-        analyzed_places = []
+    結果依「已收錄評論版本 + 關鍵字規則版本」快取（PLACE_DETAIL_TTL 秒），
+    同一間餐廳再次查詢且沒有新評論時直接回傳。
 
-        for place in places:
-            place_id = place["place_id"]
-            reviews = get_place_reviews(
-                api_key=GOOGLE_PLACES_API_KEY, place_id=place_id, language="zh-TW"
+    Query 參數：
+        refresh: 1 代表忽略詳細分析快取
+    """
+    try:
+        # 只提供曾經搜尋或離線分析過的餐廳（需要名稱與地址比對官方資料）；
+        # 先確認再呼叫 Google，未知的 place_id 不消耗配額也不計入查詢熱度
+        with review_store.connect(REVIEW_DB_PATH) as conn:
+            place = review_store.load_place(conn, place_id) or NEARBY_INDEX.get(place_id)
+        if place is None:
+            return (
+                jsonify({"status": "error", "message": "查無此餐廳，請先透過搜尋取得"}),
+                404,
             )
-            place["reviews"] = reviews
-
-            # 步驟 6: 使用完整風險分析模組（整合官方資料）
-            # classify_restaurant() 會自動比對：
-            #   1. 台北市餐飲衛生評核資料（優等級）
-            #   2. 食品稽查不合格紀錄
-            #   3. 評論中的症狀關鍵字
-            #   4. 評論中的生食關鍵字
-            analyzed_place = classify_restaurant(
-                restaurant=place,
-                certified_data=CERTIFIED_DATA,
-                inspection_failed_data=INSPECTION_FAILED_DATA,
+
+        # 取得最新評論（Google 失敗或逾時時只用已收錄的評論）
+        stale = False
+        reviews_unavailable = False
+        try:
+            with span("places.details", place_id=place_id):
+                reviews, stale = fetch_place_reviews(
+                    PLACES_CACHE, GOOGLE_PLACES_API_KEY, place_id, language="zh-TW"
+                )
+        except (PlacesClientError, DeadlineExceeded) as e:
+            logger.warning(f"⚠️  無法取得 {place_id} 的最新評論: {e}")
+            reviews = []
+            reviews_unavailable = True
+
+        with review_store.connect(REVIEW_DB_PATH) as conn:
+            with span("store.ingest"):
+                review_store.ingest_restaurant(
+                    conn, {**place, "reviews": (place.get("reviews") or []) + reviews}
+                )
+
+            fingerprint = f"{review_store.review_fingerprint(conn, place_id)}|{get_rules().version}"
+            detail = None
+            if request.args.get("refresh") != "1":
+                detail = review_store.load_place_detail(
+                    conn, place_id, fingerprint, max_age=PLACE_DETAIL_TTL
+                )
+            record_cache("place_detail", hit=detail is not None)
+
+            if detail is None:
+                detail = analyze_place_detail(place, review_store.load_reviews(conn, place_id))
+                review_store.save_place_detail(conn, place_id, fingerprint, detail)
+
+        return jsonify(
+            {
+                "status": "success",
+                "stale": stale,
+                "reviews_unavailable": reviews_unavailable,
+                "restaurant": detail,
+            }
+        )
+    except Exception as e:
+        return (
+            jsonify({"status": "error", "message": f"伺服器錯誤: {str(e)}"}),
+            500,
+        )
+
+
+# ============================================
+# 路由 2-2: 批次分類 API（合作夥伴）
+# ============================================
+def classify_batch_item(item, city=None, details=False):
+    """
+    分類批次中的單筆
+
+    Args:
+        item: 完整餐廳資料（含 name，直接分析、不寫入評論索引），
+            或只有 place_id（需為已收錄的餐廳，會取得最新評論）
+        city: 指定官方資料的縣市；省略時依地址判斷
+        details: 是否附上 flagged_reviews
+
+    Raises:
+        LookupError: place_id 不是已收錄的餐廳
+    """
+    review_summary = None
+    if item.get("name"):
+        place = item
+    else:
+        place_id = item["place_id"]
+        with review_store.connect(REVIEW_DB_PATH) as conn:
+            place = review_store.load_place(conn, place_id) or NEARBY_INDEX.get(place_id)
+            if place is None:
+                raise LookupError("查無此餐廳，請改為提供完整餐廳資料")
+            try:
+                reviews, _ = fetch_place_reviews(
+                    PLACES_CACHE, GOOGLE_PLACES_API_KEY, place_id, language="zh-TW", track=False
+                )
+            except PlacesClientError as e:
+                logger.warning(f"⚠️  無法取得 {place_id} 的評論，改用已收錄評論: {e}")
+                reviews = []
+            _, review_summary = review_store.ingest_restaurant(conn, {**place, "reviews": reviews})
+
+    dataset = DATASETS.get(city) if city else DATASETS.for_address(place.get("formatted_address"))
+    analyzed = classify_restaurant(
+        restaurant=place,
+        certified_data=dataset.certified if dataset else {},
+        inspection_failed_data=dataset.inspection if dataset else {},
+        districts=dataset.district_names if dataset else (),
+        review_summary=review_summary,
+        details=details,
+    )
+    return {
+        "place_id": place.get("place_id"),
+        "name": place.get("name"),
+        "safety_analysis": analyzed["safety_analysis"],
+    }
+
+
+@app.route("/api/classify/batch", methods=["POST"])
+def classify_batch():
+    """
+    批次分類餐廳，結果以 NDJSON 串流回傳（每行一筆，依輸入順序）
+
+    請求內容：
+        JSON 陣列 / {"restaurants": [...]} / {"place_ids": [...]}，
+        或 Content-Type: application/x-ndjson（每行一筆）；
+        每筆為 classify_restaurant 格式的餐廳資料，或已收錄餐廳的 place_id
+
+    Query 參數：
+        city: 指定官方資料的縣市（省略時依各餐廳地址判斷）
+        details: 1 代表附上 flagged_reviews
+        mode: job 代表以背景工作執行（筆數上限 BATCH_JOB_MAX_ITEMS），
+            回傳 202 與 job_id，再以 GET /api/classify/batch/<job_id> 查詢
+    """
+    too_large = jsonify({"status": "error", "message": f"請求內容超過 {BATCH_MAX_BYTES} 位元組"}), 413
+    if request.content_length is not None and request.content_length > BATCH_MAX_BYTES:
+        return too_large
+
+    job_mode = request.args.get("mode") == "job"
+    city = request.args.get("city") or None
+    details = request.args.get("details") == "1"
+    try:
+        body = request.get_data(cache=False)
+    except RequestEntityTooLarge:
+        return too_large
+    # chunked 上傳沒有 Content-Length，讀取時在 MAX_CONTENT_LENGTH 處截斷；讀滿上限即視為超過
+    if request.content_length is None and len(body) >= BATCH_MAX_BYTES:
+        return too_large
+    try:
+        items = parse_batch(
+            body,
+            request.content_type,
+            max_items=BATCH_JOB_MAX_ITEMS if job_mode else BATCH_MAX_ITEMS,
+        )
+    except BatchError as e:
+        message = str(e)
+        if e.status == 413 and not job_mode:
+            message += "，大量資料請改用 ?mode=job"
+        return jsonify({"status": "error", "message": message}), e.status
+
+    def classify_one(item):
+        return classify_batch_item(item, city=city, details=details)
+
+    if job_mode:
+        job = BATCH_JOBS.submit(items, classify_one)
+        logger.info(f"📦 批次工作 {job.job_id}: {len(items)} 筆")
+        return jsonify({"status": "accepted", **job.snapshot()}), 202
+
+    return Response(
+        stream_with_context(to_ndjson(run_batch(items, classify_one))),
+        mimetype="application/x-ndjson",
+    )
+
+
+@app.route("/api/classify/batch/<job_id>", methods=["GET"])
+def get_batch_job(job_id):
+    """
+    查詢批次工作
+
+    Query 參數：
+        results: 1 代表附上已完成的結果（JSON）
+        format: ndjson 代表以 NDJSON 回傳已完成的結果
+    """
+    job = BATCH_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "查無此工作"}), 404
+
+    if request.args.get("format") == "ndjson":
+        return Response(to_ndjson(job.snapshot(include_results=True)["results"]), mimetype="application/x-ndjson")
+    return jsonify({"status": "success", **job.snapshot(include_results=request.args.get("results") == "1")})
+
+
+# ============================================
+# 路由 3: 評論全文搜尋 API
+# ============================================
+@app.route("/api/reviews/search", methods=["GET"])
+def search_reviews():
+    """
+    搜尋已收錄的評論
+
+    Query 參數：
+        q: 關鍵字（以空白或逗號分隔，任一命中即算）
+        category: 預設查詢分類（如「症狀」、「異物」），可重複指定
+        days: 只搜尋最近 N 天
+        limit: 最多回傳評論數（預設 50，上限 500）
+    """
+    try:
+        query = request.args.get("q", "")
+        categories = request.args.getlist("category")
+        days = request.args.get("days", type=int)
+        limit = min(request.args.get("limit", 50, type=int), 500)
+
+        try:
+            terms = review_store.resolve_query_terms(query, categories)
+        except KeyError as e:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"未知的查詢分類: {e.args[0]}",
+                        "categories": list(review_store.canned_queries()),
+                    }
+                ),
+                400,
+            )
+        if not terms:
+            return (
+                jsonify({"status": "error", "message": "請提供關鍵字 q 或分類 category"}),
+                400,
             )
-            analyzed_places.append(analyzed_place)
-
-            # 顯示分析結果
-            level = analyzed_place["safety_analysis"]["level"]
-            review_count = len(reviews)
-
-            # 顯示額外資訊
-            extras = []
-            if analyzed_place["safety_analysis"].get("official_certification"):
-                extras.append("✅官方認證")
-            if analyzed_place["safety_analysis"].get("inspection_status"):
-                extras.append("⛔稽查不合格")
-
-            extra_info = f" ({', '.join(extras)})" if extras else ""
-            print(f"  - {place['name']}: {review_count} 則評論 → {level}{extra_info}")
-
-        # 步驟 7: 依風險等級排序
-        # 排序邏輯：
-        # 1. 稽查不合格優先排在最後（警示用）
-        # 2. 其次按風險等級：低風險 > 注意
-        # 3. 官方認證在同風險等級內優先顯示
-        # 4. 同等級內依 Google 評分排序
-        def sort_key(restaurant):
-            analysis = restaurant["safety_analysis"]
-            level = analysis["level"]
-            has_certification = analysis.get("official_certification") is not None
-            has_inspection_failed = analysis.get("inspection_status") is not None
-            rating = restaurant.get("rating", 0)
-
-            # 風險等級排序（數字越小越優先）
-            level_order = {
-                SafetyLevel.LOW_RISK.value: 0,
-                SafetyLevel.CAUTION.value: 1,
+
+        with review_store.connect(REVIEW_DB_PATH) as conn:
+            result = review_store.search_reviews(conn, terms, days=days, limit=limit)
+
+        return jsonify(
+            {
+                "status": "success",
+                "terms": terms,
+                "total_hits": result["total_hits"],
+                "places": result["places"],
             }
+        )
+    except Exception as e:
+        return (
+            jsonify({"status": "error", "message": f"伺服器錯誤: {str(e)}"}),
+            500,
+        )
+
+
+# ============================================
+# 路由 4: 行政區 / 網格風險統計 API
+# ============================================
+@app.route("/api/tiles", methods=["GET"])
+def get_risk_tiles():
+    """回傳預先計算的風險統計（支援 ETag / If-None-Match）"""
+    body, etag = RISK_TILES.get()
+    if body is None:
+        return (
+            jsonify({"status": "error", "message": "尚未產生風險統計，請先執行 python -m api.tiles"}),
+            404,
+        )
+
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    response = response.make_conditional(request)
+    record_cache("tiles_etag", hit=response.status_code == 304)
+    return response
+
 
-            # 排序優先級
+# ============================================
+# 路由 5: 附近搜尋 API
+# ============================================
+@app.route("/api/nearby", methods=["GET"])
+def search_nearby():
+    """
+    搜尋座標半徑內已分析過的餐廳，本地資料不足時才呼叫 Google
+
+    Query 參數：
+        lat, lng: 中心點座標（必填）
+        radius: 半徑公尺（預設 500，上限 5000）
+        limit: 每頁筆數（預設 20，上限 100）
+        page: 頁碼（預設 1）
+    """
+    try:
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        radius = min(request.args.get("radius", 500, type=float), NEARBY_MAX_RADIUS)
+        limit = min(max(request.args.get("limit", 20, type=int), 1), NEARBY_MAX_LIMIT)
+        page = max(request.args.get("page", 1, type=int), 1)
+        if lat is None or lng is None or radius <= 0:
             return (
-                1 if has_inspection_failed else 0,  # 稽查不合格排最後
-                level_order.get(level, 999),         # 風險等級
-                0 if has_certification else 1,       # 官方認證優先
-                -rating                              # Google 評分高的優先
+                jsonify({"status": "error", "message": "請提供 lat、lng 與正數 radius"}),
+                400,
             )
 
-        analyzed_places.sort(key=sort_key)
+        with span("nearby.local"):
+            results = NEARBY_INDEX.within(lat, lng, radius)
+        source = "local"
+        stale = False
+        record_cache("nearby", hit=len(results) >= NEARBY_MIN_LOCAL_RESULTS)
 
-        # 步驟 8: 回傳結果
+        # 本地覆蓋不足時才呼叫 Google，分析後加入本地索引
+        if len(results) < NEARBY_MIN_LOCAL_RESULTS:
+            logger.info(f"📡 附近搜尋本地僅 {len(results)} 筆，改呼叫 Google Nearby Search")
+            try:
+                places = search_restaurants_nearby(
+                    api_key=GOOGLE_PLACES_API_KEY,
+                    lat=lat,
+                    lng=lng,
+                    radius=int(radius),
+                    max_results=5,
+                )
+            except PlacesClientError as e:
+                # Google 失敗時仍回傳本地已有的結果
+                logger.warning(f"⚠️  Nearby Search 失敗，改回傳本地結果: {e}")
+                stale = True
+            else:
+                _, analysis_status = analyze_places(places)
+                stale = analysis_status["stale"]
+                results = NEARBY_INDEX.within(lat, lng, radius)
+                source = "google"
+
+        # 只排出這一頁需要的餐廳（見 api.ranking.top_k）
+        restaurants, total = paginate(results, page, limit)
         return jsonify(
             {
                 "status": "success",
-                "query": query,
-                "count": len(analyzed_places),
-                "restaurants": analyzed_places,
+                "source": source,
+                "stale": stale,
+                "page": page,
+                "total": total,
+                "count": len(restaurants),
+                "restaurants": restaurants,
             }
         )
     except Exception as e:
         return (
             jsonify({"status": "error", "message": f"伺服器錯誤: {str(e)}"}),
             500,
-        )  # HTTP 500 = 伺服器錯誤
+        )
+
+
+# ============================================
+# 管理端點: 背景工作
+# ============================================
+@app.route("/admin/jobs", methods=["GET"])
+@require_admin
+def list_jobs():
+    """
+    列出最近的工作
+
+    Query 參數：
+        status: 只列出此狀態（queued / running / done / failed / cancelled）
+        limit: 筆數（預設 50）
+    """
+    status = request.args.get("status") or None
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    return jsonify(
+        {
+            "status": "success",
+            "kinds": sorted(jobs.HANDLERS),
+            "counts": JOBS.counts(),
+            "jobs": JOBS.list(status, limit),
+        }
+    )
+
+
+@app.route("/admin/jobs", methods=["POST"])
+@require_admin
+def enqueue_job():
+    """
+    排入工作
+
+    Body：{"kind": "classify_all", "params": {...}, "max_attempts": 3}
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind", "")
+    params = data.get("params") or {}
+    if not isinstance(params, dict):
+        return jsonify({"status": "error", "message": "params 必須是物件"}), 400
+    try:
+        job_id = JOBS.enqueue(kind, params, max_attempts=int(data.get("max_attempts", jobs.JOB_MAX_ATTEMPTS)))
+    except KeyError:
+        return (
+            jsonify({"status": "error", "message": f"未知的工作種類，可用: {', '.join(sorted(jobs.HANDLERS))}"}),
+            400,
+        )
+    return jsonify({"status": "success", "job": JOBS.get(job_id)}), 202
+
+
+@app.route("/admin/jobs/<int:job_id>", methods=["GET"])
+@require_admin
+def get_job(job_id):
+    """查詢單一工作（含進度與結果）"""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "查無此工作"}), 404
+    return jsonify({"status": "success", "job": job})
+
+
+@app.route("/admin/jobs/<int:job_id>/cancel", methods=["POST"])
+@require_admin
+def cancel_job(job_id):
+    """取消排隊中的工作，或要求執行中的工作中止"""
+    if not JOBS.cancel(job_id):
+        return jsonify({"status": "error", "message": "工作不存在或已結束"}), 409
+    return jsonify({"status": "success", "job": JOBS.get(job_id)})
+
+
+# ============================================
+# 管理端點: 請求剖析檔
+# ============================================
+@app.route("/admin/profiles", methods=["GET"])
+@require_admin
+def list_profiles():
+    """列出已保存的剖析檔"""
+    return jsonify({"status": "success", "profiles": profiling.list_profiles()})
+
+
+@app.route("/admin/profiles/<name>", methods=["GET"])
+@require_admin
+def get_profile(name):
+    """
+    檢視剖析檔
+
+    Query 參數：
+        download=1: 下載原始檔（.prof 可用 snakeviz 等工具開啟）
+        sort: pstats 排序欄位（預設 cumulative）
+    """
+    path = profiling.profile_path(name)
+    if path is None:
+        return jsonify({"status": "error", "message": "找不到剖析檔"}), 404
+
+    if request.args.get("download") == "1" or name.endswith(".html"):
+        return send_file(path, as_attachment=name.endswith(".prof"))
+
+    sort = request.args.get("sort", "cumulative")
+    if sort not in ("cumulative", "tottime", "ncalls", "time"):
+        sort = "cumulative"
+    return Response(profiling.render_profile_text(path, sort=sort), mimetype="text/plain")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+"""
+benchmarks/batch_scoring.py
+classify_reviews_batch 與逐則 classify_review 的效能比較與一致性檢查
+
+使用方式：
+    python -m benchmarks.batch_scoring            # 預設 100,000 則合成評論
+    python -m benchmarks.batch_scoring --n 20000
+"""
+
+import argparse
+import time
+
+from api.batch_scoring import classify_reviews_batch, matched_keywords_of
+from api.classifier import classify_review
+from benchmarks.common import synthetic_reviews
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批次關鍵字命中矩陣效能比較")
+    parser.add_argument("--n", type=int, default=100_000, help="評論數")
+    args = parser.parse_args()
+
+    reviews = synthetic_reviews(args.n, negation_rate=0.2)
+
+    started = time.perf_counter()
+    expected = [classify_review(text) for text in reviews]
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = classify_reviews_batch(reviews)
+    batch_seconds = time.perf_counter() - started
+
+    for i, single in enumerate(expected):
+        assert matched_keywords_of(result, i) == single["matched_keywords"], i
+        assert bool(result["has_symptoms"][i]) == single["has_symptoms"], i
+        assert bool(result["has_raw_food"][i]) == single["has_raw_food"], i
+        assert abs(float(result["risk_score"][i]) - single["risk_score"]) < 1e-6, i
+
+    print(f"評論數: {args.n:,}，命中數: {len(result['rows']):,}")
+    print(f"classify_review 逐則: {loop_seconds:.3f} s")
+    print(f"classify_reviews_batch: {batch_seconds:.3f} s（{loop_seconds / batch_seconds:.1f}x）")
+    print("✓ 結果與 classify_review 完全一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+benchmarks/common.py
+效能測試共用工具：合成資料、計時、結果儲存與回歸比較
+"""
+
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+
+from api.classifier import KEYWORD_CATEGORIES
+
+
+# ====================
+# 常數定義
+# ====================
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+CERTIFICATION_CSV = os.path.join(PROJECT_DIR, "data/external/certified_restaurants.csv")
+INSPECTION_JSON = os.path.join(PROJECT_DIR, "data/external/food_business_data.json")
+
+FILLER = [
+    "服務不錯", "價格合理", "份量很多", "環境舒適", "會再來", "湯頭濃郁",
+    "等了很久", "店員親切", "口味偏鹹", "停車方便", "CP值高", "Very Good",
+]
+
+NEGATIONS = ["不會", "沒有", "完全沒有"]
+
+DISTRICTS = ["中正區", "大安區", "信義區", "中山區", "松山區", "內湖區"]
+
+
+# ====================
+# 合成資料
+# ====================
+def synthetic_reviews(
+    n: int,
+    hit_rate: float = 0.1,
+    seed: int = 42,
+    negation_rate: float = 0.0,
+) -> List[str]:
+    """
+    產生合成評論，約 hit_rate 比例含有風險關鍵字
+
+    negation_rate: 關鍵字前加上否定詞（如「不會拉肚子」）的比例
+    """
+    rng = random.Random(seed)
+    keywords = [kw for kws in KEYWORD_CATEGORIES.values() for kw in kws]
+    reviews = []
+    for _ in range(n):
+        parts = rng.choices(FILLER, k=rng.randint(3, 12))
+        if rng.random() < hit_rate:
+            for _ in range(rng.randint(1, 3)):
+                keyword = rng.choice(keywords)
+                if negation_rate and rng.random() < negation_rate:
+                    keyword = rng.choice(NEGATIONS) + keyword
+                parts.insert(rng.randrange(len(parts) + 1), keyword)
+        reviews.append("，".join(parts))
+    return reviews
+
+
+def synthetic_restaurants(
+    n: int,
+    names: Optional[List[str]] = None,
+    reviews_per_place: int = 5,
+    seed: int = 42,
+) -> List[Dict[str, Any]]:
+    """
+    產生合成餐廳（Google Places 格式，含評論）
+
+    Args:
+        n: 餐廳數
+        names: 餐廳名稱來源（例如官方名單，用來測試比對命中的情境）
+        reviews_per_place: 每間餐廳評論數
+    """
+    rng = random.Random(seed)
+    texts = synthetic_reviews(n * reviews_per_place, seed=seed)
+    restaurants = []
+    for i in range(n):
+        name = rng.choice(names) if names and rng.random() < 0.5 else f"合成餐廳{i}號店"
+        district = rng.choice(DISTRICTS)
+        restaurants.append(
+            {
+                "place_id": f"fake-place-{i}",
+                "name": name,
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "user_ratings_total": rng.randint(10, 5000),
+                "formatted_address": f"臺北市{district}測試路{i}號",
+                "lat": 25.03 + rng.uniform(-0.03, 0.03),
+                "lng": 121.53 + rng.uniform(-0.03, 0.03),
+                "reviews": [
+                    {"author_name": f"user{j}", "rating": 4, "text": texts[i * reviews_per_place + j], "time": 1700000000 + j}
+                    for j in range(reviews_per_place)
+                ],
+            }
+        )
+    return restaurants
+
+
+# ====================
+# 計時
+# ====================
+def measure(
+    fn: Callable[[], Any],
+    repeat: int = 5,
+    number: int = 1,
+    warmup: int = 1,
+) -> Dict[str, float]:
+    """
+    重複執行並統計每次呼叫的耗時（秒）
+
+    Args:
+        fn: 待測函式（無參數）
+        repeat: 取樣次數
+        number: 每次取樣內連續呼叫次數
+        warmup: 預熱次數（不計入）
+
+    Returns:
+        {"min", "median", "mean", "max", "repeat", "number"}
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+# ====================
+# 結果儲存與比較
+# ====================
+def save_results(
+    results: Dict[str, Dict[str, float]],
+    path: Optional[str] = None,
+    latency: float = 0.0,
+) -> str:
+    """
+    儲存結果到 benchmarks/results/（同時更新 latest.json）
+
+    latency 為執行時的 --latency（端對端項目的數字取決於它，比較時需一致）
+
+    Returns:
+        寫出的檔案路徑
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    payload = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "latency": latency,
+        "results": results,
+    }
+    if path is None:
+        path = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+
+    for target in (path, os.path.join(RESULTS_DIR, "latest.json")):
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_results(
+    results: Dict[str, Dict[str, float]],
+    baseline_path: str,
+    threshold: float,
+    latency: float = 0.0,
+) -> List[str]:
+    """
+    與基準結果比較中位數耗時
+
+    Args:
+        results: 本次結果
+        baseline_path: 基準 JSON 路徑
+        threshold: 允許的變慢比例（0.25 = 慢 25% 以內不算回歸）
+        latency: 本次執行的 --latency，與基準不同時不比較、直接回報
+
+    Returns:
+        回歸項目說明清單（空清單代表無回歸）
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    baseline = payload["results"]
+    if payload.get("latency", 0.0) != latency:
+        return [f"基準以 --latency {payload.get('latency', 0.0)} 錄製，本次為 --latency {latency}，請用相同設定重新錄製基準"]
+
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median"]
+        after = stats["median"]
+        if before > 0 and after > before * (1 + threshold):
+            regressions.append(f"{name}: {before * 1000:.3f} ms → {after * 1000:.3f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
@@ -0,0 +1,115 @@
+"""
+benchmarks/fake_places.py
+本機模擬 Google Places API 伺服器（可設定延遲），供端對端效能測試使用
+
+支援端點：
+    /textsearch/json、/nearbysearch/json、/details/json
+
+使用方式：
+    with FakePlacesServer(latency=0.05) as server:
+        server.patch_places_client()
+        ...
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any
+from urllib.parse import urlparse, parse_qs
+
+from api import places
+
+
+class FakePlacesServer:
+    """在背景執行緒中提供假資料的 HTTP 伺服器"""
+
+    def __init__(self, restaurants: List[Dict[str, Any]], latency: float = 0.0):
+        """
+        Args:
+            restaurants: 回傳的餐廳（Google Places 格式，含 reviews）
+            latency: 每個請求的人工延遲（秒）
+        """
+        self.restaurants = restaurants
+        self.by_place_id = {r["place_id"]: r for r in restaurants}
+        self.latency = latency
+        # 設為 HTTP 狀態碼（如 503）可模擬 Google 故障
+        self.fail_status = None
+        self.request_count = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._original_urls = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server.fail_status:
+                    self.send_response(server.fail_status)
+                    self.end_headers()
+                    return
+
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path in ("/textsearch/json", "/nearbysearch/json"):
+                    body = {"status": "OK", "results": [server._summary(r) for r in server.restaurants[:20]]}
+                elif url.path == "/details/json":
+                    place = server.by_place_id.get(params.get("place_id"), {})
+                    body = {"status": "OK", "result": {"reviews": place.get("reviews", [])}}
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    @staticmethod
+    def _summary(restaurant: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "place_id": restaurant["place_id"],
+            "name": restaurant["name"],
+            "rating": restaurant["rating"],
+            "user_ratings_total": restaurant.get("user_ratings_total"),
+            "formatted_address": restaurant.get("formatted_address"),
+            "geometry": {"location": {"lat": restaurant.get("lat"), "lng": restaurant.get("lng")}},
+        }
+
+    def patch_places_client(self) -> None:
+        """將 api.places 的端點改指向本伺服器（離開 with 區塊時還原）"""
+        for name, path in (
+            ("PLACES_TEXT_SEARCH_URL", "/textsearch/json"),
+            ("PLACES_NEARBY_SEARCH_URL", "/nearbysearch/json"),
+            ("PLACES_DETAILS_URL", "/details/json"),
+        ):
+            self._original_urls[name] = getattr(places, name)
+            setattr(places, name, self.base_url + path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        for name, url in self._original_urls.items():
+            setattr(places, name, url)
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,82 @@
+"""
+benchmarks/incremental.py
+增量分類效能比較（全部重新分類 vs api.incremental）
+
+情境：
+    - full：第一次執行（沒有 manifest，全部分類）
+    - unchanged：輸入完全沒變
+    - changed：約 1% 的餐廳多了一則評論
+
+最後確認增量結果與 process_all_restaurants 全部重新分類的結果一致。
+
+使用方式：
+    python -m benchmarks.incremental
+    python -m benchmarks.incremental --n 20000 --changed 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from api.classifier import load_certified_restaurants, process_all_restaurants
+from api.incremental import reclassify_incremental
+from api.serialization import dump_file, loads
+from benchmarks.common import CERTIFICATION_CSV, INSPECTION_JSON, synthetic_restaurants
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="增量分類效能比較")
+    parser.add_argument("--n", type=int, default=5000, help="餐廳數")
+    parser.add_argument("--reviews", type=int, default=5, help="每間餐廳評論數")
+    parser.add_argument("--changed", type=float, default=0.01, help="有變動的餐廳比例")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        certified = load_certified_restaurants(CERTIFICATION_CSV)
+    restaurants = synthetic_restaurants(args.n, names=list(certified), reviews_per_place=args.reviews)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "places_with_reviews.json")
+        output_path = os.path.join(tmp, "safety_classified.json")
+        paths = dict(
+            input_path=input_path,
+            output_path=output_path,
+            certification_csv_path=CERTIFICATION_CSV,
+            inspection_json_path=INSPECTION_JSON,
+        )
+
+        def run(label: str) -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = reclassify_incremental(**paths)
+            print(
+                f"  {label:<10} {stats['seconds'] * 1000:10.1f} ms  "
+                f"重新分類 {stats['reclassified']:>6}  沿用 {stats['reused']:>6}"
+            )
+
+        print(f"【{args.n} 間餐廳，每間 {args.reviews} 則評論】")
+        dump_file(restaurants, input_path)
+        run("full")
+        run("unchanged")
+
+        rng = random.Random(7)
+        for r in rng.sample(restaurants, max(1, int(args.n * args.changed))):
+            r["reviews"].append({"author_name": "bench", "time": 1, "rating": 1, "text": "吃完拉肚子"})
+        dump_file(restaurants, input_path)
+        run("changed")
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = process_all_restaurants(**{**paths, "output_path": os.path.join(tmp, "full.json")})
+        print(f"  {'baseline':<10} {(time.perf_counter() - started) * 1000:10.1f} ms  process_all_restaurants")
+
+        with open(output_path, "rb") as f:
+            assert loads(f.read()) == expected
+    print("\n✓ 增量結果與全部重新分類一致")
+
+
+if __name__ == "__main__":
+    main()
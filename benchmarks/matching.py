@@ -0,0 +1,249 @@
+"""
+benchmarks/matching.py
+官方名單比對：全表掃描（原寫法）vs bigram 索引（api.matching）
+
+1. 一致性：以 data/external 的評核 / 稽查名單，對各種查詢（加後綴、截短、拼接、含「-」、
+   未命中、短名稱，搭配同區 / 他區 / 無地址）比對兩種寫法的結果必須完全相同
+2. 效能：名單放大為 1x / 10x / 100x（以真實名稱拼接出新名稱）時，每筆查詢的耗時
+3. 比對結果快取：同一批名稱在不同門牌重複查詢時，快取結果與全表掃描一致，並列出命中率
+4. 評分比對（MATCH_MODE=scored）：以官方名稱改寫出已知答案的查詢（加後綴、改寫分店、
+   換行政區），比較 first / scored 兩種模式的正確率與每筆查詢耗時
+
+使用方式：
+    python -m benchmarks.matching
+    python -m benchmarks.matching --queries 100 --scales 1 10
+"""
+
+import argparse
+import contextlib
+import io
+import random
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from api.classifier import (
+    DISTRICT_MAP,
+    fuzzy_match_certification,
+    load_certified_restaurants,
+    load_inspection_failed,
+    scored_match_certification,
+)
+from api.matching import MATCH_CACHE, get_match_index
+from benchmarks.common import CERTIFICATION_CSV, INSPECTION_JSON, measure
+
+
+def legacy_fuzzy_match(
+    restaurant_name: str,
+    restaurant_address: str,
+    certified_data: Dict[str, Dict[str, str]],
+    districts: Optional[Iterable[str]] = None,
+) -> Optional[Dict[str, str]]:
+    """加索引前的 fuzzy_match_certification（逐筆掃描，作為比較基準）"""
+    if not restaurant_name or not certified_data:
+        return None
+    if districts is None:
+        districts = DISTRICT_MAP.values()
+    if restaurant_name in certified_data:
+        return certified_data[restaurant_name]
+
+    def clean_name(name: str) -> str:
+        suffixes = ["餐廳", "店", "門市", "分店", "旗艦店", "本店", "總店"]
+        result = name.strip()
+        for suffix in suffixes:
+            result = result.replace(suffix, "")
+        return result.strip()
+
+    clean_restaurant = clean_name(restaurant_name)
+    for cert_name, cert_info in certified_data.items():
+        if clean_restaurant == clean_name(cert_name):
+            return cert_info
+    for cert_name, cert_info in certified_data.items():
+        clean_cert = clean_name(cert_name)
+        name_match = (
+            clean_restaurant in clean_cert
+            or clean_cert in clean_restaurant
+            or clean_restaurant.replace("-", "") in clean_cert.replace("-", "")
+        )
+        if name_match:
+            if restaurant_address and cert_info["address"]:
+                for district in districts:
+                    if district in restaurant_address and district in cert_info["address"]:
+                        return cert_info
+            else:
+                if len(clean_restaurant) >= 3 and len(clean_cert) >= 3:
+                    return cert_info
+    return None
+
+
+def scaled(data: Dict[str, Any], factor: int, seed: int = 3) -> Dict[str, Any]:
+    """將名單放大 factor 倍（新名稱由兩個真實名稱的前後段拼接）"""
+    if factor <= 1:
+        return data
+    rng = random.Random(seed)
+    names = list(data)
+    records = list(data.values())
+    result = dict(data)
+    while len(result) < len(data) * factor:
+        a, b = rng.choice(names), rng.choice(names)
+        name = a[: rng.randint(1, max(len(a) - 1, 1))] + b[rng.randint(1, max(len(b) - 1, 1)) :]
+        result.setdefault(name, rng.choice(records))
+    return result
+
+
+def make_queries(data: Dict[str, Any], n: int, seed: int = 5) -> List[Tuple[str, str]]:
+    """產生 n 筆查詢（名稱, 地址）"""
+    rng = random.Random(seed)
+    names = list(data)
+    districts = list(DISTRICT_MAP.values())
+    queries = []
+    for i in range(n):
+        name = rng.choice(names)
+        kind = i % 8
+        if kind == 0:
+            query = name + rng.choice(["餐廳", "店", "旗艦店"])
+        elif kind == 1:
+            query = name[: rng.randint(1, len(name))]
+        elif kind == 2:
+            query = rng.choice(["台北", "新", ""]) + name + rng.choice(["分店", "(信義)", "-二店"])
+        elif kind == 3:
+            query = name.replace("-", "")
+        elif kind == 4:
+            query = name.split("-")[0]
+        elif kind == 5:
+            query = f"不存在的餐廳{i}"
+        elif kind == 6:
+            query = rng.choice(names)[:2] + rng.choice(names)[-2:]
+        else:
+            query = rng.choice(["麵", "店", "咖啡", "-", " "])
+        address = rng.choice(["", f"臺北市{rng.choice(districts)}測試路{i}號", data[name]["address"]])
+        queries.append((query, address))
+    return queries
+
+
+def labeled_queries(data: Dict[str, Any], n: int, seed: int = 13) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    產生已知答案的查詢（名稱, 地址, 應比對到的官方名稱或 None）
+
+    同區的改寫應比對到原紀錄；換到其他行政區、或只剩 1～2 個字的名稱應不比對到任何紀錄。
+    """
+    rng = random.Random(seed)
+    names = [name for name in data if len(name) >= 4]
+    districts = list(DISTRICT_MAP.values())
+    queries = []
+    for i in range(n):
+        name = rng.choice(names)
+        address = data[name]["address"]
+        district = next((d for d in districts if d in address), None)
+        kind = i % 4
+        if kind == 0:
+            queries.append((name + rng.choice(["餐廳", "門市"]), address, name))
+        elif kind == 1:
+            queries.append((name.replace("-", " ") + "店", address, name))
+        elif kind == 2 and district:
+            other = rng.choice([d for d in districts if d != district])
+            queries.append((name, f"臺北市{other}測試路{i}號", None))
+        else:
+            queries.append((name[:2], f"臺北市{district or ''}測試路{i}號", None))
+    return queries
+
+
+def accuracy(match, data: Dict[str, Any], queries: List[Tuple[str, str, Optional[str]]]) -> float:
+    correct = 0
+    for name, address, expected in queries:
+        record = match(name, address, data)
+        correct += (record is None) if expected is None else (record is data[expected])
+    return correct / len(queries)
+
+
+def scored_top(name: str, address: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    matches = scored_match_certification(name, address, data)
+    return data[matches[0][1]] if matches else None
+
+
+def check_equivalence(data: Dict[str, Any], queries: List[Tuple[str, str]]) -> int:
+    mismatches = 0
+    for name, address in queries:
+        if fuzzy_match_certification(name, address, data) is not legacy_fuzzy_match(name, address, data):
+            mismatches += 1
+            print(f"  ✗ 結果不同: {name!r} / {address!r}")
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="官方名單比對效能與一致性")
+    parser.add_argument("--queries", type=int, default=400, help="一致性檢查的查詢數（1x）")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="名單放大倍數")
+    args = parser.parse_args()
+    # 先只比較名單掃描本身（停用比對結果快取）
+    cache_size, MATCH_CACHE.maxsize = MATCH_CACHE.maxsize, 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tables = {
+            "certified": load_certified_restaurants(CERTIFICATION_CSV),
+            "inspection": load_inspection_failed(INSPECTION_JSON),
+        }
+
+    failed = 0
+    for table, data in tables.items():
+        queries = make_queries(data, args.queries)
+        queries += [(name, "") for name in data] + [(name + "餐廳", data[name]["address"]) for name in data]
+        mismatches = check_equivalence(data, queries)
+        failed += mismatches
+        print(f"【一致性】{table}: {len(data)} 筆名單、{len(queries)} 筆查詢，{mismatches} 筆不同")
+
+    print("\n【效能】每筆查詢耗時（certified）")
+    for factor in args.scales:
+        data = scaled(tables["certified"], factor)
+        # 放大後的名單也檢查一部分查詢的一致性
+        queries = make_queries(data, max(args.queries // factor, 40), seed=factor)
+        failed += check_equivalence(data, queries)
+
+        build = measure(lambda: get_match_index(dict(data)), repeat=1, warmup=0)
+        get_match_index(data)
+        legacy = measure(lambda: [legacy_fuzzy_match(n, a, data) for n, a in queries], repeat=1)
+        indexed = measure(lambda: [fuzzy_match_certification(n, a, data) for n, a in queries], repeat=3)
+        per_query = lambda stats: stats["median"] / len(queries) * 1000
+        print(
+            f"  {factor:>4}x {len(data):>7} 筆  全表掃描 {per_query(legacy):9.3f} ms  "
+            f"索引 {per_query(indexed):7.3f} ms  ({per_query(legacy) / per_query(indexed):6.1f}x)  "
+            f"建索引 {build['median'] * 1000:8.1f} ms"
+        )
+
+    # 連鎖店情境：同一批名稱換門牌重複出現
+    MATCH_CACHE.maxsize = cache_size
+    data = tables["certified"]
+    names = make_queries(data, 200, seed=11)
+    queries = [(name, address.replace("測試路", f"{round_}路")) for round_ in range(5) for name, address in names]
+    failed += check_equivalence(data, queries)
+    MATCH_CACHE.clear()
+    cold = measure(lambda: [fuzzy_match_certification(n, a, data) for n, a in names], repeat=1, warmup=0)
+    warm = measure(lambda: [fuzzy_match_certification(n, a, data) for n, a in queries], repeat=3)
+    stats = MATCH_CACHE.stats()
+    print(
+        f"\n【快取】{len(queries)} 筆查詢（{len(names)} 個名稱 x 5 個門牌）  "
+        f"未快取 {cold['median'] / len(names) * 1000:.3f} ms  已快取 {warm['median'] / len(queries) * 1000:.4f} ms  "
+        f"命中率 {stats['hit_rate']:.1%}"
+    )
+
+    # 評分比對：正確率與耗時（停用快取）
+    MATCH_CACHE.maxsize = 0
+    print("\n【評分比對】")
+    for factor in args.scales:
+        data = scaled(tables["certified"], factor)
+        queries = labeled_queries(tables["certified"], 400)
+        pairs = [(n, a) for n, a, _ in queries]
+        first = measure(lambda: [fuzzy_match_certification(n, a, data) for n, a in pairs], repeat=1)
+        scored = measure(lambda: [scored_match_certification(n, a, data) for n, a in pairs], repeat=1)
+        print(
+            f"  {factor:>4}x {len(data):>7} 筆  正確率 first {accuracy(fuzzy_match_certification, data, queries):6.1%}"
+            f" / scored {accuracy(scored_top, data, queries):6.1%}  "
+            f"每筆 first {first['median'] / len(pairs) * 1000:.3f} ms / scored {scored['median'] / len(pairs) * 1000:.3f} ms"
+        )
+    MATCH_CACHE.maxsize = cache_size
+
+    if failed:
+        raise SystemExit(f"✗ 共 {failed} 筆結果不同")
+    print("\n✓ 索引比對結果與全表掃描一致")
+
+
+if __name__ == "__main__":
+    main()
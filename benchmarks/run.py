@@ -0,0 +1,249 @@
+"""
+benchmarks/run.py
+熱點路徑效能測試
+
+測試項目：
+    - classify_review：1,000 則合成評論
+    - classify_restaurant：100 間合成餐廳（搭配真實官方資料）
+    - classify_restaurant[reviews]：20 間各 200 則評論的餐廳，完整 / 精簡（details=False）模式
+    - fuzzy_match_certification：命中 / 未命中官方名單（每輪先清空 MATCH_CACHE；[cached] 為快取命中）
+    - load_certified_restaurants、load_inspection_failed：載入 data/external/*
+    - rank / top_k：20,000 間已分類餐廳的完整排序與取前 20 筆
+    - /api/search：端對端（本機模擬 Places 伺服器，可設定延遲）；warm 為快取已預熱
+
+使用方式：
+    python -m benchmarks.run                       # 執行並儲存到 benchmarks/results/
+    python -m benchmarks.run --only fuzzy          # 只跑名稱含 fuzzy 的項目
+    python -m benchmarks.run --latency 0.05        # 模擬 Google 每次呼叫 50 ms
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.3
+    python -m benchmarks.run --latency 0.01 --update-baseline   # 更新基準（與 CI 相同的 --latency）
+
+與基準比較時若中位數變慢超過門檻，結束代碼為 1（供 CI 判斷）。
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from typing import Dict, Any, Callable, List, Tuple
+
+from api.classifier import (
+    classify_review,
+    classify_restaurant,
+    fuzzy_match_certification,
+    load_certified_restaurants,
+    load_inspection_failed,
+    SafetyLevel,
+)
+from api.matching import MATCH_CACHE
+from api.ranking import rank, top_k
+from benchmarks.common import (
+    BASELINE_PATH,
+    CERTIFICATION_CSV,
+    INSPECTION_JSON,
+    synthetic_reviews,
+    synthetic_restaurants,
+    measure,
+    save_results,
+    compare_results,
+)
+from benchmarks.fake_places import FakePlacesServer
+
+
+def _quiet(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """執行時隱藏 print 輸出"""
+
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+
+    return wrapper
+
+
+def _load_official_data() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return (
+            load_certified_restaurants(CERTIFICATION_CSV),
+            load_inspection_failed(INSPECTION_JSON),
+        )
+
+
+def build_cases(latency: float) -> List[Tuple[str, Callable[[], Callable[[], Any]], Dict[str, int]]]:
+    """
+    Returns:
+        [(名稱, 準備函式（回傳待測函式）, measure 參數)]
+    """
+
+    def classify_review_case():
+        reviews = synthetic_reviews(1000)
+        return lambda: [classify_review(text) for text in reviews]
+
+    def classify_restaurant_case():
+        certified, inspection = _load_official_data()
+        restaurants = synthetic_restaurants(100, names=list(certified))
+        return lambda: [classify_restaurant(r, certified, inspection) for r in restaurants]
+
+    def review_heavy_case(details: bool):
+        # 不比對官方資料，只量評論分析
+        def setup():
+            restaurants = synthetic_restaurants(20, reviews_per_place=200)
+            return lambda: [classify_restaurant(r, {}, {}, details=details) for r in restaurants]
+
+        return setup
+
+    def fuzzy_case(make_queries: Callable[[List[str]], List[Tuple[str, str]]], cached: bool):
+        # 未快取：每輪先清空 MATCH_CACHE（比對索引保留），量的是實際比對成本
+        def setup():
+            certified, _ = _load_official_data()
+            queries = make_queries(list(certified))
+
+            def run():
+                if not cached:
+                    MATCH_CACHE.clear()
+                return [fuzzy_match_certification(n, a, certified) for n, a in queries]
+
+            return run
+
+        return setup
+
+    def hit_queries(names: List[str]) -> List[Tuple[str, str]]:
+        rng = random.Random(7)
+        # 官方名稱加上常見後綴，避開策略 1 的完全比對
+        return [(name + "餐廳", "臺北市中正區") for name in rng.sample(names, 50)]
+
+    def miss_queries(names: List[str]) -> List[Tuple[str, str]]:
+        return [(f"不存在的餐廳{i}", "臺北市大安區") for i in range(50)]
+
+    def load_certified_case():
+        return _quiet(lambda: load_certified_restaurants(CERTIFICATION_CSV))
+
+    def load_inspection_case():
+        return _quiet(lambda: load_inspection_failed(INSPECTION_JSON))
+
+    def _ranked_input(n: int) -> List[Dict[str, Any]]:
+        rng = random.Random(11)
+        levels = [SafetyLevel.LOW_RISK.value, SafetyLevel.CAUTION.value]
+        return [
+            {
+                "name": f"餐廳{i}",
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "safety_analysis": {
+                    "level": rng.choice(levels),
+                    "official_certification": {"grade": "優"} if rng.random() < 0.1 else None,
+                    "inspection_status": {"result": "不合格"} if rng.random() < 0.02 else None,
+                },
+            }
+            for i in range(n)
+        ]
+
+    def rank_case():
+        restaurants = _ranked_input(20000)
+        return lambda: rank(restaurants)
+
+    def top_k_case():
+        restaurants = _ranked_input(20000)
+        return lambda: top_k(restaurants, 20)
+
+    search_client: Dict[str, Any] = {}
+
+    def api_search_setup():
+        # app 與模擬伺服器只建立一次，冷 / 熱兩個項目共用
+        if not search_client:
+            os.environ.setdefault("GOOGLE_PLACES_API_KEY", "benchmark-key")
+            os.environ.setdefault("LOG_LEVEL", "WARNING")
+            tmp_dir = tempfile.mkdtemp()
+            os.environ["REVIEW_DB_PATH"] = os.path.join(tmp_dir, "reviews.db")
+            os.environ["PLACES_CACHE_PATH"] = os.path.join(tmp_dir, "places_cache.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                import app as flask_app
+
+            names = list(flask_app.DATASETS.get("台北市").certified)
+            server = FakePlacesServer(synthetic_restaurants(20, names=names), latency=latency).__enter__()
+            server.patch_places_client()
+            search_client["app"] = flask_app
+            search_client["client"] = flask_app.app.test_client()
+        return search_client["app"], search_client["client"]
+
+    def api_search_run(client):
+        payload = {"city": "台北市", "district": "中正區", "address": "重慶南路"}
+
+        def run():
+            response = client.post("/api/search", json=payload)
+            assert response.status_code == 200, response.data
+
+        return _quiet(run)
+
+    def api_search_case():
+        # 停用 Places 快取：每次都經過（模擬的）Google
+        flask_app, client = api_search_setup()
+        flask_app.PLACES_CACHE.ttl = 0
+        return api_search_run(client)
+
+    def api_search_warm_case():
+        # 快取已預熱：Text Search 與 Details 都命中
+        flask_app, client = api_search_setup()
+        flask_app.PLACES_CACHE.ttl = 3600
+        run = api_search_run(client)
+        run()
+        return run
+
+    return [
+        ("classify_review[1000]", classify_review_case, {"repeat": 7}),
+        ("classify_restaurant[100]", classify_restaurant_case, {"repeat": 7}),
+        ("classify_restaurant[reviews x200,details]", review_heavy_case(True), {"repeat": 5}),
+        ("classify_restaurant[reviews x200,lean]", review_heavy_case(False), {"repeat": 5}),
+        ("fuzzy_match_certification[hit x50]", fuzzy_case(hit_queries, cached=False), {"repeat": 5}),
+        ("fuzzy_match_certification[miss x50]", fuzzy_case(miss_queries, cached=False), {"repeat": 5}),
+        ("fuzzy_match_certification[hit x50,cached]", fuzzy_case(hit_queries, cached=True), {"repeat": 5}),
+        ("fuzzy_match_certification[miss x50,cached]", fuzzy_case(miss_queries, cached=True), {"repeat": 5}),
+        ("load_certified_restaurants", load_certified_case, {"repeat": 5}),
+        ("load_inspection_failed", load_inspection_case, {"repeat": 5}),
+        ("rank[20000]", rank_case, {"repeat": 5}),
+        ("top_k[20000,k=20]", top_k_case, {"repeat": 5}),
+        ("api_search[e2e]", api_search_case, {"repeat": 5}),
+        ("api_search[warm]", api_search_warm_case, {"repeat": 20}),
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HaoShiJi 熱點路徑效能測試")
+    parser.add_argument("--only", default="", help="只執行名稱包含此字串的項目")
+    parser.add_argument("--latency", type=float, default=0.0, help="模擬 Places API 延遲（秒）")
+    parser.add_argument("--baseline", default=None, help="比較用的基準 JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允許變慢比例")
+    parser.add_argument("--no-save", action="store_true", help="不儲存結果")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次結果覆寫基準")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, prepare, options in build_cases(args.latency):
+        if args.only and args.only not in name:
+            continue
+        stats = measure(prepare(), **options)
+        results[name] = stats
+        print(f"{name:<40} median {stats['median'] * 1000:9.3f} ms   min {stats['min'] * 1000:9.3f} ms")
+
+    if not args.no_save:
+        path = save_results(results, latency=args.latency)
+        print(f"\n✓ 結果已儲存至: {path}")
+    if args.update_baseline:
+        save_results(results, BASELINE_PATH, latency=args.latency)
+        print(f"✓ 已更新基準: {BASELINE_PATH}")
+
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, args.threshold, latency=args.latency)
+        if regressions:
+            print("\n⚠️  效能回歸：")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print(f"\n✓ 與基準相比無超過 {args.threshold:.0%} 的回歸")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
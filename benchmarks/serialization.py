@@ -0,0 +1,70 @@
+"""
+benchmarks/serialization.py
+JSON 序列化效能比較（標準函式庫 json vs api.serialization）
+
+比較項目：
+    - json.dumps(indent=2, ensure_ascii=False)：原本 process_all_restaurants 的寫法
+    - json.dumps(ensure_ascii=True, sort_keys=True)：Flask 預設 jsonify
+    - api.serialization.dumps：精簡輸出 / pretty=True
+
+資料量：
+    - search：/api/search 回應（5 間餐廳，每間 5 則評論）
+    - pipeline：safety_classified.json（預設 5,000 間餐廳）
+
+使用方式：
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --n 20000 --reviews 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+
+from api.classifier import classify_restaurant, load_certified_restaurants, load_inspection_failed
+from api.serialization import BACKEND, dumps, loads
+from benchmarks.common import CERTIFICATION_CSV, INSPECTION_JSON, measure, synthetic_restaurants
+
+
+def _classified(n: int, reviews_per_place: int):
+    with contextlib.redirect_stdout(io.StringIO()):
+        certified = load_certified_restaurants(CERTIFICATION_CSV)
+        inspection = load_inspection_failed(INSPECTION_JSON)
+    restaurants = synthetic_restaurants(n, names=list(certified), reviews_per_place=reviews_per_place)
+    return [classify_restaurant(r, certified, inspection) for r in restaurants]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON 序列化效能比較")
+    parser.add_argument("--n", type=int, default=5000, help="pipeline 輸出的餐廳數")
+    parser.add_argument("--reviews", type=int, default=5, help="每間餐廳評論數")
+    args = parser.parse_args()
+
+    pipeline = _classified(args.n, args.reviews)
+    payloads = {
+        "search": {"status": "success", "count": 5, "restaurants": pipeline[:5]},
+        "pipeline": pipeline,
+    }
+    encoders = {
+        "json indent=2": lambda obj: json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8"),
+        "json (Flask 預設)": lambda obj: json.dumps(obj, ensure_ascii=True, sort_keys=True).encode("utf-8"),
+        f"dumps[{BACKEND}]": dumps,
+        f"dumps[{BACKEND}] pretty": lambda obj: dumps(obj, pretty=True),
+    }
+
+    print(f"序列化後端: {BACKEND}")
+    for name, payload in payloads.items():
+        # 精簡輸出與原本的結構必須一致
+        assert loads(dumps(payload)) == json.loads(json.dumps(payload, ensure_ascii=False))
+
+        repeat = 50 if name == "search" else 5
+        print(f"\n【{name}】")
+        for label, encode in encoders.items():
+            size = len(encode(payload))
+            stats = measure(lambda: encode(payload), repeat=repeat)
+            print(f"  {label:<24} {stats['median'] * 1000:9.3f} ms  {size / 1024:10.1f} KiB")
+    print("\n✓ 精簡輸出與標準函式庫解析結果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 讓 pytest 直接執行時也能匯入專案根目錄下的 api / benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+"""
+批次分類串流：第一行結果要在整批完成前送出（after_request 的位元組指標不得讀完整個串流）
+"""
+
+import json
+import os
+import threading
+
+os.environ.setdefault("GOOGLE_PLACES_API_KEY", "test")
+
+import app as app_module  # noqa: E402
+from api.batch_classify import BATCH_CHUNK_SIZE  # noqa: E402
+
+
+def test_first_line_is_sent_before_batch_finishes(monkeypatch):
+    release = threading.Event()
+    last = BATCH_CHUNK_SIZE  # 落在第二個 chunk，第一個 chunk 不受影響
+
+    def classify_batch_item(item, city=None, details=False):
+        if item["name"] == str(last):
+            # 等測試讀到第一行才放行；若串流被整個緩衝，這裡會等到逾時
+            return {"name": item["name"], "released": release.wait(timeout=5)}
+        return {"name": item["name"]}
+
+    monkeypatch.setattr(app_module, "classify_batch_item", classify_batch_item)
+    client = app_module.app.test_client()
+    response = client.post(
+        "/api/classify/batch",
+        json=[{"name": str(n)} for n in range(last + 1)],
+        buffered=False,
+    )
+    try:
+        lines = iter(response.response)
+        first = json.loads(next(lines))
+        assert first == {"index": 0, "name": "0"}
+        assert not release.is_set()
+        release.set()
+        rest = [json.loads(line) for line in b"".join(lines).splitlines()]
+    finally:
+        release.set()
+        response.close()
+
+    assert len(rest) == last
+    assert rest[-1] == {"index": last, "name": str(last), "released": True}
@@ -0,0 +1,84 @@
+"""
+官方名單比對：共用檔（mmap）中的比對索引與逐筆掃描的原寫法結果必須相同
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from api.classifier import (
+    fuzzy_match_certification,
+    load_certified_restaurants,
+    load_inspection_failed,
+    scored_match_certification,
+)
+from api.matching import MATCH_CACHE, MatchIndex
+from api.shared_datasets import ensure_shared_datasets
+from benchmarks.common import CERTIFICATION_CSV, INSPECTION_JSON
+from benchmarks.matching import labeled_queries, legacy_fuzzy_match, make_queries
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        plain = {
+            "certified": load_certified_restaurants(CERTIFICATION_CSV),
+            "inspection": load_inspection_failed(INSPECTION_JSON),
+        }
+    path = tmp_path_factory.mktemp("shared") / "taipei.shm"
+    shared = ensure_shared_datasets(str(path), [CERTIFICATION_CSV, INSPECTION_JSON], lambda: plain)
+    return plain, shared
+
+
+@pytest.fixture(autouse=True)
+def no_match_cache():
+    maxsize, MATCH_CACHE.maxsize = MATCH_CACHE.maxsize, 0
+    yield
+    MATCH_CACHE.maxsize = maxsize
+
+
+def _queries(data):
+    queries = make_queries(data, 400)
+    queries += [(name, "") for name in data]
+    queries += [(name + "餐廳", data[name]["address"]) for name in data]
+    return queries
+
+
+@pytest.mark.parametrize("table", ["certified", "inspection"])
+def test_shared_index_matches_legacy_scan(tables, table):
+    plain, shared = tables
+    data, shared_data = plain[table], shared[table]
+    assert shared_data.match_tables() is not None
+
+    for name, address in _queries(data):
+        expected = legacy_fuzzy_match(name, address, data)
+        result = fuzzy_match_certification(name, address, shared_data)
+        if expected is None:
+            assert result is None, (name, address)
+        else:
+            assert result is not None and result.to_dict() == expected.to_dict(), (name, address)
+
+
+@pytest.mark.parametrize("table", ["certified", "inspection"])
+def test_shared_index_matches_heap_index(tables, table):
+    plain, shared = tables
+    data, shared_data = plain[table], shared[table]
+    heap, mapped = MatchIndex(data), MatchIndex(shared_data)
+
+    assert list(mapped.names) == list(heap.names)
+    assert list(mapped.cleaned) == list(heap.cleaned)
+    for name, _ in _queries(data):
+        query = name.strip()
+        assert mapped.exact(query) == heap.exact(query)
+        assert list(mapped.containment_candidates(query)) == list(heap.containment_candidates(query))
+        assert mapped.scoring_candidates(query) == heap.scoring_candidates(query)
+
+
+def test_shared_scored_match_matches_dict(tables):
+    plain, shared = tables
+    data, shared_data = plain["certified"], shared["certified"]
+    for name, address, _ in labeled_queries(data, 200):
+        assert scored_match_certification(name, address, shared_data) == scored_match_certification(
+            name, address, data
+        )